@@ -0,0 +1,276 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from kakao_parser import to_timestamp
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 시각 컬럼은 epoch 초, 시/요일/날짜 구분은 한국 표준시 기준
+KST_OFFSET = 9 * 3600
+DAY_SECONDS = 86400
+# 1970-01-01은 목요일 (월요일=0 기준으로 3)
+EPOCH_WEEKDAY = 3
+WEEKDAYS = ['월', '화', '수', '목', '금', '토', '일']
+
+TYPE_CODES = {'message': 0, 'join': 1, 'leave': 2}
+MESSAGE, JOIN, LEAVE = 0, 1, 2
+
+# 사용자별 활동 곡선 구간 (주 단위는 월요일 00:00 KST부터)
+CURVE_BUCKETS = {'day': DAY_SECONDS, 'week': 7 * DAY_SECONDS}
+# 응답 간격 히스토그램 구간 상한 (초, 시각이 분 단위라 60초 미만은 같은 분 안의 응답)
+LATENCY_BUCKETS = (60, 300, 900, 3600, 6 * 3600)
+# 이보다 긴 간격은 응답이 아니라 대화 재개로 봄
+RESPONSE_WINDOW = 6 * 3600
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def _day_label(local_seconds: int) -> str:
+    """KST 기준 초를 YYYY-MM-DD로 변환"""
+    return datetime.fromtimestamp(local_seconds, timezone.utc).strftime('%Y-%m-%d')
+
+
+class ActivityColumns:
+    """분석용 컬럼 저장소: 시각(ts), 사용자 번호, 종류 코드를 각각 하나의 배열로 보관
+
+    닉네임은 처음 나온 순서대로 번호를 매기고, 적재가 끝나면 freeze()로 NumPy 배열로 바꾼다.
+    시각을 알 수 없는 레코드(날짜 구분선 이전, 과거 행)는 제외한다.
+    """
+
+    def __init__(self):
+        self.ts: List[int] = []
+        self.users: List[int] = []
+        self.kinds: List[int] = []
+        self.nicknames: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def extend(self, rows: Iterable[Tuple[Optional[int], str, str]]):
+        """(ts, 종류, 닉네임) 행 추가 (시각 순서대로 넣어야 함)"""
+        codes = self._codes
+        nicknames = self.nicknames
+        for ts, message_type, nickname in rows:
+            kind = TYPE_CODES.get(message_type)
+            if ts is None or kind is None:
+                continue
+            code = codes.get(nickname)
+            if code is None:
+                code = codes[nickname] = len(nicknames)
+                nicknames.append(nickname)
+            self.ts.append(ts)
+            self.users.append(code)
+            self.kinds.append(kind)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'ActivityColumns':
+        """파싱된 레코드에서 컬럼 생성"""
+        columns = cls()
+        columns.extend(
+            (to_timestamp(record.get('date'), record.get('time')), record['type'], record['nickname'])
+            for record in records
+        )
+        return columns.freeze()
+
+    def freeze(self) -> 'ActivityColumns':
+        """NumPy를 사용할 수 있으면 컬럼을 배열로 변환"""
+        if NUMPY_AVAILABLE and isinstance(self.ts, list):
+            self.ts = np.asarray(self.ts, dtype=np.int64)
+            self.users = np.asarray(self.users, dtype=np.int32)
+            self.kinds = np.asarray(self.kinds, dtype=np.int8)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+class ActivityAnalytics:
+    """시간대/요일 히트맵, 사용자별 활동 곡선, 응답 간격 분포, 입장/퇴장 추이 계산
+
+    NumPy가 있으면 각 지표를 배열 연산(bincount, diff) 한 번으로 계산하고,
+    없으면 같은 결과를 순수 파이썬 한 번 순회로 계산한다.
+    """
+
+    def __init__(self, columns: ActivityColumns, vectorized: Optional[bool] = None):
+        self.vectorized = NUMPY_AVAILABLE if vectorized is None else vectorized and NUMPY_AVAILABLE
+        self.columns = columns.freeze()
+        self.nicknames = columns.nicknames
+        # 순수 파이썬 계산은 리스트 순회가 더 빠르므로 배열을 리스트로 복사 (columns는 그대로 둠)
+        if self.vectorized or isinstance(columns.ts, list):
+            self.ts, self.users, self.kinds = columns.ts, columns.users, columns.kinds
+        else:
+            self.ts, self.users, self.kinds = columns.ts.tolist(), columns.users.tolist(), columns.kinds.tolist()
+
+    def heatmap(self) -> Dict:
+        """요일 x 시간대(KST) 메시지 수"""
+        if self.vectorized:
+            local = self.ts[self.kinds == MESSAGE] + KST_OFFSET
+            cells = ((local // DAY_SECONDS + EPOCH_WEEKDAY) % 7) * 24 + (local % DAY_SECONDS) // 3600
+            counts = np.bincount(cells, minlength=7 * 24).reshape(7, 24).tolist()
+        else:
+            flat = [0] * (7 * 24)
+            for ts, kind in zip(self.ts, self.kinds):
+                if kind == MESSAGE:
+                    local = ts + KST_OFFSET
+                    flat[((local // DAY_SECONDS + EPOCH_WEEKDAY) % 7) * 24 + (local % DAY_SECONDS) // 3600] += 1
+            counts = [flat[day * 24:(day + 1) * 24] for day in range(7)]
+        return {'weekdays': WEEKDAYS, 'hours': list(range(24)), 'counts': counts}
+
+    def user_curves(self, top: int = 10, bucket: str = 'day') -> Dict:
+        """메시지가 많은 상위 top명의 구간별 메시지 수"""
+        if bucket not in CURVE_BUCKETS:
+            raise ValueError(f"지원하지 않는 구간: {bucket} ({', '.join(CURVE_BUCKETS)})")
+        size = CURVE_BUCKETS[bucket]
+        # 주 구간은 월요일 00:00 KST에 맞춤 (epoch 기준 목요일이므로 3일 당김)
+        shift = KST_OFFSET + (EPOCH_WEEKDAY * DAY_SECONDS if bucket == 'week' else 0)
+        nicknames = self.nicknames
+
+        if self.vectorized:
+            mask = self.kinds == MESSAGE
+            users = self.users[mask]
+            if not len(users):
+                return {'bucket': bucket, 'labels': [], 'users': []}
+            buckets = (self.ts[mask] + shift) // size
+            first = int(buckets.min())
+            width = int(buckets.max()) - first + 1
+            totals = np.bincount(users, minlength=len(nicknames))
+            leaders = [int(code) for code in np.argsort(-totals, kind='stable')[:top] if totals[code]]
+            rank = np.full(len(nicknames), -1, dtype=np.int64)
+            rank[leaders] = np.arange(len(leaders))
+            ranked = rank[users]
+            selected = ranked >= 0
+            grid = np.bincount(
+                ranked[selected] * width + (buckets[selected] - first), minlength=len(leaders) * width
+            ).reshape(len(leaders), width).tolist()
+            totals = totals.tolist()
+        else:
+            totals = [0] * len(nicknames)
+            first = last = None
+            for ts, user, kind in zip(self.ts, self.users, self.kinds):
+                if kind == MESSAGE:
+                    totals[user] += 1
+                    index = (ts + shift) // size
+                    first = index if first is None else min(first, index)
+                    last = index if last is None else max(last, index)
+            if first is None:
+                return {'bucket': bucket, 'labels': [], 'users': []}
+            width = last - first + 1
+            leaders = sorted((code for code in range(len(nicknames)) if totals[code]),
+                             key=lambda code: -totals[code])[:top]
+            rank = {code: position for position, code in enumerate(leaders)}
+            grid = [[0] * width for _ in leaders]
+            for ts, user, kind in zip(self.ts, self.users, self.kinds):
+                if kind == MESSAGE and user in rank:
+                    grid[rank[user]][(ts + shift) // size - first] += 1
+
+        labels = [_day_label((first + offset) * size - shift + KST_OFFSET) for offset in range(width)]
+        return {
+            'bucket': bucket,
+            'labels': labels,
+            'users': [
+                {'nickname': nicknames[code], 'total': totals[code], 'counts': counts}
+                for code, counts in zip(leaders, grid)
+            ]
+        }
+
+    def response_latency(self) -> Dict:
+        """다른 사람의 메시지에 이어지는 메시지까지의 간격 분포 (시각이 분 단위이므로 분 해상도)"""
+        if self.vectorized:
+            mask = self.kinds == MESSAGE
+            ts, users = self.ts[mask], self.users[mask]
+            gaps = np.diff(ts)[users[1:] != users[:-1]]
+            restarts = int(np.count_nonzero(gaps >= RESPONSE_WINDOW))
+            gaps = np.sort(gaps[(gaps >= 0) & (gaps < RESPONSE_WINDOW)])
+            counts = np.bincount(
+                np.searchsorted(LATENCY_BUCKETS, gaps, side='right'), minlength=len(LATENCY_BUCKETS)
+            ).tolist()
+            gaps_count = len(gaps)
+            mean = float(gaps.mean()) if gaps_count else None
+            percentile = lambda p: int(gaps[min(gaps_count - 1, p * gaps_count // 100)])
+        else:
+            gaps = []
+            restarts = 0
+            previous = None
+            for ts, user, kind in zip(self.ts, self.users, self.kinds):
+                if kind != MESSAGE:
+                    continue
+                if previous is not None and user != previous[1]:
+                    gap = ts - previous[0]
+                    if gap >= RESPONSE_WINDOW:
+                        restarts += 1
+                    elif gap >= 0:
+                        gaps.append(gap)
+                previous = (ts, user)
+            gaps.sort()
+            counts = [0] * len(LATENCY_BUCKETS)
+            position = 0
+            for gap in gaps:
+                while gap >= LATENCY_BUCKETS[position]:
+                    position += 1
+                counts[position] += 1
+            gaps_count = len(gaps)
+            mean = sum(gaps) / gaps_count if gaps_count else None
+            percentile = lambda p: gaps[min(gaps_count - 1, p * gaps_count // 100)]
+
+        return {
+            'responses': gaps_count,
+            'conversation_restarts': restarts,
+            'mean_seconds': round(mean, 1) if mean is not None else None,
+            'percentiles': {f'p{p}': percentile(p) if gaps_count else None for p in LATENCY_PERCENTILES},
+            'histogram': [
+                {'lt_seconds': bound, 'count': count} for bound, count in zip(LATENCY_BUCKETS, counts)
+            ]
+        }
+
+    def churn(self) -> Dict:
+        """일별 입장/퇴장 수와 누적 순증감"""
+        if self.vectorized:
+            mask = self.kinds != MESSAGE
+            days = (self.ts[mask] + KST_OFFSET) // DAY_SECONDS
+            if not len(days):
+                return {'days': [], 'total_joins': 0, 'total_leaves': 0}
+            first = int(days.min())
+            width = int(days.max()) - first + 1
+            joining = self.kinds[mask] == JOIN
+            joins = np.bincount(days[joining] - first, minlength=width)
+            leaves = np.bincount(days[~joining] - first, minlength=width)
+            active = np.flatnonzero(joins + leaves)
+            net = np.cumsum(joins - leaves)
+            rows = [
+                (first + int(index), int(joins[index]), int(leaves[index]), int(net[index]))
+                for index in active
+            ]
+        else:
+            per_day: Dict[int, List[int]] = {}
+            for ts, kind in zip(self.ts, self.kinds):
+                if kind != MESSAGE:
+                    counters = per_day.setdefault((ts + KST_OFFSET) // DAY_SECONDS, [0, 0])
+                    counters[0 if kind == JOIN else 1] += 1
+            rows = []
+            net = 0
+            for day in sorted(per_day):
+                joins, leaves = per_day[day]
+                net += joins - leaves
+                rows.append((day, joins, leaves, net))
+
+        return {
+            'days': [
+                {'day': _day_label(day * DAY_SECONDS), 'joins': joins, 'leaves': leaves,
+                 'net': joins - leaves, 'cumulative_net': cumulative}
+                for day, joins, leaves, cumulative in rows
+            ],
+            'total_joins': sum(row[1] for row in rows),
+            'total_leaves': sum(row[2] for row in rows)
+        }
+
+    def summary(self, top: int = 10, bucket: str = 'day') -> Dict:
+        """모든 지표"""
+        return {
+            'records': len(self.columns),
+            'vectorized': self.vectorized,
+            'heatmap': self.heatmap(),
+            'user_curves': self.user_curves(top, bucket),
+            'response_latency': self.response_latency(),
+            'churn': self.churn()
+        }
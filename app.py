@@ -1,21 +1,110 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response, g, Response
 from werkzeug.utils import secure_filename
 import os
+import threading
 from datetime import datetime
+from typing import Optional
+from exporter import EXPORT_FORMATS, encode_rows, gzip_chunks
+from heavy_hitters import TRENDING_WINDOWS
 from hybrid_storage import HybridStorage
+from instrumentation import RequestProfiler, Span, metrics
+from kakao_parser import parse_time_bound
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, clamp_page_size, decode_cursor
+from job_queue import CHUNK_SIZE, ChunkChecksumError, ChunkConflictError, UploadJobQueue
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# 하이브리드 저장소 초기화
-storage = HybridStorage()
+# 하이브리드 저장소 (첫 요청에서 생성: 콜드 스타트 때 SDK import/클라이언트 생성/네트워크 확인을 하지 않음)
+_storage: Optional[HybridStorage] = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> HybridStorage:
+    """하이브리드 저장소 (처음 호출할 때 생성)"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = HybridStorage()
+    return _storage
+
+_upload_jobs: Optional[UploadJobQueue] = None
+_upload_jobs_lock = threading.Lock()
+
+def get_upload_jobs() -> UploadJobQueue:
+    """업로드 백그라운드 처리 큐 (처음 호출할 때 작업 DB/스풀 디렉터리/워커 풀을 만들고 끝나지 않은 작업을 이어서 실행)"""
+    global _upload_jobs
+    if _upload_jobs is None:
+        with _upload_jobs_lock:
+            if _upload_jobs is None:
+                # 작업을 실행할 때 저장소 생성
+                _upload_jobs = UploadJobQueue(get_storage)
+    return _upload_jobs
+
+# 요청 단위 cProfile (PROFILE_REQUESTS=1일 때 ?profile=1 요청만)
+profiler = RequestProfiler()
+
+@app.before_request
+def start_request_trace():
+    """요청 처리 시간 측정 시작 (저장소 단계들은 이 요청 아래에 기록됨)"""
+    g.route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.request_span = Span('http', method=request.method, route=g.route).start()
+    g.profiler = profiler.start() if request.args.get('profile') == '1' else None
+
+@app.after_request
+def record_request_metrics(response):
+    """경로별 요청 수/상태 코드 기록, 측정한 프로파일은 파일로 저장하고 X-Profile 헤더로 알림"""
+    g.response_status = response.status_code
+    if g.get('profiler') is not None:
+        path = profiler.dump(g.profiler, f'{request.method}_{g.route}')
+        g.profiler = None
+        response.headers['X-Profile'] = os.path.basename(path)
+    return response
+
+@app.teardown_request
+def finish_request_trace(error=None):
+    """요청 처리 시간 기록 (처리되지 않은 예외도 500으로 집계)"""
+    request_span = g.pop('request_span', None)
+    if request_span is None:
+        return
+    status = g.get('response_status', 500)
+    request_span.set(status=status)
+    request_span.finish()
+    metrics.observe('kakao_http_request_duration_seconds', request_span.seconds,
+                    route=g.route, method=request.method)
+    metrics.inc('kakao_http_requests_total', route=g.route, method=request.method, status=str(status))
+
+def conditional_json(etag: str, build):
+    """ETag가 If-None-Match와 같으면 304, 아니면 build() 결과를 JSON으로 반환"""
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag, weak=True)
+    # 캐시는 하되 매번 서버에 재검증
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def time_range_args():
+    """?start=&end= 기간 조건을 epoch 초로 변환 (KST, end가 날짜만이면 그 날 포함), 잘못된 형식이면 ValueError"""
+    return parse_time_bound(request.args.get('start')), parse_time_bound(request.args.get('end'), end=True)
+
+def room_arg():
+    """?room= 방 식별자 (내보내기 파일 첫 줄의 방 이름, 없으면 전체 방)"""
+    return request.args.get('room') or None
+
+def page_args():
+    """?limit=&cursor= 검색 페이지 크기(MAX_PAGE_SIZE까지로 제한)와 다음 페이지 커서, 잘못된 형식이면 ValueError"""
+    cursor = request.args.get('cursor') or None
+    decode_cursor(cursor)
+    return clamp_page_size(request.args.get('limit')), cursor
 
 @app.route('/')
 def dashboard():
     """메인 대시보드"""
     try:
-        stats = storage.get_statistics()
+        stats = get_storage().get_statistics()
         return render_template('dashboard.html', stats=stats)
     except Exception as e:
         return render_template('dashboard.html', stats={}, error=str(e))
@@ -33,12 +122,20 @@ def upload():
         
         if file:
             try:
-                # 파일 내용 읽기
-                file_content = file.read().decode('utf-8')
                 filename = secure_filename(file.filename)
                 
-                # 업로드 처리
-                result = storage.process_upload(file_content, filename)
+                # 기본: 백그라운드 작업으로 등록하고 작업 id를 바로 반환
+                if request.args.get('sync') != '1':
+                    job_id = get_upload_jobs().submit(file.stream, filename)
+                    return jsonify({
+                        'success': True,
+                        'job_id': job_id,
+                        'status_url': url_for('api_job_status', job_id=job_id),
+                        'message': "📥 업로드를 접수했습니다. 처리 중입니다..."
+                    }), 202
+                
+                # 업로드 처리 (업로드 스트림을 그대로 파서에 전달)
+                result = get_storage().process_upload(file.stream, filename)
                 
                 if result['success']:
                     return jsonify({
@@ -54,35 +151,160 @@ def upload():
     
     return render_template('upload.html')
 
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """업로드 작업 진행 상황 (stage, lines_parsed, rows_written, 완료 시 result)"""
+    job = get_upload_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(job)
+
+@app.route('/api/uploads', methods=['POST'])
+def api_upload_begin():
+    """청크 업로드 시작 (JSON {"filename"}), 업로드 id와 권장 청크 크기 반환
+
+    청크는 PUT /api/uploads/<id>?offset=<받은 바이트 수>로 보내고(X-Chunk-Sha256 헤더에 본문 sha256),
+    다 보내면 POST /api/uploads/<id>/finalize로 끝낸다. 청크는 스풀 파일에 모아 두고 finalize 뒤에 파싱한다.
+    """
+    payload = request.get_json(silent=True) or {}
+    filename = secure_filename(payload.get('filename') or '') or 'upload.txt'
+    upload_id = get_upload_jobs().begin(filename)
+    return jsonify({
+        'upload_id': upload_id,
+        'offset': 0,
+        'chunk_size': CHUNK_SIZE,
+        'upload_url': url_for('api_upload_chunk', upload_id=upload_id),
+        'status_url': url_for('api_job_status', job_id=upload_id)
+    }), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def api_upload_chunk(upload_id):
+    """청크 하나 저장, 받은 바이트 수(다음 offset) 반환 (위치가 맞지 않으면 409와 이어 보낼 offset)"""
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({'error': 'offset이 필요합니다.'}), 400
+    try:
+        received = get_upload_jobs().append_chunk(
+            upload_id, offset, request.get_data(cache=False), request.headers.get('X-Chunk-Sha256')
+        )
+    except ChunkChecksumError as e:
+        return jsonify({'error': str(e)}), 400
+    except ChunkConflictError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    if received is None:
+        return jsonify({'error': '업로드를 찾을 수 없습니다.'}), 404
+    return jsonify({'offset': received})
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def api_upload_status(upload_id):
+    """청크 업로드 상태 (연결이 끊기면 bytes_received부터 이어 보냄)"""
+    return api_job_status(upload_id)
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def api_upload_finalize(upload_id):
+    """마지막 청크까지 보냈음을 알림 (JSON {"size"}가 있으면 받은 바이트 수와 비교)"""
+    size = (request.get_json(silent=True) or {}).get('size')
+    try:
+        job = get_upload_jobs().finish_upload(upload_id, None if size is None else int(size))
+    except ValueError:
+        return jsonify({'error': 'size는 정수여야 합니다.'}), 400
+    except ChunkConflictError as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    if job is None:
+        return jsonify({'error': '업로드를 찾을 수 없습니다.'}), 404
+    return jsonify({
+        'success': True,
+        'job_id': upload_id,
+        'status_url': url_for('api_job_status', job_id=upload_id),
+        'message': "📥 업로드를 모두 받았습니다. 처리 중입니다..."
+    }), 202
+
 @app.route('/search')
 def search():
     """검색 페이지"""
     keyword = request.args.get('keyword', '')
     nickname = request.args.get('nickname', '')
-    limit = int(request.args.get('limit', 100))
-    
-    if keyword or nickname:
-        results = storage.search(keyword=keyword, nickname=nickname, limit=limit)
-        return render_template('search.html', results=results, keyword=keyword, nickname=nickname)
+    room = room_arg()
+    try:
+        start, end = time_range_args()
+        limit, cursor = page_args()
+        if keyword or nickname or start is not None or end is not None or room is not None:
+            page = get_storage().search_page(keyword, nickname, limit, start, end, room, cursor)
+        else:
+            page = {'results': [], 'next_cursor': None}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return render_template('search.html', results=[], keyword='', nickname='')
+    # 다음 페이지 링크는 커서만 바꾼 같은 조건
+    query = {name: value for name, value in request.args.items() if name != 'cursor' and value}
+    return render_template('search.html', results=page['results'], next_cursor=page['next_cursor'],
+                           query=query, keyword=keyword, nickname=nickname,
+                           default_page_size=DEFAULT_PAGE_SIZE, max_page_size=MAX_PAGE_SIZE)
 
 @app.route('/api/search')
 def api_search():
     """API 검색 엔드포인트"""
     keyword = request.args.get('keyword', '')
     nickname = request.args.get('nickname', '')
-    limit = int(request.args.get('limit', 100))
+    room = room_arg()
+    try:
+        start, end = time_range_args()
+        limit, cursor = page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    storage = get_storage()
+    params = storage.normalize_search_params(keyword, nickname, limit, start, end, room, cursor)
+    try:
+        return conditional_json(
+            storage.etag('search', params),
+            lambda: dict(storage.search_page(keyword, nickname, limit, start, end, room, cursor), limit=limit)
+        )
+    except ValueError as e:
+        # 복제본/Supabase 전환으로 쓸 수 없게 된 커서
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/export')
+def api_export():
+    """검색 결과/방 전체 내보내기 (?format=ndjson|csv, 검색과 같은 조건, 조건이 없으면 전체)
+
+    행을 페이지 단위로 읽으면서 바로 전송하므로 메시지 수와 관계없이 메모리 사용량이 일정하다.
+    Accept-Encoding에 gzip이 있으면 전송하면서 압축한다.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'지원하지 않는 형식: {export_format}'}), 400
+    try:
+        start, end = time_range_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    results = storage.search(keyword=keyword, nickname=nickname, limit=limit)
-    return jsonify({'results': results})
+    rows = get_storage().iter_export(
+        request.args.get('keyword', ''), request.args.get('nickname', ''), start, end, room_arg()
+    )
+    body = encode_rows(rows, export_format)
+    filename = f"kakao_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.accept_encodings:
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, content_type=EXPORT_FORMATS[export_format], headers=headers)
 
 @app.route('/statistics')
 def statistics():
     """통계 API - JSON 형태로 반환"""
     try:
-        stats = storage.get_statistics()
-        return jsonify(stats)
+        start, end = time_range_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        room = room_arg()
+        storage = get_storage()
+        return conditional_json(
+            storage.etag('statistics', storage.normalize_range_params(start, end, room)),
+            lambda: storage.get_statistics(start, end, room)
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -90,16 +312,139 @@ def statistics():
 def api_statistics():
     """API 통계 엔드포인트"""
     try:
-        stats = storage.get_statistics()
-        return jsonify(stats)
+        start, end = time_range_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        room = room_arg()
+        storage = get_storage()
+        return conditional_json(
+            storage.etag('statistics', storage.normalize_range_params(start, end, room)),
+            lambda: storage.get_statistics(start, end, room)
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/backup/<cloudinary_id>')
+@app.route('/api/rooms')
+def api_rooms():
+    """방 목록 API (?room= 조건에 쓰는 room_key 목록)"""
+    try:
+        storage = get_storage()
+        return conditional_json(storage.etag('rooms'), lambda: {'rooms': storage.get_rooms()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/lookup')
+def api_users_lookup():
+    """닉네임 유사 조회 (?q=검색어&limit=10&room=, 같음/접두어/포함/n-gram 유사도 순)"""
+    try:
+        limit = int(request.args.get('limit', 10))
+        users = get_storage().find_users(request.args.get('q', ''), limit, room_arg())
+        return jsonify({'users': users})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/aliases', methods=['POST'])
+def api_merge_nicknames():
+    """이름을 바꾼 사용자의 닉네임 병합 (JSON {"alias": 이전 닉네임, "nickname": 대표 닉네임})"""
+    payload = request.get_json(silent=True) or {}
+    alias, nickname = payload.get('alias'), payload.get('nickname')
+    if not alias or not nickname:
+        return jsonify({'error': 'alias와 nickname이 필요합니다.'}), 400
+    result = get_storage().merge_nicknames(alias, nickname)
+    if result is None:
+        return jsonify({'error': '닉네임을 찾을 수 없습니다.'}), 404
+    return jsonify(result)
+
+@app.route('/api/users/aliases/<path:nickname>', methods=['DELETE'])
+def api_split_nickname(nickname):
+    """닉네임을 별칭 병합에서 떼어 냄"""
+    result = get_storage().split_nickname(nickname)
+    if result is None:
+        return jsonify({'error': '닉네임을 찾을 수 없습니다.'}), 404
+    return jsonify(result)
+
+# /api/analytics/<metric> 경로 이름 -> 분석 결과 키
+ANALYTICS_METRICS = {
+    'heatmap': 'heatmap',
+    'users': 'user_curves',
+    'latency': 'response_latency',
+    'churn': 'churn',
+}
+
+@app.route('/api/analytics')
+@app.route('/api/analytics/<metric>')
+def api_analytics(metric=None):
+    """활동 분석 API (?start=&end= 기간, ?room= 방, ?top=&bucket=day|week 사용자별 곡선)"""
+    # numpy를 쓰는 분석 모듈은 처음 분석할 때 import
+    from analytics import CURVE_BUCKETS
+    
+    if metric is not None and metric not in ANALYTICS_METRICS:
+        return jsonify({'error': f'지원하지 않는 분석 항목: {metric}'}), 404
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in CURVE_BUCKETS:
+        return jsonify({'error': f'지원하지 않는 구간: {bucket}'}), 400
+    try:
+        start, end = time_range_args()
+        top = int(request.args.get('top', 10))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    room = room_arg()
+    storage = get_storage()
+    
+    def build():
+        analytics = storage.get_analytics(start, end, top, bucket, room)
+        return analytics if metric is None else analytics[ANALYTICS_METRICS[metric]]
+    
+    try:
+        params = {**storage.normalize_range_params(start, end, room), 'top': top, 'bucket': bucket, 'metric': metric}
+        return conditional_json(storage.etag('analytics', params), build)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/keywords/trending')
+def api_trending_keywords():
+    """인기 키워드 API (?window=day|week|month 마지막 데이터 날짜까지의 기간, ?limit=, ?room= 방)"""
+    window = request.args.get('window', 'week')
+    if window not in TRENDING_WINDOWS:
+        return jsonify({'error': f'지원하지 않는 기간: {window}'}), 400
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    room = room_arg()
+    storage = get_storage()
+    try:
+        params = {**storage.normalize_range_params(room=room), 'window': window, 'limit': limit}
+        return conditional_json(
+            storage.etag('trending', params), lambda: storage.get_trending_keywords(window, limit, room)
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/keywords/user')
+def api_user_keywords():
+    """사용자별 상위 키워드 API (?nickname= 닉네임, 별칭 포함, ?limit=, ?room= 방)"""
+    nickname = (request.args.get('nickname') or '').strip()
+    if not nickname:
+        return jsonify({'error': 'nickname이 필요합니다.'}), 400
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        result = get_storage().get_user_keywords(nickname, limit, room_arg())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if result is None:
+        return jsonify({'error': '닉네임을 찾을 수 없습니다.'}), 404
+    return jsonify(result)
+
+@app.route('/backup/<path:cloudinary_id>')
 def backup(cloudinary_id):
     """백업 데이터 다운로드"""
     try:
-        backup_data = storage.get_backup(cloudinary_id)
+        backup_data = get_storage().get_backup(cloudinary_id)
         if backup_data:
             return jsonify(backup_data)
         else:
@@ -107,6 +452,32 @@ def backup(cloudinary_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/backup/<path:cloudinary_id>/restore', methods=['POST'])
+def restore_backup(cloudinary_id):
+    """백업을 스트리밍으로 내려받아 DB에 다시 적재 (?target=local|supabase)"""
+    result = get_storage().restore_backup(cloudinary_id, target=request.args.get('target', 'local'))
+    if result['success']:
+        return jsonify(result)
+    if result.get('error') == '백업 데이터를 찾을 수 없습니다.':
+        return jsonify(result), 404
+    return jsonify(result), 500
+
+@app.route('/health')
+def health():
+    """헬스 체크 (Supabase 확인 결과는 HEALTH_CHECK_TTL초 캐시), 조회를 처리할 수 없으면 503"""
+    status = get_storage().health()
+    return jsonify(status), 200 if status['ok'] else 503
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus 수집용 지표 (경로별 요청 시간, 백엔드/단계별 처리 시간, 행/바이트 수, 오류 수)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/traces')
+def api_traces():
+    """최근 요청/업로드 작업의 단계별 처리 시간 (최신순)"""
+    return jsonify({'traces': list(reversed(metrics.recent_traces))})
+
 @app.errorhandler(413)
 def too_large(e):
     """파일 크기 초과 오류"""
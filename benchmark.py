@@ -0,0 +1,801 @@
+"""카카오톡 대화 분석기 성능 벤치마크
+
+사용 예시:
+    python benchmark.py parser --lines 2000000
+    python benchmark.py ingest --messages 200000
+    python benchmark.py tokenizer --messages 200000
+    python benchmark.py bulk --rows 100000
+    python benchmark.py reimport --lines 200000
+    python benchmark.py snapshot --lines 200000
+    python benchmark.py analytics --lines 1000000
+    python benchmark.py rooms --rooms 4 --lines 100000
+    python benchmark.py users --lines 200000
+    python benchmark.py pages --lines 500000 --depths 1 10 100 1000
+    python benchmark.py trending --lines 500000 --vocabulary 20000
+    python benchmark.py startup --runs 5 --budget 500
+    python benchmark.py export --lines 1000000
+"""
+import argparse
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+NICKNAMES = [f"사용자{i}" for i in range(200)]
+PHRASES = [
+    "ㅋㅋㅋ", "감사합니다", "안녕하세요", "오늘 모임 몇 시에 시작하나요?",
+    "사진 공유합니다", "확인했습니다!", "내일 뵙겠습니다", "좋은 정보 감사해요 ㅎㅎ",
+    "https://example.com/article/1234", "다들 수고 많으셨습니다",
+]
+# 인기 키워드 벤치마크용 합성 키워드 (조사로 끝나 잘리는 음절 제외)
+KEYWORD_SYLLABLES = "강남산문말봄밤숲창컴퓨터게임노래영화여행축구야구커피라면치킨빵책시험회의"
+ZIPF_EXPONENT = 1.1
+WORDS_PER_MESSAGE = 4
+
+
+def keyword_vocabulary(size: int, seed: int = 42) -> List[str]:
+    """합성 키워드 size개 (한글 2~3음절, 중복 없음)"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(KEYWORD_SYLLABLES) for _ in range(rng.randint(2, 3))))
+    return sorted(words)
+
+
+def generate_export(path: str, lines: int, seed: int = 42, room: str = "벤치마크방", vocabulary: int = 0) -> int:
+    """합성 카카오톡 내보내기 파일 생성, 생성된 바이트 수 반환
+
+    vocabulary를 주면 메시지를 그 수만큼의 키워드에서 Zipf 분포로 뽑은 단어들로 만든다.
+    """
+    rng = random.Random(seed)
+    if vocabulary:
+        words = keyword_vocabulary(vocabulary, seed)
+        weights = list(itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, vocabulary + 1)))
+    written = 0
+    day = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(f"{room} 님과 카카오톡 대화\n저장한 날짜 : 2025-07-30 20:58:15\n\n")
+        for i in range(lines):
+            roll = rng.random()
+            if i % 5000 == 0:
+                day += 1
+                line = f"--------------- 2024년 {1 + (day // 28) % 12}월 {1 + day % 28}일 월요일 ---------------"
+            elif roll < 0.01:
+                line = f"{rng.choice(NICKNAMES)}님이 들어왔습니다."
+            elif roll < 0.015:
+                line = f"{rng.choice(NICKNAMES)}님이 나갔습니다."
+            elif roll < 0.05:
+                line = rng.choice(PHRASES)  # 여러 줄 메시지의 다음 줄
+            else:
+                hour = rng.randint(1, 12)
+                ampm = rng.choice(("오전", "오후"))
+                prefix = f"[{rng.choice(NICKNAMES)}] [{ampm} {hour}:{rng.randint(0, 59):02d}]"
+                if vocabulary:
+                    text = ' '.join(rng.choices(words, cum_weights=weights, k=WORDS_PER_MESSAGE))
+                else:
+                    text = rng.choice(PHRASES)
+                line = f"{prefix} {text}"
+            written += file.write(line + "\n")
+    return written
+
+
+def _run_parser(path: str, mode: str, result_queue) -> None:
+    """자식 프로세스에서 파서를 실행하고 결과를 전달"""
+    from kakao_parser import KakaoTalkParser
+
+    parser = KakaoTalkParser(path)
+    started = time.perf_counter()
+    if mode == 'list':
+        records = len(parser.parse_messages())
+    elif mode == 'parallel':
+        records = len(parser.parse_parallel()[0])
+    else:
+        records = sum(1 for _ in parser.iter_messages())
+    elapsed = time.perf_counter() - started
+    result_queue.put({'records': records, 'elapsed': elapsed})
+
+
+def run_isolated(target, *args) -> Dict:
+    """측정 대상을 별도 프로세스에서 실행하여 최대 RSS를 분리 측정"""
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=target, args=(*args, result_queue))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    # 리눅스에서 ru_maxrss 단위는 KB
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return result
+
+
+def bench_parser(args) -> None:
+    """파서 처리량(lines/sec)과 최대 RSS 측정"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'export.txt')
+        size = generate_export(path, args.lines)
+        print(f"📄 합성 파일: {args.lines:,} 줄, {size / 1024 / 1024:.1f} MB")
+
+        for mode in args.modes:
+            result = run_isolated(_run_parser, path, mode)
+            lines_per_sec = args.lines / result['elapsed']
+            print(f"  [{mode:>6}] {result['records']:,} 레코드 | {result['elapsed']:.2f}s | "
+                  f"{lines_per_sec:,.0f} lines/sec | peak RSS {result['peak_rss_mb']:.1f} MB")
+
+
+def _legacy_save_messages(db, messages: List) -> None:
+    """기존 방식: 메시지마다 INSERT + 사용자 SELECT/UPDATE + 키워드별 INSERT"""
+    with sqlite3.connect(db.db_path) as conn:
+        cursor = conn.cursor()
+        for msg in messages:
+            cursor.execute("SELECT id FROM user_dictionary WHERE nickname = ?", (msg['nickname'],))
+            row = cursor.fetchone()
+            if row:
+                user_id = row[0]
+            else:
+                cursor.execute(
+                    "INSERT INTO user_dictionary (nickname, canonical_id) VALUES (?, 0)", (msg['nickname'],)
+                )
+                user_id = cursor.lastrowid
+                cursor.execute("UPDATE user_dictionary SET canonical_id = id WHERE id = ?", (user_id,))
+            cursor.execute(
+                "INSERT INTO messages (message_type, user_id, time_str, message_text, raw_line) VALUES (?, ?, ?, ?, ?)",
+                (msg['type'], user_id, msg.get('time', ''), msg.get('message', ''), msg['raw_line'])
+            )
+            message_id = cursor.lastrowid
+            cursor.execute("SELECT id FROM users WHERE user_id = ?", (user_id,))
+            if cursor.fetchone():
+                cursor.execute(
+                    "UPDATE users SET last_seen = CURRENT_TIMESTAMP, total_messages = total_messages + ? WHERE user_id = ?",
+                    (1 if msg['type'] == 'message' else 0, user_id)
+                )
+            else:
+                cursor.execute(
+                    "INSERT INTO users (user_id, first_seen, last_seen, total_messages) VALUES (?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?)",
+                    (user_id, 1 if msg['type'] == 'message' else 0)
+                )
+            if msg['type'] == 'message' and msg.get('message'):
+                for position, keyword in db.tokenizer.tokenizer.tokenize(msg['message']):
+                    cursor.execute(
+                        "INSERT INTO keyword_index (message_id, keyword, position) VALUES (?, ?, ?)",
+                        (message_id, keyword, position)
+                    )
+        conn.commit()
+
+
+def bench_ingest(args) -> None:
+    """메시지 적재 처리량(messages/sec) 비교: 기존 행 단위 방식 vs 배치 적재"""
+    from kakao_database import KakaoTalkDatabase
+    from kakao_parser import KakaoTalkParser
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(export_path, args.messages)
+        messages = KakaoTalkParser(export_path).parse_messages()
+        more_path = os.path.join(tmp_dir, 'more.txt')
+        generate_export(more_path, args.messages, seed=7)
+        more_messages = KakaoTalkParser(more_path).parse_messages()
+        print(f"📥 적재 대상: {len(messages):,} 레코드")
+
+        cases = [
+            ('legacy', lambda db: _legacy_save_messages(db, messages)),
+            ('bulk', lambda db: db.save_messages(messages)),
+            # 이미 데이터가 있는 DB에 추가 적재 (인덱스 유지 경로)
+            ('append', lambda db: db.save_messages(more_messages)),
+            # 같은 메시지를 다시 저장 (내용 해시로 모두 건너뜀)
+            ('dup', lambda db: db.save_messages(messages)),
+        ]
+        db = None
+        for name, run in cases:
+            if name not in ('append', 'dup'):
+                db = KakaoTalkDatabase(os.path.join(tmp_dir, f'{name}.db'))
+            started = time.perf_counter()
+            run(db)
+            elapsed = time.perf_counter() - started
+            print(f"  [{name:>6}] {elapsed:.2f}s | {len(messages) / elapsed:,.0f} messages/sec")
+
+
+def bench_tokenizer(args) -> None:
+    """키워드 토큰화 처리량 비교: 캐시 없음 / LRU 캐시 + 일괄 처리"""
+    from korean_tokenizer import get_tokenizer
+    from kakao_parser import KakaoTalkParser
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(export_path, args.messages)
+        texts = [m['message'] for m in KakaoTalkParser(export_path).iter_messages() if m['type'] == 'message']
+
+    cached = get_tokenizer(args.tokenizer)
+    raw = cached.tokenizer
+
+    started = time.perf_counter()
+    for text in texts:
+        raw.tokenize(text)
+    uncached_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(0, len(texts), 5000):
+        cached.tokenize_many(texts[i:i + 5000])
+    cached_elapsed = time.perf_counter() - started
+
+    print(f"🔤 토크나이저 '{cached.name}', 메시지 {len(texts):,}개")
+    print(f"  [ uncached] {uncached_elapsed:.2f}s | {len(texts) / uncached_elapsed:,.0f} messages/sec")
+    print(f"  [   cached] {cached_elapsed:.2f}s | {len(texts) / cached_elapsed:,.0f} messages/sec | {cached.cache_info()}")
+
+
+def _start_rest_stub(latency: float, row_cost: float, failure_rate: float):
+    """PostgREST 삽입 엔드포인트를 흉내 내는 로컬 서버 (요청 지연 + 행당 삽입 비용, 일정 비율로 503 응답)"""
+    stored = set()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            rows = json.loads(body)
+            time.sleep(latency + len(rows) * row_cost)
+            if random.random() < failure_rate:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            with lock:
+                stored.update(row['idempotency_key'] for row in rows)
+            self.send_response(201)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stored
+
+
+def bench_bulk(args) -> None:
+    """Supabase 일괄 저장 처리량(rows/sec) 비교: 단일 요청 / 순차 배치 / 병렬 배치"""
+    from bulk_writer import SupabaseBulkWriter
+
+    rows = [
+        {'nickname': random.choice(NICKNAMES), 'message': random.choice(PHRASES),
+         'timestamp': '오후 3:05', 'message_type': 'text', 'idempotency_key': f'bench-{i}'}
+        for i in range(args.rows)
+    ]
+    server, stored = _start_rest_stub(args.latency, args.row_cost, args.failure_rate)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    print(f"📤 저장 대상: {len(rows):,}행 | 요청 지연 {args.latency * 1000:.0f}ms | 실패율 {args.failure_rate:.0%}")
+
+    cases = [
+        ('single', len(rows), 1),
+        ('serial', args.batch_size, 1),
+        ('parallel', args.batch_size, args.in_flight),
+    ]
+    try:
+        for name, batch_size, in_flight in cases:
+            stored.clear()
+            writer = SupabaseBulkWriter(base_url, 'bench-key', batch_size=batch_size,
+                                        max_in_flight=in_flight, backoff=0.05)
+            stats = writer.write(rows, f'bench-{name}')
+            writer.close()
+            print(f"  [{name:>8}] {stats['elapsed']:.2f}s | {stats['rows_per_sec']:,.0f} rows/sec | "
+                  f"배치 {stats['batches']} | 재시도 {stats['retries']} | 실패 {stats['failed_batches']} | "
+                  f"저장된 고유 행 {len(stored):,}")
+    finally:
+        server.shutdown()
+
+
+def bench_reimport(args) -> None:
+    """같은 방을 다시 내보낸 파일의 재적재 비교: 전체 적재 / 체크포인트 기반 증분 적재"""
+    from kakao_database import KakaoTalkDatabase
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        full_path = os.path.join(tmp_dir, 'full.txt')
+        old_path = os.path.join(tmp_dir, 'old.txt')
+        generate_export(full_path, args.lines)
+        # 며칠 전 내보낸 파일 = 같은 내용의 앞부분
+        with open(full_path, 'rb') as source, open(old_path, 'wb') as target:
+            for index, line in enumerate(source):
+                if index >= args.lines - args.new_lines:
+                    break
+                target.write(line)
+
+        db = KakaoTalkDatabase(os.path.join(tmp_dir, 'reimport.db'))
+        for name, path in (('initial', old_path), ('re-export', full_path), ('same file', full_path)):
+            started = time.perf_counter()
+            result = db.import_export(path)
+            elapsed = time.perf_counter() - started
+            print(f"  [{name:>9}] {elapsed:.2f}s | 새 레코드 {result['inserted']:,} | 파싱한 줄 {result['lines_read']:,} | "
+                  f"건너뛴 바이트 {result['skipped_bytes']:,}")
+
+
+def bench_snapshot(args) -> None:
+    """백업 형식 비교 (크기, 저장/복원 시간) 및 스냅샷 왕복 일치 확인"""
+    from kakao_parser import KakaoTalkParser
+    from snapshot import ZSTD_AVAILABLE, SnapshotReader, load_backup, write_snapshot
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(export_path, args.lines)
+        source_size = os.path.getsize(export_path)
+        parser = KakaoTalkParser(export_path)
+        records = parser.parse_messages()
+    metadata = {'room_info': {'name': '벤치마크방'}, 'statistics': parser.get_statistics(records)}
+    print(f"🗜️ 레코드 {len(records):,}개 | 원본 텍스트 {source_size / 1024 / 1024:.1f}MB")
+
+    def indented_json():
+        # 예전 JSON 백업 형식 (레코드마다 raw_line 포함, indent=2)
+        data = {'messages': [{**record.to_dict(), 'raw_line': record.raw_line} for record in records], **metadata}
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+    def compact_json():
+        data = {'messages': [record.to_dict() for record in records], **metadata}
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def snapshot(codec):
+        def write():
+            buffer = io.BytesIO()
+            write_snapshot(buffer, records, metadata, codec)
+            return buffer.getvalue()
+        return write
+
+    cases = [('json-indent', indented_json), ('json', compact_json), ('snap-gzip', snapshot('gzip'))]
+    if ZSTD_AVAILABLE:
+        cases.append(('snap-zstd', snapshot('zstd')))
+
+    for name, write in cases:
+        started = time.perf_counter()
+        data = write()
+        write_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if name.startswith('snap'):
+            reader = SnapshotReader(io.BytesIO(data))
+            restored = list(reader)
+            read_elapsed = time.perf_counter() - started
+            # 왕복 일치: 모든 필드와 메타데이터가 같아야 함
+            assert restored == records, f"{name}: 레코드가 일치하지 않습니다."
+            assert reader.metadata['statistics'] == metadata['statistics'], f"{name}: 메타데이터가 일치하지 않습니다."
+            assert load_backup(io.BytesIO(data))['messages'] == [record.to_dict() for record in records]
+        else:
+            json.loads(data)
+            read_elapsed = time.perf_counter() - started
+
+        print(f"  [{name:>11}] {len(data) / 1024 / 1024:7.2f}MB ({len(data) / source_size:.2f}x) | "
+              f"저장 {write_elapsed:.2f}s | 복원 {read_elapsed:.2f}s")
+    print("  ✅ 스냅샷 왕복 일치 확인")
+
+
+def bench_analytics(args) -> None:
+    """활동 분석 계산 시간 비교: NumPy 벡터 연산 / 순수 파이썬 (결과 일치 확인)"""
+    from analytics import NUMPY_AVAILABLE, ActivityAnalytics, ActivityColumns
+    from kakao_parser import KakaoTalkParser
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(export_path, args.lines)
+        started = time.perf_counter()
+        columns = ActivityColumns.from_records(KakaoTalkParser(export_path).iter_messages())
+        print(f"📊 레코드 {len(columns):,}개 | 컬럼 적재 {time.perf_counter() - started:.2f}s")
+
+    cases = [('python', False)]
+    if NUMPY_AVAILABLE:
+        cases.append(('numpy', True))
+    else:
+        print("  ⚠️ numpy가 설치되지 않아 순수 파이썬만 측정합니다.")
+
+    results = {}
+    for name, vectorized in cases:
+        started = time.perf_counter()
+        summary = ActivityAnalytics(columns, vectorized=vectorized).summary()
+        elapsed = time.perf_counter() - started
+        summary.pop('vectorized')
+        results[name] = summary
+        print(f"  [{name:>6}] {elapsed:.3f}s | {len(columns) / elapsed:,.0f} records/sec")
+    if len(results) == 2:
+        assert results['python'] == results['numpy'], "NumPy와 순수 파이썬 결과가 다릅니다."
+        print("  ✅ 결과 일치 확인")
+
+
+def bench_rooms(args) -> None:
+    """여러 방 적재/조회 비교: 단일 SQLite 파일 순차 적재 / 방별 샤드 병렬 적재"""
+    from room_router import RoomRouter
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for index in range(args.rooms):
+            path = os.path.join(tmp_dir, f'room{index}.txt')
+            generate_export(path, args.lines, seed=index, room=f"벤치마크방{index}")
+            paths.append(path)
+        print(f"🏠 방 {args.rooms}개 x {args.lines:,}줄")
+
+        layouts = (
+            ('single', RoomRouter(os.path.join(tmp_dir, 'single.db'))),
+            ('sharded', RoomRouter(os.path.join(tmp_dir, 'catalog.db'), os.path.join(tmp_dir, 'shards'))),
+        )
+        for name, router in layouts:
+            started = time.perf_counter()
+            results = router.import_many(paths, workers=args.workers)
+            elapsed = time.perf_counter() - started
+            inserted = sum(result['inserted'] for result in results)
+            print(f"  [{name:>7}] 적재 {elapsed:.2f}s | {inserted / elapsed:,.0f} records/sec")
+
+            room_key = "벤치마크방0"
+            for label, query in (
+                ('방 통계', lambda: router.get_statistics(room_key)),
+                ('방 기간 통계', lambda: router.get_statistics(room_key, start=0, end=2 ** 31)),
+                ('방 검색', lambda: router.search(room_key, limit=100, nickname="사용자1")),
+            ):
+                started = time.perf_counter()
+                for _ in range(args.queries):
+                    query()
+                per_query = (time.perf_counter() - started) / args.queries
+                print(f"            {label}: {per_query * 1000:.2f}ms")
+            router.close()
+
+
+def bench_users(args) -> None:
+    """닉네임 조건 검색 비교: 행마다 닉네임 문자열 LIKE / 사용자 사전 n-gram 색인 + user_id 인덱스"""
+    from kakao_database import KakaoTalkDatabase
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(path, args.lines)
+        db = KakaoTalkDatabase(os.path.join(tmp_dir, 'users.db'))
+        inserted = db.import_export(path)['inserted']
+        print(f"👤 레코드 {inserted:,}개 적재 (닉네임 {len(NICKNAMES)}개)")
+
+        def like_scan(nickname: str) -> List:
+            # 사전 도입 전 방식: 최신 행부터 닉네임 문자열을 LIKE로 비교
+            with db.pool.reader() as conn:
+                return conn.execute('''
+                    SELECT m.*, d.nickname FROM messages m CROSS JOIN user_dictionary d ON d.id = m.user_id
+                    WHERE d.nickname LIKE ? ORDER BY m.id DESC LIMIT 100
+                ''', (f'%{nickname}%',)).fetchall()
+
+        for label, nickname in (('여러 사용자', '사용자1'), ('한 사용자', '사용자42'), ('없는 닉네임', '없는사용자')):
+            for mode, query in (
+                ('like', lambda: like_scan(nickname)),
+                ('dictionary', lambda: db.search_messages(nickname=nickname, limit=100)),
+            ):
+                started = time.perf_counter()
+                for _ in range(args.queries):
+                    rows = query()
+                per_query = (time.perf_counter() - started) / args.queries
+                print(f"  [{label}] {mode:>10}: {per_query * 1000:.2f}ms | {len(rows)}건")
+
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            db.find_users('사용자4', 10)
+        print(f"  [유사 조회] {(time.perf_counter() - started) / args.queries * 1000:.2f}ms")
+        db.close()
+
+
+def bench_pages(args) -> None:
+    """깊은 검색 페이지 비교: 커서(이전 페이지 마지막 키 다음부터) / limit을 키워 처음부터 다시 읽기"""
+    from room_router import RoomRouter
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(path, args.lines)
+        router = RoomRouter(os.path.join(tmp_dir, 'pages.db'))
+        inserted = router.import_many([path])[0]['inserted']
+        print(f"📄 레코드 {inserted:,}개 적재 (페이지당 {args.page_size}건)")
+
+        for label, room_key in (('전체', None), ('방', "벤치마크방")):
+            # 페이지 키를 따라가며 각 깊이의 페이지를 여는 키를 모아 둠
+            keys = {1: None}
+            after = None
+            for page in range(1, max(args.depths)):
+                rows = router.search(room_key, limit=args.page_size, after=after, message_type='message')
+                after = router.next_page_key(rows)
+                if after is None:
+                    break
+                keys[page + 1] = after
+            for depth in args.depths:
+                if depth not in keys:
+                    print(f"  [{label}] {depth}페이지: 결과 없음")
+                    continue
+                for mode, query in (
+                    ('cursor', lambda: router.search(room_key, limit=args.page_size, after=keys[depth],
+                                                     message_type='message')),
+                    ('limit', lambda: router.search(room_key, limit=args.page_size * depth,
+                                                    message_type='message')[-args.page_size:]),
+                ):
+                    started = time.perf_counter()
+                    for _ in range(args.queries):
+                        rows = query()
+                    per_query = (time.perf_counter() - started) / args.queries
+                    print(f"  [{label}] {depth:>5}페이지 {mode:>6}: {per_query * 1000:.2f}ms | {len(rows)}건")
+        router.close()
+
+
+def _exact_top(conn, query: str, params: tuple, limit: int) -> Dict[str, int]:
+    """키워드 인덱스 GROUP BY로 계산한 정확한 빈도 (상위 limit개, 음수면 전체)"""
+    return dict(conn.execute(f'{query} GROUP BY k.keyword ORDER BY COUNT(*) DESC LIMIT ?', (*params, limit)).fetchall())
+
+
+def _compare_top(estimated: List[Dict], exact: Dict[str, int], k: int) -> Dict:
+    """추정 상위 k개와 정확한 빈도 비교 (k번째 빈도와 같은 동점 키워드도 정답으로 인정)"""
+    ranked = sorted(exact.values(), reverse=True)
+    threshold = ranked[min(k, len(ranked)) - 1] if ranked else 0
+    reported = estimated[:k]
+    hits = sum(exact.get(row['keyword'], 0) >= threshold for row in reported)
+    errors = [
+        (row['frequency'] - exact.get(row['keyword'], 0)) / max(exact.get(row['keyword'], 0), 1)
+        for row in reported
+    ]
+    bounded = all(
+        row['frequency'] - row['error'] <= exact.get(row['keyword'], 0) <= row['frequency'] for row in reported
+    )
+    return {
+        'recall': hits / min(k, len(ranked)) if ranked else 1.0,
+        'max_error': max(errors, default=0.0),
+        'bounded': bounded,
+    }
+
+
+def bench_trending(args) -> None:
+    """인기 키워드 비교: 하루치 요약(Count-Min Sketch + Space-Saving) 합치기 / 키워드 인덱스 전체 GROUP BY (정확도 포함)"""
+    from heavy_hitters import TRENDING_WINDOWS, window_start
+    from kakao_database import KakaoTalkDatabase
+    from kakao_parser import day_start_timestamp
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(path, args.lines, vocabulary=args.vocabulary)
+        db = KakaoTalkDatabase(os.path.join(tmp_dir, 'trending.db'))
+        started = time.perf_counter()
+        inserted = db.import_export(path)['inserted']
+        elapsed = time.perf_counter() - started
+        with db.pool.reader() as conn:
+            keyword_rows = conn.execute('SELECT COUNT(*) FROM keyword_index').fetchone()[0]
+            summary_bytes = conn.execute('''
+                SELECT (SELECT COALESCE(SUM(LENGTH(sketch) + LENGTH(top_keywords)), 0) FROM keyword_windows)
+                     + (SELECT COALESCE(SUM(LENGTH(top_keywords)), 0) FROM user_keywords)
+            ''').fetchone()[0]
+        print(f"🔥 레코드 {inserted:,}개 적재 {elapsed:.2f}s | 키워드 {keyword_rows:,}행 (어휘 {args.vocabulary:,}개)"
+              f" | 요약 {summary_bytes / 1024:,.0f}KB")
+
+        until = db.latest_keyword_day()
+        exact_window = '''
+            SELECT k.keyword, COUNT(*) FROM keyword_index k JOIN messages m ON m.id = k.message_id
+            WHERE m.ts >= ? AND m.ts < ?
+        '''
+        for window, days in TRENDING_WINDOWS.items():
+            since = window_start(until, days)
+            bounds = (day_start_timestamp(since), day_start_timestamp(until) + 86400)
+            started = time.perf_counter()
+            for _ in range(args.queries):
+                estimated = db.keyword_window(since, until).top(args.top)
+            sketch_ms = (time.perf_counter() - started) / args.queries * 1000
+            started = time.perf_counter()
+            for _ in range(args.queries):
+                with db.pool.reader() as conn:
+                    exact = _exact_top(conn, exact_window, bounds, -1)
+            exact_ms = (time.perf_counter() - started) / args.queries * 1000
+            result = _compare_top(estimated, exact, args.top)
+            print(f"  [{window:>5}] 요약 {sketch_ms:.2f}ms / GROUP BY {exact_ms:.2f}ms"
+                  f" | 상위 {args.top} 재현율 {result['recall']:.0%}"
+                  f" | 최대 과대 추정 {result['max_error']:.2%} | 오차 범위 {'유지' if result['bounded'] else '벗어남'}")
+
+        # 사용자별 상위 키워드 (별칭 병합 없이 닉네임 하나 기준)
+        exact_user = '''
+            SELECT k.keyword, COUNT(*) FROM keyword_index k JOIN messages m ON m.id = k.message_id
+            JOIN user_dictionary d ON d.id = m.user_id WHERE d.nickname = ?
+        '''
+        recalls, bounded = [], True
+        for nickname in NICKNAMES[:args.users]:
+            estimated = db.user_keyword_summary(nickname).top(args.user_top)
+            with db.pool.reader() as conn:
+                exact = _exact_top(conn, exact_user, (nickname,), -1)
+            result = _compare_top(estimated, exact, args.user_top)
+            recalls.append(result['recall'])
+            bounded = bounded and result['bounded']
+        print(f"  [사용자] {len(recalls)}명 상위 {args.user_top} 재현율 평균 {statistics.mean(recalls):.0%}"
+              f" / 최소 {min(recalls):.0%} | 오차 범위 {'유지' if bounded else '벗어남'}")
+        db.close()
+
+
+def _run_export(db_path: str, mode: str, result_queue) -> None:
+    """자식 프로세스에서 방 전체를 NDJSON(+gzip)으로 내보내고 첫 청크까지 시간/전체 시간/바이트 수 전달"""
+    from exporter import encode_rows, gzip_chunks, iter_ndjson
+    from local_replica import to_supabase_row
+    from room_router import RoomRouter
+
+    router = RoomRouter(db_path)
+    room_keys = router.room_keys()
+    started = time.perf_counter()
+    first_chunk = None
+    size = 0
+    if mode == 'list':
+        # 기존 방식: 결과 전체를 목록으로 만든 뒤 한 번에 직렬화
+        rows = [to_supabase_row(row, room_keys) for row in router.search(limit=10 ** 9, message_type='message')]
+        chunks = [''.join(iter_ndjson(rows)).encode('utf-8')]
+    else:
+        rows = (to_supabase_row(row, room_keys) for row in router.iter_messages(message_type='message'))
+        chunks = encode_rows(rows, 'ndjson')
+        if mode == 'gzip':
+            chunks = gzip_chunks(chunks)
+    for chunk in chunks:
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - started
+        size += len(chunk)
+    router.close()
+    result_queue.put({'first_chunk': first_chunk, 'elapsed': time.perf_counter() - started, 'bytes': size})
+
+
+def bench_export(args) -> None:
+    """방 전체 내보내기: 목록으로 만든 뒤 직렬화 / 키셋 페이지 스트리밍 / 스트리밍 + gzip (최대 RSS 비교)"""
+    from room_router import RoomRouter
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, 'export.txt')
+        generate_export(export_path, args.lines)
+        db_path = os.path.join(tmp_dir, 'export.db')
+        router = RoomRouter(db_path)
+        inserted = router.import_export(export_path)['inserted']
+        router.close()
+        print(f"📦 레코드 {inserted:,}개 적재")
+
+        for mode in args.modes:
+            result = run_isolated(_run_export, db_path, mode)
+            print(f"  [{mode:>6}] 첫 청크 {result['first_chunk'] * 1000:.0f}ms | 전체 {result['elapsed']:.2f}s | "
+                  f"{result['bytes'] / 1024 / 1024:.1f} MB | 최대 RSS {result['peak_rss_mb']:.0f} MB")
+
+
+# 새 인터프리터에서 app import부터 첫 응답까지 시간 측정 (마지막 줄에 JSON 출력)
+STARTUP_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+finished = time.perf_counter()
+print(json.dumps({'import': imported - started, 'first_response': finished - started, 'status': response.status_code}))
+'''
+
+
+def bench_startup(args) -> None:
+    """콜드 스타트 측정: 새 프로세스마다 app import 시간과 첫 응답까지 시간 (중앙값을 예산과 비교)"""
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 로컬 DB/작업 큐/백업은 임시 디렉터리에 (실행마다 빈 상태에서 시작)
+        for run in range(args.runs):
+            run_dir = os.path.join(tmp_dir, str(run))
+            os.makedirs(run_dir)
+            env = {
+                **os.environ,
+                'LOCAL_DB_PATH': os.path.join(run_dir, 'kakao_chat.db'),
+                'JOB_DB_PATH': os.path.join(run_dir, 'kakao_jobs.db'),
+                'JOB_SPOOL_DIR': os.path.join(run_dir, 'uploads'),
+                'BACKUP_STORE': 'local',
+                'BACKUP_DIR': os.path.join(run_dir, 'backups'),
+            }
+            started = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, '-c', STARTUP_PROBE, args.path],
+                cwd=project_dir, env=env, capture_output=True, text=True
+            )
+            process_seconds = time.perf_counter() - started
+            if completed.returncode != 0:
+                print(f"❌ 측정 프로세스 오류:\n{completed.stderr.strip()}")
+                raise SystemExit(1)
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            result['process'] = process_seconds
+            results.append(result)
+
+    print(f"🚀 콜드 스타트 {args.runs}회 ({args.path}, 응답 {results[-1]['status']})")
+    for field, label in (('import', 'app import'), ('first_response', 'import~첫 응답'),
+                         ('process', '프로세스 시작~종료')):
+        values = [result[field] * 1000 for result in results]
+        print(f"  {label}: 중앙값 {statistics.median(values):.1f}ms | 최대 {max(values):.1f}ms")
+    first_response = statistics.median(result['first_response'] for result in results) * 1000
+    if first_response > args.budget:
+        print(f"  ❌ 예산 초과: {first_response:.1f}ms > {args.budget:.0f}ms")
+        raise SystemExit(1)
+    print(f"  ✅ 예산 이내: {first_response:.1f}ms <= {args.budget:.0f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="카카오톡 대화 분석기 벤치마크")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_bench = subparsers.add_parser('parser', help="파서 처리량 측정")
+    parser_bench.add_argument('--lines', type=int, default=2_000_000)
+    # RUSAGE_CHILDREN은 누적 최대값이므로 메모리를 적게 쓰는 모드를 먼저 실행
+    parser_bench.add_argument('--modes', nargs='+', default=['stream', 'list', 'parallel'],
+                              choices=['stream', 'list', 'parallel'])
+    parser_bench.set_defaults(func=bench_parser)
+
+    ingest_bench = subparsers.add_parser('ingest', help="DB 적재 처리량 측정")
+    ingest_bench.add_argument('--messages', type=int, default=200_000)
+    ingest_bench.set_defaults(func=bench_ingest)
+
+    tokenizer_bench = subparsers.add_parser('tokenizer', help="키워드 토큰화 처리량 측정")
+    tokenizer_bench.add_argument('--messages', type=int, default=200_000)
+    tokenizer_bench.add_argument('--tokenizer', default='hangul')
+    tokenizer_bench.set_defaults(func=bench_tokenizer)
+
+    bulk_bench = subparsers.add_parser('bulk', help="Supabase 일괄 저장 처리량 측정 (로컬 REST 대역 서버)")
+    bulk_bench.add_argument('--rows', type=int, default=100_000)
+    bulk_bench.add_argument('--batch-size', type=int, default=500)
+    bulk_bench.add_argument('--in-flight', type=int, default=4)
+    bulk_bench.add_argument('--latency', type=float, default=0.02)
+    # 연결 하나가 초당 약 5만 행을 삽입하는 것으로 가정
+    bulk_bench.add_argument('--row-cost', type=float, default=0.00002)
+    bulk_bench.add_argument('--failure-rate', type=float, default=0.05)
+    bulk_bench.set_defaults(func=bench_bulk)
+
+    reimport_bench = subparsers.add_parser('reimport', help="겹치는 내보내기 파일 증분 재적재 측정")
+    reimport_bench.add_argument('--lines', type=int, default=200_000)
+    reimport_bench.add_argument('--new-lines', type=int, default=500)
+    reimport_bench.set_defaults(func=bench_reimport)
+
+    snapshot_bench = subparsers.add_parser('snapshot', help="백업 형식 크기/속도 비교")
+    snapshot_bench.add_argument('--lines', type=int, default=200_000)
+    snapshot_bench.set_defaults(func=bench_snapshot)
+
+    analytics_bench = subparsers.add_parser('analytics', help="활동 분석 계산 시간 비교 (NumPy / 순수 파이썬)")
+    analytics_bench.add_argument('--lines', type=int, default=1_000_000)
+    analytics_bench.set_defaults(func=bench_analytics)
+
+    rooms_bench = subparsers.add_parser('rooms', help="여러 방 적재/조회 비교 (단일 파일 / 방별 샤드)")
+    rooms_bench.add_argument('--rooms', type=int, default=4)
+    rooms_bench.add_argument('--lines', type=int, default=100_000)
+    rooms_bench.add_argument('--workers', type=int, default=None)
+    rooms_bench.add_argument('--queries', type=int, default=20)
+    rooms_bench.set_defaults(func=bench_rooms)
+
+    users_bench = subparsers.add_parser('users', help="닉네임 조건 검색 비교 (문자열 LIKE / 사용자 사전 인덱스)")
+    users_bench.add_argument('--lines', type=int, default=200_000)
+    users_bench.add_argument('--queries', type=int, default=20)
+    users_bench.set_defaults(func=bench_users)
+
+    pages_bench = subparsers.add_parser('pages', help="깊은 검색 페이지 비교 (커서 / limit 키우기)")
+    pages_bench.add_argument('--lines', type=int, default=500_000)
+    pages_bench.add_argument('--page-size', type=int, default=100)
+    pages_bench.add_argument('--depths', type=int, nargs='+', default=[1, 10, 100, 1000])
+    pages_bench.add_argument('--queries', type=int, default=10)
+    pages_bench.set_defaults(func=bench_pages)
+
+    trending_bench = subparsers.add_parser('trending', help="인기 키워드 비교 (스트리밍 요약 / 정확한 GROUP BY, 정확도)")
+    trending_bench.add_argument('--lines', type=int, default=500_000)
+    trending_bench.add_argument('--vocabulary', type=int, default=20_000)
+    trending_bench.add_argument('--top', type=int, default=20)
+    trending_bench.add_argument('--users', type=int, default=20)
+    trending_bench.add_argument('--user-top', type=int, default=5)
+    trending_bench.add_argument('--queries', type=int, default=5)
+    trending_bench.set_defaults(func=bench_trending)
+
+    export_bench = subparsers.add_parser('export', help="방 전체 내보내기 비교 (스트리밍 / 스트리밍+gzip / 목록)")
+    export_bench.add_argument('--lines', type=int, default=1_000_000)
+    export_bench.add_argument('--modes', nargs='+', default=['stream', 'gzip', 'list'],
+                              choices=['list', 'stream', 'gzip'])
+    export_bench.set_defaults(func=bench_export)
+
+    startup_bench = subparsers.add_parser('startup', help="콜드 스타트 측정 (app import~첫 응답, 예산 초과 시 종료 코드 1)")
+    startup_bench.add_argument('--runs', type=int, default=5)
+    startup_bench.add_argument('--path', default='/health')
+    startup_bench.add_argument('--budget', type=float, default=500, help="import~첫 응답 중앙값 예산 (ms)")
+    startup_bench.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import BinaryIO, ContextManager, Dict, Iterator
+
+# 로컬 저장소에 파일을 복사할 때의 청크 크기
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobNotFoundError(Exception):
+    """저장소에 해당 백업이 없는 경우"""
+
+
+class BlobStore(ABC):
+    """백업 파일 저장소 인터페이스 (Cloudinary, 로컬 파일 시스템)"""
+
+    # 처리 시간 측정 시 백엔드 레이블
+    backend = 'blob'
+
+    @abstractmethod
+    def put(self, public_id: str, stream: BinaryIO, file_format: str) -> Dict:
+        """스트림을 처음부터 저장하고 {"public_id", "secure_url"} 반환"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def open(self, public_id: str) -> ContextManager[BinaryIO]:
+        """저장된 백업을 스트림으로 여는 컨텍스트 관리자 (구현은 @contextmanager, 전체를 메모리에 올리지 않고 청크 단위로 읽음)"""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """로컬 디렉터리에 백업을 저장하는 저장소 (개발/테스트용 Cloudinary 대역)"""
+
+    backend = 'local'
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, public_id: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, public_id))
+        # public_id로 저장소 밖의 경로를 가리키지 못하게 함
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"잘못된 백업 id: {public_id}")
+        return path
+
+    def put(self, public_id: str, stream: BinaryIO, file_format: str) -> Dict:
+        path = self._path(public_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stream.seek(0)
+        with open(path, 'wb') as target:
+            shutil.copyfileobj(stream, target, COPY_CHUNK_SIZE)
+        return {"public_id": public_id, "secure_url": f"file://{path}"}
+
+    @contextmanager
+    def open(self, public_id: str) -> Iterator[BinaryIO]:
+        path = self._path(public_id)
+        if not os.path.isfile(path):
+            raise BlobNotFoundError(public_id)
+        with open(path, 'rb') as stream:
+            yield stream
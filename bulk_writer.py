@@ -0,0 +1,200 @@
+import importlib.util
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+# requests는 삽입기를 만들 때 import (설치 여부만 먼저 확인해 import 시간 단축)
+REQUESTS_AVAILABLE = importlib.util.find_spec('requests') is not None
+if not REQUESTS_AVAILABLE:
+    print("⚠️ requests 패키지가 설치되지 않았습니다. 일괄 저장 기능을 사용할 수 없습니다.")
+
+# 일괄 저장 기본 설정
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_SECONDS = 0.5
+DEFAULT_TIMEOUT_SECONDS = 30
+
+# 재시도할 HTTP 상태 코드 (요청 시간 초과, 과부하, 서버 오류)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class BulkWriteError(Exception):
+    """재시도 후에도 실패한 배치"""
+
+
+class SupabaseBulkWriter:
+    """PostgREST(Supabase REST) 일괄 삽입기
+
+    행을 batch_size 단위로 나누어 재사용하는 HTTP 세션으로 최대 max_in_flight 개 배치를 동시에 보낸다.
+    실패한 배치는 지수 백오프로 재시도하며, 각 행의 idempotency_key에 대한 on_conflict +
+    ignore-duplicates 덕분에 서버에는 반영되었지만 응답을 못 받은 배치를 다시 보내도 중복되지 않는다.
+    """
+
+    def __init__(self,
+                 base_url: str,
+                 api_key: str,
+                 table: str = 'messages',
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF_SECONDS,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 conflict_column: str = 'idempotency_key'):
+        if not REQUESTS_AVAILABLE:
+            raise RuntimeError("requests 패키지가 필요합니다.")
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.endpoint = f"{base_url.rstrip('/')}/rest/v1/{table}"
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.conflict_column = conflict_column
+
+        # 연결을 재사용하도록 동시 전송 수만큼 커넥션 풀 확보
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'apikey': api_key,
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+            'Prefer': 'return=minimal,resolution=ignore-duplicates',
+        })
+
+    def open(self, upload_key: str) -> 'BulkWriteSession':
+        """업로드 하나에 대한 스트리밍 저장 세션 시작"""
+        return BulkWriteSession(self, upload_key)
+
+    def write(self, rows: Iterable[Dict], upload_key: str) -> Dict:
+        """행 전체를 저장하고 처리량 통계 반환"""
+        with self.open(upload_key) as session:
+            session.add(rows)
+        return session.stats
+
+    def send_batch(self, rows: List[Dict], batch_key: str) -> int:
+        """배치 하나 전송 (재시도 포함), 재시도 횟수 반환"""
+        import requests
+        body = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+        params = {'on_conflict': self.conflict_column} if self.conflict_column else None
+        headers = {'Idempotency-Key': batch_key}
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(
+                    self.endpoint, data=body, params=params, headers=headers, timeout=self.timeout
+                )
+                if response.status_code < 300:
+                    return attempt
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise BulkWriteError(f"배치 {batch_key} 저장 실패: HTTP {response.status_code} {response.text[:200]}")
+                retry_after = response.headers.get('Retry-After')
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = str(e)
+
+            if attempt == self.max_retries:
+                raise BulkWriteError(f"배치 {batch_key} 저장 실패 ({attempt + 1}회 시도): {error}")
+
+            # 지수 백오프 + 지터 (서버가 Retry-After를 주면 그 값을 우선)
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            time.sleep(delay)
+
+        return self.max_retries
+
+    def close(self):
+        self.session.close()
+
+
+class BulkWriteSession:
+    """행을 받아 배치로 묶어 비동기 전송하는 세션 (전송 중 배치가 가득 차면 add()가 대기)"""
+
+    def __init__(self, writer: SupabaseBulkWriter, upload_key: str):
+        self.writer = writer
+        self.upload_key = upload_key
+        self.executor = ThreadPoolExecutor(max_workers=writer.max_in_flight, thread_name_prefix='bulk-write')
+        self.slots = threading.BoundedSemaphore(writer.max_in_flight)
+        self.lock = threading.Lock()
+        self.buffer: List[Dict] = []
+        self.futures = []
+        self.batch_count = 0
+        self.rows_written = 0
+        self.retries = 0
+        self.errors: List[str] = []
+        self.started = time.perf_counter()
+        self.stats: Dict = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, rows: Iterable[Dict]):
+        """행 추가 (batch_size가 찰 때마다 전송)"""
+        for row in rows:
+            self.buffer.append(row)
+            if len(self.buffer) >= self.writer.batch_size:
+                self._submit()
+
+    def _submit(self):
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        batch_key = f"{self.upload_key}-{self.batch_count}"
+        self.batch_count += 1
+
+        # 백프레셔: 전송 중인 배치 수가 상한에 도달하면 하나가 끝날 때까지 대기
+        self.slots.acquire()
+        future = self.executor.submit(self.writer.send_batch, rows, batch_key)
+        future.add_done_callback(lambda f, n=len(rows): self._on_done(f, n))
+        self.futures.append(future)
+
+    def _on_done(self, future, row_count: int):
+        self.slots.release()
+        with self.lock:
+            error = future.exception()
+            if error is None:
+                self.rows_written += row_count
+                self.retries += future.result()
+            else:
+                self.errors.append(str(error))
+
+    def close(self) -> Dict:
+        """남은 행을 전송하고 모든 배치가 끝날 때까지 대기 후 통계 반환"""
+        if self.stats:
+            return self.stats
+        self._submit()
+        self.executor.shutdown(wait=True)
+        elapsed = time.perf_counter() - self.started
+        self.stats = {
+            'rows': self.rows_written,
+            'batches': self.batch_count,
+            'failed_batches': len(self.errors),
+            'retries': self.retries,
+            'elapsed': elapsed,
+            'rows_per_sec': self.rows_written / elapsed if elapsed > 0 else 0.0,
+            'errors': self.errors[:5],
+        }
+        return self.stats
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+
+def create_bulk_writer(base_url: Optional[str], api_key: Optional[str], **options) -> Optional[SupabaseBulkWriter]:
+    """설정이 갖춰져 있으면 일괄 삽입기 생성"""
+    if not (REQUESTS_AVAILABLE and base_url and api_key):
+        return None
+    return SupabaseBulkWriter(base_url, api_key, **options)
@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Set
+
+# 연결마다 적용하는 PRAGMA 기본값
+DEFAULT_CACHE_SIZE_KB = 64 * 1024       # 페이지 캐시 64MB
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024   # 메모리 맵 256MB
+DEFAULT_CACHED_STATEMENTS = 256         # 연결별 컴파일된 SQL 문 캐시 개수
+DEFAULT_BUSY_TIMEOUT = 30.0             # 잠금 대기 최대 시간 (초)
+DEFAULT_MAX_IDLE_READERS = 8            # 반납된 읽기 연결을 닫지 않고 보관하는 최대 개수
+
+
+class ConnectionPool:
+    """SQLite 연결 풀: 빌려 쓰고 반납하는 읽기 연결 + 단일 쓰기 연결
+
+    연결을 재사용하므로 스키마 읽기와 SQL 문 컴파일(cached_statements)을 요청마다 반복하지 않는다.
+    읽기 연결은 스레드에 묶지 않고 사용이 끝나면 반납하므로, 요청마다 스레드를 만드는 서버에서도
+    열린 연결 수는 동시에 조회 중인 수 + max_idle_readers개를 넘지 않는다.
+    WAL 모드에서는 적재 중인 쓰기 연결과 별개로 읽기 연결들이 동시에 조회할 수 있다.
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 cache_size_kb: int = DEFAULT_CACHE_SIZE_KB,
+                 mmap_size: int = DEFAULT_MMAP_SIZE,
+                 cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+                 busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+                 max_idle_readers: int = DEFAULT_MAX_IDLE_READERS):
+        self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.busy_timeout = busy_timeout
+        self.max_idle_readers = max_idle_readers
+        # 메모리 DB는 연결마다 별도 DB가 되므로 쓰기 연결 하나를 공유
+        self.shared_memory = db_path == ':memory:'
+
+        # 열린 읽기 연결 전체와 그중 반납되어 대기 중인 연결 (최근 반납한 연결부터 재사용)
+        self._readers: Set[sqlite3.Connection] = set()
+        self._idle: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._metrics = {
+            'reader_hits': 0,
+            'reader_opens': 0,
+            'reader_closes': 0,
+            'writer_acquires': 0,
+            'writer_waits': 0,
+            'writer_wait_seconds': 0.0,
+        }
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """PRAGMA가 설정된 새 연결 생성 (트랜잭션은 호출하는 쪽에서 BEGIN으로 직접 관리)"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        if read_only:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """단일 쓰기 연결 획득 (다른 스레드가 사용 중이면 대기)"""
+        started = None
+        if not self._writer_lock.acquire(blocking=False):
+            started = time.perf_counter()
+            self._writer_lock.acquire()
+
+        try:
+            self._metrics['writer_acquires'] += 1
+            if started is not None:
+                self._metrics['writer_waits'] += 1
+                self._metrics['writer_wait_seconds'] += time.perf_counter() - started
+            if self._writer is None:
+                self._writer = self._connect()
+            yield self._writer
+        finally:
+            self._writer_lock.release()
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """읽기 연결을 빌려 쓰고 블록이 끝나면 반납 (대기 중인 연결이 없으면 새로 연결)"""
+        if self.shared_memory:
+            with self.writer() as conn:
+                yield conn
+            return
+
+        with self._readers_lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self._metrics['reader_hits'] += 1
+        if conn is None:
+            conn = self._connect(read_only=True)
+            with self._readers_lock:
+                self._readers.add(conn)
+                self._metrics['reader_opens'] += 1
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _release(self, conn: sqlite3.Connection):
+        """읽기 연결 반납 (보관 개수를 넘었거나 풀이 닫힌 뒤면 연결을 닫음)"""
+        with self._readers_lock:
+            if conn in self._readers and len(self._idle) < self.max_idle_readers:
+                self._idle.append(conn)
+                return
+            self._readers.discard(conn)
+            self._metrics['reader_closes'] += 1
+        conn.close()
+
+    def get_metrics(self) -> Dict:
+        """풀 사용 통계"""
+        metrics = dict(self._metrics)
+        metrics['open_readers'] = len(self._readers)
+        metrics['idle_readers'] = len(self._idle)
+        metrics['writer_open'] = self._writer is not None
+        return metrics
+
+    def close(self):
+        """대기 중인 연결과 쓰기 연결 닫기 (사용 중인 읽기 연결은 반납할 때 닫힘)"""
+        with self._readers_lock:
+            for conn in self._idle:
+                self._readers.discard(conn)
+                conn.close()
+            self._idle.clear()
+            # 사용 중인 연결은 목록에서만 빼 두어 반납할 때 닫히게 함
+            self._readers.clear()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
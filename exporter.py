@@ -0,0 +1,64 @@
+import csv
+import io
+import itertools
+import json
+import zlib
+from typing import Dict, Iterable, Iterator
+
+# 내보내기 형식 -> Content-Type
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+# 내보내는 필드 (검색 결과와 같은 이름)
+EXPORT_FIELDS = ('id', 'room_key', 'ts', 'timestamp', 'nickname', 'message', 'message_type')
+# 인코딩한 행을 이만큼 모아서 내보냄 (작은 쓰기가 많아지지 않게)
+EXPORT_FLUSH_BYTES = 64 * 1024
+# gzip 압축 수준 (전송 중 압축이라 속도 쪽으로)
+GZIP_LEVEL = 6
+
+
+def iter_ndjson(rows: Iterable[Dict]) -> Iterator[str]:
+    """한 줄에 메시지 하나인 JSON (인코더를 재사용해 행마다 json.dumps 설정을 만들지 않음)"""
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for row in rows:
+        yield encode({field: row.get(field) for field in EXPORT_FIELDS}) + '\n'
+
+
+def iter_csv(rows: Iterable[Dict]) -> Iterator[str]:
+    """머리행 + 메시지 행 CSV (엑셀에서 한글이 깨지지 않도록 BOM으로 시작)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    values = ([row.get(field) for field in EXPORT_FIELDS] for row in rows)
+    for record in itertools.chain([EXPORT_FIELDS], values):
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def encode_rows(rows: Iterable[Dict], export_format: str) -> Iterator[bytes]:
+    """행을 형식에 맞게 인코딩해 EXPORT_FLUSH_BYTES 단위 바이트 청크로 반환"""
+    lines = iter_csv(rows) if export_format == 'csv' else iter_ndjson(rows)
+    pending = []
+    size = 0
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size >= EXPORT_FLUSH_BYTES:
+            yield ''.join(pending).encode('utf-8')
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending).encode('utf-8')
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """청크를 gzip 스트림으로 압축 (청크마다 sync flush해 받는 쪽이 바로 풀 수 있게 함)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,210 @@
+import hashlib
+import heapq
+import json
+import operator
+import zlib
+from array import array
+from collections import Counter
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Count-Min Sketch 크기 (추정치 초과분 <= 창 전체 키워드 수 x e/폭, 확률 1 - e^-깊이)
+SKETCH_WIDTH = 2048
+SKETCH_DEPTH = 4
+# 기간(하루치) 요약의 Space-Saving 카운터 수
+WINDOW_TOP_CAPACITY = 256
+# 사용자별 요약의 Space-Saving 카운터 수
+USER_TOP_CAPACITY = 32
+# 인기 키워드 기간 이름 -> 일 수 (마지막 데이터 날짜 포함)
+TRENDING_WINDOWS = {'day': 1, 'week': 7, 'month': 30}
+# 하루치 요약을 보관하는 일 수 (가장 긴 기간만큼, 그보다 오래된 요약은 삭제)
+TRENDING_RETENTION_DAYS = max(TRENDING_WINDOWS.values())
+
+
+def window_start(until: str, days: int) -> str:
+    """마지막 날짜(YYYY-MM-DD)를 포함해 days일 기간의 첫 날짜"""
+    return (date.fromisoformat(until) - timedelta(days=days - 1)).isoformat()
+
+
+class CountMinSketch:
+    """Count-Min Sketch (키워드 빈도 추정, 항상 실제보다 크거나 같음)
+
+    보수적 갱신(conservative update)으로 추가하므로 같은 크기에서 일반 갱신보다 과대 추정이 작다.
+    카운터를 더해서 합칠 수 있어 하루치 요약을 모아 주/월 단위로, 방별 요약을 모아 전체로 계산한다.
+    """
+
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH, counts: Optional[array] = None):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else array('Q', bytes(8 * width * depth))
+
+    def _cells(self, item: str) -> List[int]:
+        # 해시 두 개의 선형 결합으로 행마다 다른 위치 (Kirsch-Mitzenmacher)
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        width = self.width
+        return [row * width + (first + row * second) % width for row in range(self.depth)]
+
+    def add(self, item: str, count: int = 1):
+        counts = self.counts
+        cells = self._cells(item)
+        target = min(counts[cell] for cell in cells) + count
+        for cell in cells:
+            if counts[cell] < target:
+                counts[cell] = target
+
+    def estimate(self, item: str) -> int:
+        counts = self.counts
+        return min(counts[cell] for cell in self._cells(item))
+
+    def merge(self, other: 'CountMinSketch'):
+        self.counts = array('Q', map(operator.add, self.counts, other.counts))
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(self.counts.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH) -> 'CountMinSketch':
+        counts = array('Q')
+        counts.frombytes(zlib.decompress(data))
+        if len(counts) != width * depth:
+            raise ValueError(f'스케치 크기가 다릅니다: {len(counts)} != {width * depth}')
+        return cls(width, depth, counts)
+
+
+class SpaceSaving:
+    """Space-Saving 상위 빈도 요약 (카운터 capacity개, 항목 -> [빈도, 최대 과대 추정치])
+
+    카운터가 가득 찬 요약에 없는 항목의 실제 빈도는 최소 카운터 값 이하이므로,
+    합칠 때 없는 쪽의 빈도를 그 값으로 두면 (빈도 - 오차) <= 실제 빈도 <= 빈도가 유지된다.
+    """
+
+    def __init__(self, capacity: int, counters: Optional[Dict[str, List[int]]] = None):
+        self.capacity = capacity
+        self.counters: Dict[str, List[int]] = counters or {}
+
+    def floor(self) -> int:
+        """요약에 없는 항목의 빈도 상한 (카운터가 남아 있으면 0)"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def update(self, counts: Dict[str, int]):
+        """정확한 빈도 묶음(적재 트랜잭션 하나의 집계)을 반영"""
+        self._combine({item: (count, 0) for item, count in counts.items()}, 0)
+
+    def merge(self, other: 'SpaceSaving'):
+        self._combine(other.counters, other.floor())
+
+    def _combine(self, counters: Dict[str, Tuple[int, int]], other_floor: int):
+        floor = self.floor()
+        merged = {}
+        for item in self.counters.keys() | counters.keys():
+            count, error = self.counters.get(item, (floor, floor))
+            other_count, other_error = counters.get(item, (other_floor, other_floor))
+            merged[item] = [count + other_count, error + other_error]
+        if len(merged) > self.capacity:
+            kept = heapq.nlargest(self.capacity, merged.items(), key=lambda entry: entry[1][0])
+            merged = dict(kept)
+        self.counters = merged
+
+    def top(self, limit: int, estimate: Optional[Callable[[str], int]] = None) -> List[Dict]:
+        """빈도 상위 limit개 {'keyword', 'frequency', 'error'} (실제 빈도는 frequency - error 이상 frequency 이하)
+
+        estimate(Count-Min Sketch)를 주면 두 상한 중 작은 값을 빈도로 쓴다.
+        """
+        rows = []
+        for item, (count, error) in self.counters.items():
+            upper = count if estimate is None else min(count, estimate(item))
+            rows.append({'keyword': item, 'frequency': upper, 'error': upper - max(count - error, 0)})
+        rows.sort(key=lambda row: (-row['frequency'], row['keyword']))
+        return rows[:limit] if limit >= 0 else rows
+
+    def to_json(self) -> str:
+        return json.dumps(self.counters, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str, capacity: int) -> 'SpaceSaving':
+        return cls(capacity, json.loads(text))
+
+
+class HeavyHitters:
+    """한 기간의 키워드 요약 (Count-Min Sketch 빈도 추정 + Space-Saving 상위 후보)"""
+
+    def __init__(self, sketch: Optional[CountMinSketch] = None, counters: Optional[SpaceSaving] = None):
+        self.sketch = sketch or CountMinSketch()
+        self.counters = counters or SpaceSaving(WINDOW_TOP_CAPACITY)
+
+    def update(self, counts: Dict[str, int]):
+        for item, count in counts.items():
+            self.sketch.add(item, count)
+        self.counters.update(counts)
+
+    def merge(self, other: 'HeavyHitters'):
+        self.sketch.merge(other.sketch)
+        self.counters.merge(other.counters)
+
+    def top(self, limit: int) -> List[Dict]:
+        return self.counters.top(limit, self.sketch.estimate)
+
+
+def merge_summaries(summaries: Iterable[Optional[HeavyHitters]]) -> Optional[HeavyHitters]:
+    """요약 여러 개를 하나로 (모두 None이면 None)"""
+    merged = None
+    for summary in summaries:
+        if summary is None:
+            continue
+        if merged is None:
+            merged = summary
+        else:
+            merged.merge(summary)
+    return merged
+
+
+class KeywordTrends:
+    """적재 중인 키워드를 날짜별/사용자별 정확한 빈도로 모음 (트랜잭션 끝에서 요약에 한 번씩 반영)"""
+
+    def __init__(self, retention_days: int = TRENDING_RETENTION_DAYS):
+        self.retention_days = retention_days
+        self.days: Dict[str, Counter] = {}
+        self.users: Dict[int, Counter] = {}
+        self.latest: Optional[str] = None
+
+    def add(self, day: Optional[str], user_id: int, keyword: str):
+        if day:
+            counts = self.days.get(day)
+            if counts is None:
+                counts = self._new_day(day)
+            if counts is not None:
+                counts[keyword] += 1
+        counts = self.users.get(user_id)
+        if counts is None:
+            counts = self.users[user_id] = Counter()
+        counts[keyword] += 1
+
+    def _new_day(self, day: str) -> Optional[Counter]:
+        """날짜 카운터 생성, 보관 기간 밖의 날짜면 None (내보내기는 시간순이라 지난 날짜 카운터는 바로 버림)"""
+        if self.latest is None or day > self.latest:
+            self.latest = day
+            cutoff = window_start(day, self.retention_days)
+            for stale in [stale for stale in self.days if stale < cutoff]:
+                del self.days[stale]
+        elif day < window_start(self.latest, self.retention_days):
+            return None
+        counts = self.days[day] = Counter()
+        return counts
+
+    def __bool__(self) -> bool:
+        return bool(self.days or self.users)
+
+
+def trending_keywords(window: str, until: Optional[str], summary: Optional[HeavyHitters], limit: int) -> Dict:
+    """인기 키워드 결과 {'window', 'since', 'until', 'keywords'} (기간은 마지막 데이터 날짜까지 TRENDING_WINDOWS일)"""
+    since = window_start(until, TRENDING_WINDOWS[window]) if until else None
+    return {
+        'window': window,
+        'since': since,
+        'until': until,
+        'keywords': summary.top(limit) if summary is not None else [],
+    }
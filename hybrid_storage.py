@@ -1,251 +1,1210 @@
+import contextvars
+import hashlib
+import importlib.util
+import io
 import json
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Iterator, Union, BinaryIO, Callable, Tuple
 import os
 
-# 환경 변수 확인 및 조건부 import
-try:
-    import cloudinary
-    import cloudinary.uploader
-    from supabase import create_client, Client
-    CLOUDINARY_AVAILABLE = True
-    SUPABASE_AVAILABLE = True
-except ImportError:
-    CLOUDINARY_AVAILABLE = False
-    SUPABASE_AVAILABLE = False
+# 업로드 처리 시 한 번에 파싱/저장하는 메시지 수
+UPLOAD_BATCH_SIZE = 1000
+# 파이프라인 단계 사이에 대기할 수 있는 최대 배치 수 (메모리 상한)
+PIPELINE_DEPTH = 4
+# 백업 스냅샷을 메모리에 유지하는 최대 크기 (초과하면 익명 임시 파일로 전환)
+BACKUP_SPOOL_SIZE = 8 * 1024 * 1024
+# Cloudinary 백업 파일 확장자 (압축 컬럼 스냅샷)
+SNAPSHOT_FORMAT = "kksnap"
+# 백업 복원 대상
+RESTORE_TARGETS = ('local', 'supabase')
+# 중복 확인 조회 한 번에 넣는 키 수 (요청 URL 길이 제한)
+EXISTENCE_CHECK_BATCH_SIZE = 200
+# messages 테이블 중복 판정 키 (같은 내용이라도 방이 다르면 다른 메시지)
+MESSAGE_CONFLICT_COLUMNS = 'room_key,idempotency_key'
+# 로컬 복제본 동기화 시 한 번에 받는 행 수
+REPLICA_SYNC_PAGE_SIZE = 1000
+# Supabase에서 내보낼 때 한 번에 받는 행 수 (PostgREST 기본 최대 행 수)
+EXPORT_PAGE_SIZE = 1000
+# 사용자 조회 결과 기본 개수
+USER_LOOKUP_LIMIT = 10
+
+from blob_store import BlobNotFoundError, BlobStore, LocalBlobStore
+from bulk_writer import REQUESTS_AVAILABLE, create_bulk_writer
+from incremental_import import IncrementalImport, RecordHasher
+from instrumentation import current_span, note_error, span, traced
+from local_replica import LocalReplica
+from kakao_parser import to_timestamp
+from korean_tokenizer import get_tokenizer
+from pagination import DEFAULT_PAGE_SIZE, clamp_page_size, decode_cursor, encode_cursor
+from response_cache import MISSING, TTLCache
+from rollups import RollupAccumulator, summarize_user_statistics
+from snapshot import SnapshotWriter, load_backup, open_backup
+from user_dictionary import score_nickname
+
+# 설치 여부만 확인하고 SDK는 처음 사용할 때 import (콜드 스타트 시간 단축)
+CLOUDINARY_AVAILABLE = importlib.util.find_spec('cloudinary') is not None
+SUPABASE_AVAILABLE = importlib.util.find_spec('supabase') is not None
+if not (CLOUDINARY_AVAILABLE and SUPABASE_AVAILABLE):
     print("⚠️ cloudinary 또는 supabase 패키지가 설치되지 않았습니다.")
 
-class CloudinaryStorage:
-    """Cloudinary를 사용한 JSON 파일 저장"""
+class PipelineStage:
+    """배치를 큐로 받아 별도 스레드에서 처리하는 업로드 파이프라인 단계"""
+    
+    _STOP = object()
+    
+    def __init__(self, name: str, handler: Callable, depth: int = PIPELINE_DEPTH, stream: bool = False):
+        """stream=True이면 handler를 한 번만 호출해 배치 이터레이터를 넘김 (한 트랜잭션으로 저장하는 단계용)"""
+        self.handler = handler
+        self.stream = stream
+        self.error = None
+        self._stopped = False
+        self.queue = queue.Queue(maxsize=depth)
+        # 단계 측정이 호출한 쪽(업로드) 단계 아래에 기록되도록 실행 컨텍스트를 이어받음
+        context = contextvars.copy_context()
+        self.thread = threading.Thread(target=context.run, args=(self._run,), name=f"upload-{name}", daemon=True)
+        self.thread.start()
+    
+    def _batches(self):
+        while not self._stopped:
+            batch = self.queue.get()
+            if batch is self._STOP:
+                self._stopped = True
+                return
+            yield batch
+    
+    def _run(self):
+        if self.stream:
+            try:
+                self.handler(self._batches())
+            except Exception as e:
+                self.error = e
+            # 오류가 난 뒤에도 큐는 끝까지 비워서 생산자가 막히지 않게 함
+            for _ in self._batches():
+                pass
+            return
+        while True:
+            batch = self.queue.get()
+            if batch is self._STOP:
+                return
+            # 오류가 난 뒤에도 큐는 끝까지 비워서 생산자가 막히지 않게 함
+            if self.error is None:
+                try:
+                    self.handler(batch)
+                except Exception as e:
+                    self.error = e
+    
+    def put(self, batch: List[Dict]):
+        """배치 전달 (큐가 가득 차면 대기)"""
+        self.queue.put(batch)
+    
+    def finish(self):
+        """남은 배치를 모두 처리할 때까지 기다리고 단계에서 난 오류를 다시 발생"""
+        self.queue.put(self._STOP)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+class CloudinaryStorage(BlobStore):
+    """Cloudinary를 사용한 백업 파일 저장"""
+    
+    backend = 'cloudinary'
     
     def __init__(self):
+        self._module = None
+        self._lock = threading.Lock()
         if not CLOUDINARY_AVAILABLE:
             print("⚠️ Cloudinary를 사용할 수 없습니다.")
-            return
-            
-        try:
-            cloudinary.config(
-                cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-                api_key=os.getenv('CLOUDINARY_API_KEY'),
-                api_secret=os.getenv('CLOUDINARY_API_SECRET')
-            )
-        except Exception as e:
-            print(f"⚠️ Cloudinary 설정 오류: {e}")
     
-    def upload_json(self, data: Dict, filename: str) -> Dict:
-        """JSON 데이터를 Cloudinary에 업로드"""
+    def _cloudinary(self):
+        """cloudinary 모듈 (처음 사용할 때 import하고 설정)"""
+        with self._lock:
+            if self._module is None:
+                import cloudinary
+                import cloudinary.api
+                import cloudinary.exceptions
+                import cloudinary.uploader
+                try:
+                    cloudinary.config(
+                        cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+                        api_key=os.getenv('CLOUDINARY_API_KEY'),
+                        api_secret=os.getenv('CLOUDINARY_API_SECRET')
+                    )
+                except Exception as e:
+                    print(f"⚠️ Cloudinary 설정 오류: {e}")
+                self._module = cloudinary
+            return self._module
+    
+    def put(self, public_id: str, stream: BinaryIO, file_format: str) -> Dict:
+        """스트림을 처음부터 raw 리소스로 업로드"""
         if not CLOUDINARY_AVAILABLE:
             print("⚠️ Cloudinary를 사용할 수 없습니다.")
             return {"public_id": "local_test", "secure_url": "local://test"}
             
         try:
-            json_string = json.dumps(data, ensure_ascii=False, indent=2)
-            result = cloudinary.uploader.upload(
-                json_string,
-                public_id=f"chat_data/{filename}",
+            stream.seek(0)
+            result = self._cloudinary().uploader.upload(
+                stream,
+                public_id=public_id,
                 resource_type="raw",
-                format="json"
+                format=file_format
             )
             return result
         except Exception as e:
             print(f"Cloudinary 업로드 오류: {e}")
             return {"public_id": "error", "secure_url": "error://test"}
     
-    def download_json(self, public_id: str) -> Optional[Dict]:
-        """Cloudinary에서 JSON 파일 다운로드"""
+    @contextmanager
+    def open(self, public_id: str) -> Iterator[BinaryIO]:
+        """Cloudinary 백업을 HTTP 스트리밍으로 열기 (응답 본문을 청크 단위로 읽음)"""
+        if not CLOUDINARY_AVAILABLE or not REQUESTS_AVAILABLE:
+            raise BlobNotFoundError("Cloudinary를 사용할 수 없습니다.")
+        
+        import requests
+        cloudinary = self._cloudinary()
         try:
             result = cloudinary.api.resource(public_id, resource_type="raw")
-            download_url = result['secure_url']
-            # 실제로는 requests를 사용해서 다운로드해야 함
-            return {"download_url": download_url}
-        except Exception as e:
-            print(f"Cloudinary 다운로드 오류: {e}")
-            return None
+        except cloudinary.exceptions.NotFound:
+            raise BlobNotFoundError(public_id)
+        with requests.get(result['secure_url'], stream=True, timeout=60) as response:
+            response.raise_for_status()
+            # 전송 압축(Content-Encoding)은 풀어서 전달
+            response.raw.decode_content = True
+            yield response.raw
 
 class SupabaseStorage:
     """Supabase를 사용한 분석용 데이터베이스"""
     
     def __init__(self):
+        # 대량 저장은 PostgREST에 직접 배치 단위로 병렬 전송 (requests가 없으면 클라이언트 insert 사용)
+        self.bulk_writer = create_bulk_writer(
+            os.getenv('SUPABASE_URL'),
+            os.getenv('SUPABASE_ANON_KEY'),
+            batch_size=int(os.getenv('SUPABASE_BATCH_SIZE', 500)),
+            max_in_flight=int(os.getenv('SUPABASE_MAX_IN_FLIGHT', 4)),
+            conflict_column=MESSAGE_CONFLICT_COLUMNS
+        )
+        # 클라이언트는 처음 사용할 때 생성 (생성에 실패하면 False)
+        self._client = None
+        self._client_lock = threading.Lock()
+        
         if not SUPABASE_AVAILABLE:
             print("⚠️ Supabase를 사용할 수 없습니다.")
-            self.supabase = None
-            return
-            
-        try:
-            self.supabase: Client = create_client(
-                os.getenv('SUPABASE_URL'),
-                os.getenv('SUPABASE_ANON_KEY')
-            )
-        except Exception as e:
-            print(f"⚠️ Supabase 설정 오류: {e}")
-            self.supabase = None
     
-    def init_database(self):
-        """데이터베이스 초기화(테이블 생성)"""
+    @property
+    def supabase(self):
+        """Supabase 클라이언트 (처음 사용할 때 import/생성, 사용할 수 없으면 None)"""
+        if self._client is None and SUPABASE_AVAILABLE:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from supabase import create_client
+                        self._client = create_client(
+                            os.getenv('SUPABASE_URL'),
+                            os.getenv('SUPABASE_ANON_KEY')
+                        )
+                    except Exception as e:
+                        print(f"⚠️ Supabase 설정 오류: {e}")
+                        self._client = False
+        return self._client or None
+    
+    @traced('supabase.health')
+    def check(self) -> Dict:
+        """messages 테이블 조회 한 번으로 연결 확인 (테이블은 SQL 에디터에서 직접 생성)"""
+        checked_at = datetime.now().isoformat()
         if not self.supabase:
-            print("⚠️ Supabase를 사용할 수 없습니다.")
-            return
-            
-        # Supabase에서는 SQL 에디터에서 직접 테이블 생성
-        # 여기서는 테이블 존재 여부 확인
+            return {'available': False, 'ok': False, 'checked_at': checked_at}
+        
+        started = time.perf_counter()
         try:
             self.supabase.table('messages').select('id').limit(1).execute()
-            print("✅ Supabase 테이블 확인 완료")
+            return {
+                'available': True, 'ok': True, 'checked_at': checked_at,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
         except Exception as e:
             print(f"⚠️ Supabase 테이블 확인 실패: {e}")
+            note_error(e)
+            return {'available': True, 'ok': False, 'checked_at': checked_at, 'error': str(e)}
     
-    def save_messages(self, messages: List[Dict]) -> bool:
-        """메시지들을 Supabase에 저장"""
-        if not self.supabase:
+    @property
+    def available(self) -> bool:
+        """메시지를 저장할 수 있는지 (클라이언트 또는 일괄 삽입기)"""
+        return bool(self.supabase) or self.bulk_writer is not None
+    
+    @staticmethod
+    def to_rows(messages: Iterable[Dict], hashes: Iterable[str], room_key: Optional[str] = None) -> List[Dict]:
+        """메시지들을 Supabase 행 형식으로 변환
+        
+        (room_key, idempotency_key(레코드 내용 해시))는 UNIQUE라 재전송된 배치나 다시 올린 내보내기 파일의
+        같은 메시지는 중복 저장되지 않는다. 방 머리말이 없는 파일은 room_key가 빈 문자열(기본 방)이다.
+        """
+        room_key = room_key or ''
+        rows = []
+        for msg, content_hash in zip(messages, hashes):
+            if msg['type'] == 'message':
+                rows.append({
+                    'nickname': msg['nickname'],
+                    'message': msg['message'],
+                    'timestamp': msg.get('time', ''),
+                    'ts': to_timestamp(msg.get('date'), msg.get('time')),
+                    'message_type': 'text',
+                    'room_key': room_key,
+                    'idempotency_key': content_hash
+                })
+        return rows
+    
+    def begin_bulk_write(self, upload_key: str):
+        """업로드 하나를 스트리밍으로 저장하는 세션 (일괄 삽입기가 없으면 None)"""
+        if self.bulk_writer is None:
+            return None
+        return self.bulk_writer.open(upload_key)
+    
+    def save_messages(self, messages: Iterable[Dict], upload_key: str = None, room_key: Optional[str] = None) -> bool:
+        """메시지들을 Supabase에 저장 (배치 단위 병렬 전송, 실패한 배치는 재시도)"""
+        if not self.available:
             print("⚠️ Supabase를 사용할 수 없습니다. 메시지 저장을 건너뜁니다.")
             return False
+        
+        # 메시지 데이터를 Supabase 형식으로 변환
+        messages = list(messages)
+        hasher = RecordHasher()
+        supabase_messages = self.to_rows(messages, [hasher.hash(msg) for msg in messages], room_key)
+        if not supabase_messages:
+            return False
+        return self.save_rows(supabase_messages, upload_key or uuid.uuid4().hex)
+    
+    @traced('supabase.save_rows')
+    def save_rows(self, rows: List[Dict], upload_key: str) -> bool:
+        """변환된 행 저장 (이미 있는 (room_key, idempotency_key)는 무시)"""
+        try:
+            if self.bulk_writer is not None:
+                stats = self.bulk_writer.write(rows, upload_key)
+                if stats['failed_batches']:
+                    print(f"❌ 메시지 저장 오류: {stats['failed_batches']}개 배치 실패 ({stats['errors'][0]})")
+                    return False
+                print(f"✅ {stats['rows']}개 메시지 저장 완료 ({stats['rows_per_sec']:.0f} rows/s)")
+                return True
             
+            # requests가 없으면 클라이언트로 배치 단위 저장 (요청 크기 상한)
+            for start in range(0, len(rows), UPLOAD_BATCH_SIZE):
+                self.supabase.table('messages').upsert(
+                    rows[start:start + UPLOAD_BATCH_SIZE],
+                    on_conflict=MESSAGE_CONFLICT_COLUMNS,
+                    ignore_duplicates=True
+                ).execute()
+            print(f"✅ {len(rows)}개 메시지 저장 완료")
+            return True
+        except Exception as e:
+            print(f"❌ 메시지 저장 오류: {e}")
+            note_error(e)
+            return False
+    
+    @traced('supabase.existence_check')
+    def drop_existing(self, messages: List[Dict], hashes: List[str],
+                      room_key: Optional[str] = None) -> Tuple[List[Dict], List[str]]:
+        """방에 이미 저장된 메시지를 제외 (체크포인트가 맞지 않아 파일 전체를 다시 읽을 때 집계 중복 방지)"""
+        if not self.supabase:
+            return messages, hashes
+        
+        keys = [h for msg, h in zip(messages, hashes) if msg['type'] == 'message']
+        existing = set()
         try:
-            # 메시지 데이터를 Supabase 형식으로 변환
-            supabase_messages = []
-            for msg in messages:
-                if msg['type'] == 'message':
-                    supabase_messages.append({
-                        'nickname': msg['nickname'],
-                        'message': msg['message'],
-                        'timestamp': msg.get('time', ''),
-                        'message_type': 'text'
-                    })
+            for start in range(0, len(keys), EXISTENCE_CHECK_BATCH_SIZE):
+                result = self.supabase.table('messages').select('idempotency_key') \
+                    .eq('room_key', room_key or '') \
+                    .in_('idempotency_key', keys[start:start + EXISTENCE_CHECK_BATCH_SIZE]).execute()
+                existing.update(row['idempotency_key'] for row in result.data)
+        except Exception as e:
+            print(f"⚠️ 중복 메시지 확인 실패: {e}")
+            note_error(e)
+            return messages, hashes
+        
+        kept = [(msg, h) for msg, h in zip(messages, hashes) if h not in existing]
+        return [msg for msg, _ in kept], [h for _, h in kept]
+    
+    @traced('supabase.import_state')
+    def get_import_state(self, room_key: str) -> Optional[Dict]:
+        """방의 증분 적재 체크포인트 조회"""
+        if not self.supabase:
+            return None
             
-            if supabase_messages:
-                self.supabase.table('messages').insert(supabase_messages).execute()
-                print(f"✅ {len(supabase_messages)}개 메시지 저장 완료")
-                return True
+        try:
+            result = self.supabase.table('import_state') \
+                .select('room_key,byte_offset,prefix_sha256,day_hashes') \
+                .eq('room_key', room_key).limit(1).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"⚠️ 증분 적재 체크포인트 조회 실패: {e}")
+            note_error(e)
+            return None
+    
+    @traced('supabase.save_import_state')
+    def save_import_state(self, state: Dict) -> bool:
+        """방의 증분 적재 체크포인트 저장"""
+        if not self.supabase:
             return False
+            
+        try:
+            self.supabase.table('import_state').upsert(
+                {**state, 'updated_at': datetime.now().isoformat()}, on_conflict='room_key'
+            ).execute()
+            return True
         except Exception as e:
-            print(f"❌ 메시지 저장 오류: {e}")
+            print(f"❌ 증분 적재 체크포인트 저장 오류: {e}")
+            note_error(e)
             return False
     
-    def search_messages(self, keyword: str = None, nickname: str = None, limit: int = 100) -> List[Dict]:
-        """Supabase에서 메시지 검색"""
+    @traced('supabase.search')
+    def search_messages(self, keyword: str = None, nickname: str = None, limit: int = 100,
+                        start: Optional[int] = None, end: Optional[int] = None,
+                        room_key: Optional[str] = None, after: Optional[Tuple] = None) -> List[Dict]:
+        """Supabase에서 메시지 검색 (start/end는 epoch 초, end 미포함, room_key를 주면 그 방만)
+        
+        after에 이전 페이지의 next_page_key()를 넘기면 OFFSET 없이 그 다음 페이지를 읽는다.
+        """
         if not self.supabase:
             print("⚠️ Supabase를 사용할 수 없습니다.")
             return []
             
         try:
-            query = self.supabase.table('messages').select('*')
-            
-            if keyword:
-                query = query.ilike('message', f'%{keyword}%')
-            if nickname:
-                query = query.eq('nickname', nickname)
+            query = self._filter_messages(
+                self.supabase.table('messages').select('*'), keyword, nickname, start, end, room_key
+            )
+            # 기간/방 조건은 (room_key,) ts 인덱스 범위 스캔 (최신순), 그 외에는 기본 키 역순
+            if start is not None or end is not None or room_key is not None:
+                if after and len(after) == 2:
+                    # (ts, id) < (시각, id) 행 비교를 PostgREST 조건으로 풀어 씀 (ts <= 시각은 인덱스 범위)
+                    query = query.lte('ts', after[0]) \
+                        .or_(f'ts.lt.{after[0]},and(ts.eq.{after[0]},id.lt.{after[1]})')
+                elif after:
+                    # 시각이 없는 행(역순 정렬의 맨 앞)을 다 읽기 전이면 그 구간의 나머지와 시각이 있는 행
+                    query = query.or_(f'and(ts.is.null,id.lt.{after[-1]}),ts.not.is.null')
+                query = query.order('ts', desc=True).order('id', desc=True)
+            else:
+                if after:
+                    query = query.lt('id', after[-1])
+                query = query.order('id', desc=True)
                 
             result = query.limit(limit).execute()
             return result.data
         except Exception as e:
             print(f"❌ 메시지 검색 오류: {e}")
+            note_error(e)
             return []
     
-    def get_user_statistics(self) -> List[Dict]:
-        """사용자별 통계 정보"""
+    @staticmethod
+    def next_page_key(results: List[Dict]) -> Optional[Tuple]:
+        """검색 결과 마지막 행에서 search_messages(after=...)용 키 생성 (시각이 없으면 id만)"""
+        if not results:
+            return None
+        last = results[-1]
+        if last.get('ts') is not None:
+            return (last['ts'], last['id'])
+        return (last['id'],)
+    
+    @staticmethod
+    def _filter_messages(query, keyword: Optional[str], nickname: Optional[str], start: Optional[int],
+                         end: Optional[int], room_key: Optional[str]):
+        """검색 조건을 messages 조회에 적용"""
+        if keyword:
+            query = query.ilike('message', f'%{keyword}%')
+        if nickname:
+            query = query.eq('nickname', nickname)
+        if room_key is not None:
+            query = query.eq('room_key', room_key)
+        if start is not None:
+            query = query.gte('ts', start)
+        if end is not None:
+            query = query.lt('ts', end)
+        return query
+    
+    def iter_search(self, keyword: str = None, nickname: str = None, start: Optional[int] = None,
+                    end: Optional[int] = None, room_key: Optional[str] = None,
+                    page_size: int = EXPORT_PAGE_SIZE) -> Iterator[Dict]:
+        """검색 조건에 맞는 메시지 전체를 id 역순 키셋 페이지로 반환 (내보내기용, 오류는 호출한 쪽으로 전달)"""
+        if not self.supabase:
+            print("⚠️ Supabase를 사용할 수 없습니다.")
+            return
+        
+        last_id = None
+        while True:
+            with span('supabase.export_page') as stage:
+                query = self._filter_messages(
+                    self.supabase.table('messages').select('id,room_key,nickname,message,timestamp,ts,message_type'),
+                    keyword, nickname, start, end, room_key
+                )
+                if last_id is not None:
+                    query = query.lt('id', last_id)
+                page = query.order('id', desc=True).limit(page_size).execute().data
+                stage.rows = len(page)
+            yield from page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]['id']
+    
+    def iter_messages_after(self, last_id: int, page_size: int = REPLICA_SYNC_PAGE_SIZE) -> Iterator[List[Dict]]:
+        """id가 last_id보다 큰 메시지를 id 순서로 페이지 단위 반환 (로컬 복제본 동기화, 오류는 호출한 쪽으로 전달)"""
+        while True:
+            with span('supabase.sync_page') as stage:
+                page = self.supabase.table('messages') \
+                    .select('id,room_key,idempotency_key,nickname,message,timestamp,ts') \
+                    .gt('id', last_id).order('id').limit(page_size).execute().data
+                stage.rows = len(page)
+            if not page:
+                return
+            yield page
+            last_id = page[-1]['id']
+            if len(page) < page_size:
+                return
+    
+    @traced('supabase.rollups')
+    def apply_rollups(self, rollups) -> bool:
+        """업로드에서 집계한 증분을 집계 테이블에 한 번의 RPC로 반영"""
+        if not self.supabase:
+            print("⚠️ Supabase를 사용할 수 없습니다.")
+            return False
+            
+        try:
+            self.supabase.rpc('apply_rollup_deltas', {'deltas': rollups.to_payload()}).execute()
+            return True
+        except Exception as e:
+            print(f"❌ 집계 테이블 갱신 오류: {e}")
+            note_error(e)
+            return False
+    
+    @traced('supabase.user_statistics')
+    def get_user_statistics(self, limit: int = None) -> List[Dict]:
+        """사용자별 통계 정보 (users 집계 테이블 조회)"""
         if not self.supabase:
             print("⚠️ Supabase를 사용할 수 없습니다.")
             return []
             
         try:
-            result = self.supabase.rpc('get_user_statistics').execute()
+            query = self.supabase.table('users').select(
+                'nickname,total_messages,join_count,leave_count,first_seen,last_seen'
+            ).order('total_messages', desc=True)
+            if limit:
+                query = query.limit(limit)
+            result = query.execute()
             return result.data
         except Exception as e:
             print(f"❌ 사용자 통계 조회 오류: {e}")
+            note_error(e)
+            return []
+    
+    @traced('supabase.find_users')
+    def find_users(self, query: str, limit: int = USER_LOOKUP_LIMIT) -> List[Dict]:
+        """users 테이블에서 닉네임 부분 일치 조회 (로컬 사용자 사전과 같은 필드, 별칭 병합은 없음)"""
+        if not self.supabase:
+            print("⚠️ Supabase를 사용할 수 없습니다.")
+            return []
+            
+        try:
+            result = self.supabase.table('users').select('nickname,total_messages').ilike(
+                'nickname', f'%{query}%'
+            ).order('total_messages', desc=True).limit(limit).execute()
+            users = [
+                {'nickname': row['nickname'], 'canonical_nickname': row['nickname'],
+                 'total_messages': row.get('total_messages') or 0, 'score': round(score_nickname(query, row['nickname']), 3)}
+                for row in result.data
+            ]
+            users.sort(key=lambda user: (user['score'], user['total_messages']), reverse=True)
+            return users
+        except Exception as e:
+            print(f"❌ 사용자 조회 오류: {e}")
+            note_error(e)
             return []
     
+    @traced('supabase.keyword_frequency')
     def get_keyword_frequency(self, limit: int = 20) -> List[Dict]:
-        """키워드 빈도 조회"""
+        """키워드 빈도 조회 (keyword_stats 집계 테이블에서 상위 limit개)"""
         if not self.supabase:
             print("⚠️ Supabase를 사용할 수 없습니다.")
             return []
             
         try:
-            result = self.supabase.rpc('get_keyword_frequency', {'limit_count': limit}).execute()
+            result = self.supabase.table('keyword_stats').select('keyword,frequency') \
+                .order('frequency', desc=True).limit(limit).execute()
             return result.data
         except Exception as e:
             print(f"❌ 키워드 빈도 조회 오류: {e}")
+            note_error(e)
             return []
+    
+    @traced('supabase.activity_histogram')
+    def get_activity_histogram(self) -> Dict:
+        """일별/시간대별 활동 히스토그램"""
+        if not self.supabase:
+            print("⚠️ Supabase를 사용할 수 없습니다.")
+            return {}
+            
+        try:
+            daily = self.supabase.table('daily_activity').select('*').order('day').execute().data
+            hourly = [0] * 24
+            for row in self.supabase.table('hourly_activity').select('*').execute().data:
+                hourly[row['hour']] = row['message_count']
+            return {
+                'daily': [
+                    {'day': row['day'], 'messages': row['message_count'],
+                     'joins': row['join_count'], 'leaves': row['leave_count']}
+                    for row in daily
+                ],
+                'hourly': hourly
+            }
+        except Exception as e:
+            print(f"❌ 활동 히스토그램 조회 오류: {e}")
+            note_error(e)
+            return {}
+    
+    @traced('supabase.range_statistics')
+    def get_range_statistics(self, start: Optional[int] = None, end: Optional[int] = None,
+                             room_key: Optional[str] = None) -> Dict:
+        """기간/방 통계 (range_statistics 함수가 messages의 (room_key,) ts 인덱스 범위에서 사용자/일별/시간대별 수를 계산)"""
+        if not self.supabase:
+            print("⚠️ Supabase를 사용할 수 없습니다.")
+            return {}
+            
+        try:
+            result = self.supabase.rpc(
+                'range_statistics', {'start_ts': start, 'end_ts': end, 'room': room_key}
+            ).execute()
+            data = result.data or {}
+            hourly = [0] * 24
+            for row in data.get('hourly') or []:
+                hourly[row['hour']] = row['messages']
+            return {
+                'user_statistics': data.get('users') or [],
+                'activity': {'daily': data.get('daily') or [], 'hourly': hourly}
+            }
+        except Exception as e:
+            print(f"❌ 기간 통계 조회 오류: {e}")
+            note_error(e)
+            return {}
+    
+    @traced('supabase.save_room')
+    def save_room(self, room_key: Optional[str], name: Optional[str] = None) -> bool:
+        """방 목록(rooms)에 방 등록/갱신"""
+        if not self.supabase:
+            return False
+            
+        try:
+            self.supabase.table('rooms').upsert({
+                'room_key': room_key or '',
+                'name': name or room_key or '기본 방',
+                'updated_at': datetime.now().isoformat()
+            }, on_conflict='room_key').execute()
+            return True
+        except Exception as e:
+            print(f"❌ 방 목록 저장 오류: {e}")
+            note_error(e)
+            return False
+    
+    @traced('supabase.rooms')
+    def get_rooms(self) -> List[Dict]:
+        """방 목록 조회"""
+        if not self.supabase:
+            print("⚠️ Supabase를 사용할 수 없습니다.")
+            return []
+            
+        try:
+            return self.supabase.table('rooms').select('room_key,name,updated_at').order('room_key').execute().data
+        except Exception as e:
+            print(f"❌ 방 목록 조회 오류: {e}")
+            note_error(e)
+            return []
+
+class SupabaseIndexer:
+    """메시지 배치를 Supabase에 저장하면서 집계 테이블 증분을 모으는 단계 (업로드와 백업 복원에서 공유)"""
+    
+    def __init__(self, supabase: SupabaseStorage, accumulate: Callable[[RollupAccumulator, List[Dict]], None],
+                 check_existing: bool = False, room_key: Optional[str] = None):
+        self.supabase = supabase
+        self.accumulate = accumulate
+        self.room_key = room_key
+        # 이미 데이터가 있을 수 있는 경우 저장 전에 중복 확인 (집계 중복 방지)
+        self.check_existing = check_existing
+        self.rollups = RollupAccumulator()
+        self.rows_written = 0
+        self.failed = False
+        # 배치가 들어오는 대로 여러 요청을 동시에 보내는 일괄 저장 세션
+        self.upload_key = uuid.uuid4().hex
+        self.session = supabase.begin_bulk_write(self.upload_key)
+    
+    def add(self, batch: List[Dict], hashes: List[str]):
+        """배치 저장 요청 및 집계"""
+        if self.check_existing:
+            batch, hashes = self.supabase.drop_existing(batch, hashes, self.room_key)
+        rows = self.supabase.to_rows(batch, hashes, self.room_key)
+        if rows and self.session is not None:
+            # 전송 요청만 큐에 넣음 (응답 대기는 close()의 supabase.flush)
+            with span('supabase.enqueue') as stage:
+                stage.rows = len(rows)
+                self.session.add(rows)
+            self.rows_written = self.session.rows_written
+        elif rows and self.supabase.available:
+            if self.supabase.save_rows(rows, self.upload_key):
+                self.rows_written += len(rows)
+            else:
+                self.failed = True
+        self.accumulate(self.rollups, batch)
+    
+    def close(self) -> bool:
+        """전송 중인 배치가 모두 끝날 때까지 대기 (확인 응답을 받은 행만 저장된 것으로 집계), 성공 여부 반환"""
+        if self.session is not None:
+            with span('supabase.flush') as stage:
+                stats = self.session.close()
+                stage.rows = stats['rows']
+            self.rows_written = stats['rows']
+            if not self.session.success:
+                self.failed = True
+                print(f"❌ 메시지 저장 오류: {stats['failed_batches']}개 배치 실패 ({stats['errors'][0]})")
+        return self.supabase.available and not self.failed
+    
+    def apply_rollups(self) -> bool:
+        """모든 행이 저장된 경우에만 집계 증분 반영"""
+        return self.supabase.available and not self.failed and self.supabase.apply_rollups(self.rollups)
 
 class HybridStorage:
-    """하이브리드 저장소: Cloudinary + Supabase"""
+    """하이브리드 저장소: Cloudinary + Supabase (+ 로컬 SQLite 복제본)"""
     
     def __init__(self):
         self.cloudinary = CloudinaryStorage()
+        # 백업 저장소 (BACKUP_STORE=local이면 BACKUP_DIR 디렉터리에 저장)
+        if os.getenv('BACKUP_STORE') == 'local':
+            self.backups: BlobStore = LocalBlobStore(os.getenv('BACKUP_DIR', 'backups'))
+        else:
+            self.backups: BlobStore = self.cloudinary
+        self._local_rooms = None
+        self._local_rooms_lock = threading.Lock()
         self.supabase = SupabaseStorage()
-        self.supabase.init_database()
+        # 헬스 체크의 Supabase 확인 결과 캐시 (로드 밸런서가 자주 호출해도 네트워크 확인은 TTL마다 한 번)
+        self._health = TTLCache(max_entries=1, ttl=float(os.getenv('HEALTH_CHECK_TTL', 30)))
+        # 키워드 집계용 토크나이저 (첫 업로드 때 생성)
+        self.tokenizer = None
+        # 조회 결과 캐시: 업로드마다 data_version을 올려 이전 결과를 무효화
+        self.cache = TTLCache(
+            max_entries=int(os.getenv('RESPONSE_CACHE_ENTRIES', 512)),
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', 300))
+        )
+        self.data_version = 0
+        # 프로세스가 재시작되면 data_version이 0부터 다시 시작하므로 ETag에 프로세스 식별자를 포함
+        self.cache_epoch = uuid.uuid4().hex[:8]
+        # 로컬 SQLite 복제본: 업로드는 함께 쓰고 검색/통계는 여기서 읽음 (LOCAL_REPLICA=0이면 사용 안 함)
+        self.replica = None
+        if os.getenv('LOCAL_REPLICA', '1') != '0':
+            self.replica = LocalReplica(self.local_rooms, self.supabase, self.invalidate_cache)
+            self.replica.start_sync()
+    
+    def get_import_state(self, room_key: str) -> Optional[Dict]:
+        """방의 증분 적재 체크포인트 (Supabase를 쓸 수 있으면 Supabase, 아니면 로컬 복제본의 카탈로그)"""
+        if self.supabase.supabase or self.replica is None:
+            return self.supabase.get_import_state(room_key)
+        return self.replica.get_import_state(room_key)
     
-    def process_upload(self, file_content: str, filename: str = None) -> Dict:
-        """파일 업로드 처리"""
+    @traced('upload')
+    def process_upload(self, file_content: Union[str, bytes, BinaryIO], filename: str = None,
+                       progress: Optional[Callable[..., None]] = None) -> Dict:
+        """파일 업로드 처리 (문자열, 바이트 또는 업로드 스트림)
+        
+        파싱은 호출한 스레드에서, 백업 직렬화와 Supabase 저장/집계는 각각 별도 스레드에서
+        배치 단위로 동시에 진행한다. progress(stage=..., lines_parsed=..., rows_written=...)로 진행 상황을 알린다.
+        같은 방을 다시 올리면 이전 적재 지점(체크포인트)부터만 파싱하고 이미 저장된 레코드는 건너뛴다.
+        """
+        report = progress or (lambda **fields: None)
+        upload_span = current_span()
         try:
-            # 1. 파싱 (기존 파서 사용)
+            # 1. 파싱 (기존 파서 사용) - 임시 파일 없이 스트림을 직접 파싱
             from kakao_parser import KakaoTalkParser
             
-            # 임시 파일로 저장 후 파싱
-            temp_filename = f"temp_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            with open(temp_filename, 'w', encoding='utf-8') as f:
-                f.write(file_content)
+            if isinstance(file_content, str):
+                file_content = file_content.encode('utf-8')
+            if isinstance(file_content, bytes):
+                file_content = io.BytesIO(file_content)
             
-            parser = KakaoTalkParser(temp_filename)
-            messages = parser.parse_messages()
-            
-            # 임시 파일 삭제
-            os.remove(temp_filename)
+            # 방별 체크포인트와 앞부분이 같으면 그 지점으로 건너뛰고, 레코드마다 내용 해시 계산
+            incremental = IncrementalImport(file_content, self.get_import_state)
+            parser = KakaoTalkParser(incremental.reader)
+            statistics = parser.empty_statistics()
+            # Supabase 저장 + 집계 테이블 증분 (사용자/키워드/일별/시간대별)
+            indexer = SupabaseIndexer(
+                self.supabase, self._accumulate_rollups, incremental.needs_existence_check, incremental.room_key
+            )
+            counters = {"message_count": 0, "replica_written": False}
             
-            # 2. JSON으로 Cloudinary에 저장 (백업용)
-            json_data = {
-                "room_info": {
-                    "name": "카카오톡 대화내용",
+            # 2. 백업은 압축 컬럼 스냅샷으로 배치 단위 직렬화 (메모리 상한 초과 시 익명 임시 파일로 전환)
+            with tempfile.SpooledTemporaryFile(max_size=BACKUP_SPOOL_SIZE, mode='w+b') as backup:
+                # 복원할 때 레코드를 읽기 전에 방을 정할 수 있도록 방 식별자를 머리 프레임에 기록
+                snapshot = SnapshotWriter(backup, header={'room_key': incremental.room_key})
+                
+                def write_backup(item):
+                    batch, hashes = item
+                    with span('backup.serialize') as stage:
+                        # 복원할 때 같은 해시를 쓰도록 적재에 쓴 내용 해시도 기록
+                        snapshot.write(batch, hashes)
+                        stage.rows = len(batch)
+                    counters["message_count"] += len(batch)
+                
+                # 3. 분석용 데이터를 Supabase에 배치 단위로 저장하면서 집계
+                def write_index(item):
+                    with span('index') as stage:
+                        indexer.add(*item)
+                        stage.rows = len(item[0])
+                    report(rows_written=indexer.rows_written)
+                
+                backup_stage = PipelineStage('backup', write_backup)
+                index_stage = PipelineStage('index', write_index)
+                stages = [backup_stage, index_stage]
+                if self.replica is not None:
+                    def write_replica(batches):
+                        counters["replica_written"] = self.replica.write(batches, incremental.room_key)
+                    
+                    stages.append(PipelineStage('replica', write_replica, stream=True))
+                try:
+                    report(stage='parse')
+                    # 파싱 시간에는 뒤 단계 큐가 가득 찼을 때 기다린 시간도 포함
+                    with span('parse') as parse_span:
+                        for batch in parser.iter_batches(UPLOAD_BATCH_SIZE):
+                            item = incremental.filter(batch)
+                            if item[0]:
+                                parser.update_statistics(statistics, item[0])
+                                for stage in stages:
+                                    stage.put(item)
+                            report(lines_parsed=parser.lines_read)
+                        parse_span.rows = parser.lines_read
+                finally:
+                    try:
+                        for stage in stages:
+                            stage.finish()
+                    finally:
+                        supabase_success = indexer.close()
+                
+                report(rows_written=indexer.rows_written)
+                message_count = counters["message_count"]
+                report(stage='backup_upload', lines_parsed=parser.lines_read)
+                room_info = {
+                    "name": incremental.room_key or "카카오톡 대화내용",
                     "export_date": datetime.now().strftime('%Y-%m-%d'),
                     "filename": filename or "unknown.txt",
-                    "total_messages": len(messages)
-                },
-                "messages": messages,
-                "statistics": parser.get_statistics(messages)
-            }
-            
-            cloudinary_filename = f"chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            cloudinary_result = self.cloudinary.upload_json(json_data, cloudinary_filename)
+                    "total_messages": message_count
+                }
+                snapshot.close({"room_info": room_info, "statistics": statistics})
+                backup_bytes = backup.tell()
+                
+                # 같은 초에 끝난 업로드(작업 워커가 여럿)끼리 덮어쓰지 않도록 임의 id를 붙임
+                cloudinary_filename = (
+                    f"chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex}.{SNAPSHOT_FORMAT}"
+                )
+                with span(f'{self.backups.backend}.put') as stage:
+                    stage.bytes = backup_bytes
+                    cloudinary_result = self.backups.put(f"chat_data/{cloudinary_filename}", backup, SNAPSHOT_FORMAT)
             
-            # 3. 분석용 데이터를 Supabase에 저장
-            supabase_success = self.supabase.save_messages(messages)
+            report(stage='rollups')
+            if supabase_success:
+                self.supabase.save_room(incremental.room_key)
+            if self.replica is not None and not self.replica.ready:
+                # 복제본 쓰기가 실패했으면 Supabase에서 다시 따라잡음
+                self.replica.start_sync()
+            # 모든 행과 집계가 반영된 저장소에서만 체크포인트를 옮김 (실패하면 다음 업로드에서 다시 확인)
+            state = incremental.next_state()
+            if indexer.apply_rollups() and state:
+                self.supabase.save_import_state(state)
+            # 로컬 복제본에도 모두 저장했으면 로컬 카탈로그에 기록 (Supabase 없이 다시 올려도 이어서 적재)
+            if counters["replica_written"] and state:
+                self.replica.save_import_state(state)
+            self.invalidate_cache()
+            upload_span.rows = message_count
+            upload_span.bytes = backup_bytes
+            upload_span.set(lines=parser.lines_read, room_key=incremental.room_key)
             
             return {
                 "success": True,
                 "cloudinary_id": cloudinary_result['public_id'] if cloudinary_result else None,
-                "message_count": len(messages),
+                "message_count": message_count,
                 "supabase_success": supabase_success,
-                "statistics": json_data["statistics"]
+                "incremental": incremental.summary(),
+                "statistics": statistics
             }
             
         except Exception as e:
             print(f"❌ 업로드 처리 오류: {e}")
+            note_error(e)
             return {
                 "success": False,
                 "error": str(e)
             }
     
-    def search(self, keyword: str = None, nickname: str = None, limit: int = 100) -> List[Dict]:
-        """Supabase에서 빠른 검색"""
-        return self.supabase.search_messages(keyword, nickname, limit)
+    def _accumulate_rollups(self, rollups: RollupAccumulator, batch: List[Dict]):
+        """배치의 사용자/날짜/시간대 카운터와 키워드 빈도를 집계"""
+        texts = []
+        for msg in batch:
+            rollups.add(msg)
+            if msg['type'] == 'message' and msg.get('message'):
+                texts.append(msg['message'])
+        
+        if self.tokenizer is None:
+            self.tokenizer = get_tokenizer()
+        with span('tokenizer.keywords') as stage:
+            stage.rows = len(texts)
+            for tokens in self.tokenizer.tokenize_many(texts):
+                rollups.add_keywords(keyword for _, keyword in tokens)
+    
+    def invalidate_cache(self):
+        """데이터가 바뀌었음을 기록하고 캐시된 조회 결과를 버림"""
+        self.data_version += 1
+        self.cache.clear()
+    
+    @staticmethod
+    def normalize_search_params(keyword: str = None, nickname: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                                start: Optional[int] = None, end: Optional[int] = None,
+                                room: Optional[str] = None, cursor: Optional[str] = None) -> Dict:
+        """캐시 키/ETag용 검색 조건 정규화 (검색은 대소문자를 구분하지 않음, 페이지 크기는 MAX_PAGE_SIZE까지)"""
+        return {
+            'keyword': (keyword or '').strip().lower(),
+            'nickname': (nickname or '').strip(),
+            'limit': clamp_page_size(limit),
+            'start': start,
+            'end': end,
+            'room': room,
+            'cursor': cursor or ''
+        }
+    
+    def etag(self, name: str, params: Optional[Dict] = None) -> str:
+        """현재 데이터 버전 기준 조회 결과의 ETag 값"""
+        key = json.dumps([name, params or {}], ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return f"{self.cache_epoch}-{self.data_version}-{digest}"
+    
+    def _cached(self, name: str, params: Dict, compute):
+        """(이름, 정규화된 조건, 데이터 버전) 기준으로 결과 캐시 (빈 결과는 오류일 수 있어 캐시하지 않음)"""
+        key = (name, self.data_version, tuple(sorted(params.items())))
+        value = self.cache.get(key)
+        current = current_span()
+        if current is not None:
+            current.set(cache='miss' if value is MISSING else 'hit')
+        if value is MISSING:
+            value = compute()
+            if value:
+                self.cache.set(key, value)
+        return value
+    
+    def search(self, keyword: str = None, nickname: str = None, limit: int = DEFAULT_PAGE_SIZE,
+               start: Optional[int] = None, end: Optional[int] = None, room: Optional[str] = None) -> List[Dict]:
+        """검색 결과 첫 페이지 (search_page의 결과 목록만)"""
+        return self.search_page(keyword, nickname, limit, start, end, room)['results']
+    
+    @traced('search')
+    def search_page(self, keyword: str = None, nickname: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                    start: Optional[int] = None, end: Optional[int] = None, room: Optional[str] = None,
+                    cursor: Optional[str] = None) -> Dict:
+        """검색 한 페이지 (결과 캐시, start/end는 epoch 초 기간 조건, room은 방 식별자)
+        
+        {'results', 'next_cursor'}를 반환하며, next_cursor를 cursor로 넘기면 이전 페이지 마지막 행
+        다음부터 인덱스 범위로 읽는다 (OFFSET 없이 페이지마다 같은 비용).
+        로컬 복제본과 Supabase는 id가 달라 커서는 만든 저장소에서만 쓸 수 있으며, 잘못되거나
+        쓸 수 없게 된 커서는 ValueError.
+        """
+        params = self.normalize_search_params(keyword, nickname, limit, start, end, room, cursor)
+        source, after = decode_cursor(cursor)
+        size = params['limit']
+        keyword, nickname = params['keyword'] or None, params['nickname'] or None
+        
+        def local() -> Dict:
+            results, next_key = self.replica.search(keyword, nickname, size, start, end, room, after=after)
+            return self._page(results, next_key and encode_cursor('local', next_key))
+        
+        def remote() -> Dict:
+            # 한 행을 더 받아 다음 페이지가 있는지 확인
+            rows = self.supabase.search_messages(keyword, nickname, size + 1, start, end, room, after=after)
+            results = rows[:size]
+            next_key = self.supabase.next_page_key(results) if len(rows) > size else None
+            return self._page(results, next_key and encode_cursor('supabase', next_key))
+        
+        if source == 'local':
+            if self.replica is None or not self.replica.ready:
+                raise ValueError('검색 커서가 만료되었습니다. 처음부터 다시 검색하세요.')
+            compute = local
+        elif source == 'supabase':
+            compute = remote
+        else:
+            compute = lambda: self._read(local, remote)
+        return self._cached('search', params, compute) or {'results': [], 'next_cursor': None}
+    
+    @staticmethod
+    def _page(results: List[Dict], next_cursor: Optional[str]) -> Dict:
+        """검색 한 페이지 응답 (결과가 없으면 오류일 수 있어 캐시하지 않도록 빈 dict)"""
+        if not results:
+            return {}
+        return {'results': results, 'next_cursor': next_cursor}
+    
+    def iter_export(self, keyword: str = None, nickname: str = None, start: Optional[int] = None,
+                    end: Optional[int] = None, room: Optional[str] = None) -> Iterator[Dict]:
+        """검색 조건(없으면 방 전체)에 맞는 메시지를 모두 반환 (캐시하지 않고 페이지 단위로 읽으며 바로 넘김)
+        
+        복제본이 준비됐으면 로컬 SQLite에서 최신순으로, 아니면 Supabase에서 id 역순으로 읽는다.
+        """
+        local = self.replica is not None and self.replica.ready
+        with span('export', source='local' if local else 'supabase', room=room) as stage:
+            if local:
+                rows = self.replica.iter_messages(keyword or None, nickname or None, start, end, room)
+            else:
+                rows = self.supabase.iter_search(keyword or None, nickname or None, start, end, room)
+            for row in rows:
+                stage.rows += 1
+                yield row
+    
+    def get_rooms(self) -> List[Dict]:
+        """방 목록 (결과 캐시)"""
+        return self._cached('rooms', {}, lambda: self._read(
+            lambda: [
+                {'room_key': room['room_key'], 'name': room['name'],
+                 'total_messages': room['total_messages'], 'users': room['users']}
+                for room in self.local_rooms().rooms()
+            ],
+            self.supabase.get_rooms
+        ))
+    
+    @traced('users.lookup')
+    def find_users(self, query: str, limit: int = USER_LOOKUP_LIMIT, room: Optional[str] = None) -> List[Dict]:
+        """닉네임 유사 조회 (로컬 사용자 사전의 n-gram 색인, 복제본이 준비되지 않았으면 Supabase 부분 일치)"""
+        query = (query or '').strip()
+        if not query:
+            return []
+        return self._read(
+            lambda: self.local_rooms().find_users(query, limit, room),
+            lambda: self.supabase.find_users(query, limit)
+        )
     
+    def merge_nicknames(self, alias: str, nickname: str) -> Optional[Dict]:
+        """로컬 사용자 사전에서 alias를 nickname과 같은 사용자로 병합 (통계/검색 캐시를 버림)"""
+        result = self.local_rooms().merge_nicknames(alias, nickname)
+        if result is not None:
+            self.invalidate_cache()
+        return result
+    
+    def split_nickname(self, nickname: str) -> Optional[Dict]:
+        """로컬 사용자 사전에서 nickname을 별칭 병합에서 떼어 냄"""
+        result = self.local_rooms().split_nickname(nickname)
+        if result is not None:
+            self.invalidate_cache()
+        return result
+    
+    def _read(self, local: Callable, remote: Callable):
+        """복제본이 Supabase를 따라잡았으면 로컬에서, 아니면(또는 로컬 조회가 실패하면) Supabase에서 읽음"""
+        if self.replica is not None and self.replica.ready:
+            try:
+                return local()
+            except Exception as e:
+                print(f"⚠️ 로컬 복제본 조회 실패, Supabase에서 조회합니다: {e}")
+                note_error(e)
+        return remote()
+    
+    def health(self) -> Dict:
+        """백엔드 상태 (Supabase 확인 결과는 HEALTH_CHECK_TTL초 동안 캐시)
+        
+        Supabase가 응답하거나 복제본이 따라잡은 상태면 조회를 처리할 수 있으므로 ok로 본다.
+        """
+        supabase = self._health.get('supabase')
+        if supabase is MISSING:
+            supabase = self.supabase.check()
+            self._health.set('supabase', supabase)
+        replica = None
+        if self.replica is not None:
+            replica = {'ready': self.replica.ready, 'last_sync': self.replica.last_sync}
+        return {
+            'ok': supabase['ok'] or bool(replica and replica['ready']),
+            'supabase': supabase,
+            'backups': {
+                'backend': self.backups.backend,
+                'available': self.backups.backend != 'cloudinary' or CLOUDINARY_AVAILABLE
+            },
+            'replica': replica
+        }
+    
+    @traced('backup.load')
     def get_backup(self, cloudinary_id: str) -> Optional[Dict]:
-        """Cloudinary에서 원본 데이터 복원"""
-        return self.cloudinary.download_json(cloudinary_id)
+        """백업 저장소에서 원본 데이터 복원"""
+        try:
+            with self.backups.open(cloudinary_id) as stream:
+                return load_backup(stream)
+        except BlobNotFoundError:
+            return None
+        except Exception as e:
+            print(f"❌ 백업 다운로드 오류: {e}")
+            note_error(e)
+            return None
+    
+    @traced('restore')
+    def restore_backup(self, backup_id: str, target: str = 'local',
+                       progress: Optional[Callable[..., None]] = None) -> Dict:
+        """백업을 스트리밍으로 내려받아 블록 단위로 해제하면서 로컬 DB 또는 Supabase에 다시 적재
+        
+        이미 저장된 레코드는 내용 해시로 건너뛰므로 같은 백업을 여러 번 복원해도 중복되지 않는다.
+        """
+        if target not in RESTORE_TARGETS:
+            return {"success": False, "error": f"지원하지 않는 복원 대상: {target}"}
+        report = progress or (lambda **fields: None)
+        started = time.perf_counter()
+        counters = {"records": 0}
+        
+        def batches(reader):
+            # 업로드할 때 기록한 내용 해시를 그대로 사용 (해시가 없는 예전 백업은 백업 순서대로 다시 계산)
+            hasher = RecordHasher()
+            for batch, hashes in reader.iter_hashed_batches():
+                counters["records"] += len(batch)
+                report(lines_parsed=counters["records"])
+                yield batch, hashes if hashes is not None else [hasher.hash(msg) for msg in batch]
+        
+        try:
+            with self.backups.open(backup_id) as stream:
+                # 방 식별자는 스냅샷 머리 프레임에서 읽음 (예전 백업은 기본 방)
+                reader = open_backup(stream)
+                if target == 'local':
+                    database, room_id = self.local_rooms().route(reader.room_key)
+                    with span('sqlite.save_hashed') as stage:
+                        inserted = database.save_hashed(batches(reader), room_id)
+                        stage.rows = inserted
+                    success = True
+                else:
+                    indexer = SupabaseIndexer(
+                        self.supabase, self._accumulate_rollups, check_existing=True, room_key=reader.room_key
+                    )
+                    try:
+                        for batch, hashes in batches(reader):
+                            indexer.add(batch, hashes)
+                            report(rows_written=indexer.rows_written)
+                    finally:
+                        indexer.close()
+                    success = indexer.apply_rollups()
+                    inserted = indexer.rows_written
+        except BlobNotFoundError:
+            return {"success": False, "error": "백업 데이터를 찾을 수 없습니다."}
+        except Exception as e:
+            print(f"❌ 백업 복원 오류: {e}")
+            note_error(e)
+            return {"success": False, "error": str(e)}
+        
+        self.invalidate_cache()
+        current_span().rows = counters["records"]
+        return {
+            "success": success,
+            "target": target,
+            "records": counters["records"],
+            "inserted": inserted,
+            "room_key": reader.room_key,
+            "room_info": (reader.metadata or {}).get('room_info'),
+            "elapsed": round(time.perf_counter() - started, 3)
+        }
+    
+    def local_rooms(self):
+        """복제본/복원/분석 대상 로컬 SQLite DB의 방 라우터 (처음 사용할 때 연결, LOCAL_SHARD_DIR이 있으면 방별 샤드)"""
+        with self._local_rooms_lock:
+            if self._local_rooms is None:
+                from room_router import RoomRouter
+                self._local_rooms = RoomRouter(
+                    os.getenv('LOCAL_DB_PATH', 'kakao_chat.db'), os.getenv('LOCAL_SHARD_DIR') or None
+                )
+            return self._local_rooms
+    
+    @staticmethod
+    def normalize_range_params(start: Optional[int] = None, end: Optional[int] = None,
+                               room: Optional[str] = None) -> Dict:
+        """캐시 키/ETag용 기간/방 조건 (조건이 없으면 빈 딕셔너리)"""
+        params = {'start': start, 'end': end} if start is not None or end is not None else {}
+        if room is not None:
+            params['room'] = room
+        return params
     
-    def get_statistics(self) -> Dict:
-        """전체 통계 정보"""
+    @traced('statistics')
+    def get_statistics(self, start: Optional[int] = None, end: Optional[int] = None,
+                       room: Optional[str] = None) -> Dict:
+        """통계 정보 (결과 캐시, 기간/방 조건이 없으면 집계 테이블만 조회)"""
+        params = self.normalize_range_params(start, end, room)
+        if params:
+            # Supabase 집계 테이블은 전체 방/전체 기간 누계라 방 조건도 기간 통계 함수로 계산
+            remote = lambda: self._compute_range_statistics(start, end, room)
+        else:
+            remote = self._compute_statistics
+        return self._cached('statistics', params, lambda: self._read(
+            lambda: self.replica.get_statistics(start, end, room), remote
+        ))
+    
+    def _compute_statistics(self) -> Dict:
+        """전체 통계 정보 (집계 테이블만 조회)"""
         try:
             user_stats = self.supabase.get_user_statistics()
             keyword_stats = self.supabase.get_keyword_frequency()
             
             return {
                 "user_statistics": user_stats,
-                "keyword_frequency": keyword_stats
+                "keyword_frequency": keyword_stats,
+                "activity": self.supabase.get_activity_histogram(),
+                **summarize_user_statistics(user_stats)
             }
         except Exception as e:
             print(f"❌ 통계 조회 오류: {e}")
+            note_error(e)
+            return {}
+    
+    @traced('analytics')
+    def get_analytics(self, start: Optional[int] = None, end: Optional[int] = None,
+                      top: int = 10, bucket: str = 'day', room: Optional[str] = None) -> Dict:
+        """활동 분석 (히트맵, 사용자별 활동 곡선, 응답 간격, 입장/퇴장 추이), 결과 캐시
+        
+        입장/퇴장과 시각이 모두 있는 로컬 DB의 (ts, 종류, 닉네임) 인덱스를 컬럼으로 읽어 계산한다.
+        """
+        params = {**self.normalize_range_params(start, end, room), 'top': int(top), 'bucket': bucket}
+        return self._cached('analytics', params, lambda: self._compute_analytics(start, end, int(top), bucket, room))
+    
+    def _compute_analytics(self, start: Optional[int], end: Optional[int], top: int, bucket: str,
+                           room: Optional[str] = None) -> Dict:
+        # numpy를 쓰는 분석 모듈은 처음 분석할 때 import
+        from analytics import ActivityAnalytics, ActivityColumns
+        
+        columns = ActivityColumns()
+        with span('sqlite.activity_rows') as stage:
+            columns.extend(self.local_rooms().iter_activity_rows(room, start, end))
+            stage.rows = len(columns)
+        with span('analytics.compute'):
+            return ActivityAnalytics(columns).summary(top, bucket)
+    
+    @traced('trending')
+    def get_trending_keywords(self, window: str = 'week', limit: int = 20, room: Optional[str] = None) -> Dict:
+        """마지막 데이터 날짜까지 window(day/week/month) 기간의 인기 키워드, 결과 캐시
+        
+        적재할 때 로컬 DB에 갱신해 두는 하루치 요약(Count-Min Sketch + Space-Saving)만 합쳐 계산한다.
+        """
+        params = {**self.normalize_range_params(room=room), 'window': window, 'limit': int(limit)}
+        return self._cached('trending', params,
+                            lambda: self.local_rooms().get_trending_keywords(window, int(limit), room))
+    
+    @traced('user_keywords')
+    def get_user_keywords(self, nickname: str, limit: int = 10, room: Optional[str] = None) -> Optional[Dict]:
+        """사용자(별칭 포함)가 많이 쓴 키워드, 결과 캐시 (모르는 닉네임이면 None)"""
+        params = {**self.normalize_range_params(room=room), 'nickname': nickname, 'limit': int(limit)}
+        return self._cached('user_keywords', params,
+                            lambda: self.local_rooms().get_user_keywords(nickname, int(limit), room))
+    
+    def _compute_range_statistics(self, start: Optional[int], end: Optional[int],
+                                  room: Optional[str] = None) -> Dict:
+        """기간/방 통계 (키워드 인덱스는 Supabase에 없으므로 키워드 빈도는 전체 방/전체 기간 기준)"""
+        stats = self.supabase.get_range_statistics(start, end, room)
+        if not stats:
             return {}
+        user_stats = stats['user_statistics']
+        return {
+            "user_statistics": user_stats,
+            "keyword_frequency": self.supabase.get_keyword_frequency(),
+            "activity": stats['activity'],
+            "range": {'start': start, 'end': end},
+            "room": room,
+            **summarize_user_statistics(user_stats)
+        }
 
 # 테스트 코드
 if __name__ == "__main__":
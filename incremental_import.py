@@ -0,0 +1,212 @@
+import hashlib
+import re
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# 레코드 내용 해시 길이 (바이트, 16진수 문자열은 두 배)
+CONTENT_HASH_SIZE = 16
+
+# 내보내기 파일 첫 줄: "방 이름 님과 카카오톡 대화"
+HEADER_SUFFIX = '님과 카카오톡 대화'
+
+# 날짜 구분선 (바이트 단위로 찾아 파싱 없이 체크포인트 위치를 기록)
+DAY_LINE_PATTERN = re.compile(
+    r'^-+ (\d{4})년 (\d{1,2})월 (\d{1,2})일 .*-\r?$'.encode('utf-8'),
+    re.MULTILINE
+)
+
+# 앞부분 해시를 확인할 때 한 번에 읽는 바이트 수
+VERIFY_CHUNK_SIZE = 1024 * 1024
+
+
+def read_room_key(stream: BinaryIO) -> Optional[str]:
+    """첫 줄(방 이름 머리말)을 읽고 되감아 방 식별자로 사용, 머리말이 없거나 되감을 수 없으면 None"""
+    if not (hasattr(stream, 'seekable') and stream.seekable()):
+        return None
+    position = stream.tell()
+    header = stream.readline(4096)
+    stream.seek(position)
+    header = header.decode('utf-8-sig', errors='replace').strip()
+    if not header.endswith(HEADER_SUFFIX):
+        return None
+    return header[:-len(HEADER_SUFFIX)].strip() or None
+
+
+class RecordHasher:
+    """레코드 내용 해시 (날짜, 시간, 닉네임, 내용, 같은 날 같은 내용의 순번)
+
+    순번은 날짜마다 새로 세므로 날짜 구분선에서 파싱을 다시 시작해도 같은 레코드는 같은 해시를 얻는다.
+    마지막 날짜의 해시 목록(day_hashes)은 다음 업로드에서 겹치는 구간을 걸러내는 데 쓰인다.
+    """
+
+    def __init__(self):
+        self.day = None
+        self.day_hashes: List[str] = []
+        self._ordinals: Dict[Tuple, int] = {}
+
+    def hash(self, record: Dict) -> str:
+        day = record.get('date')
+        if day != self.day:
+            self.day = day
+            self.day_hashes = []
+            self._ordinals.clear()
+
+        key = (record['type'], record.get('time'), record['nickname'], record.get('message'))
+        ordinal = self._ordinals.get(key, 0)
+        self._ordinals[key] = ordinal + 1
+
+        payload = '\x1f'.join((
+            record['type'], day or '', record.get('time') or '', record['nickname'],
+            record.get('message') or '', str(ordinal)
+        ))
+        content_hash = hashlib.blake2b(payload.encode('utf-8'), digest_size=CONTENT_HASH_SIZE).hexdigest()
+        self.day_hashes.append(content_hash)
+        return content_hash
+
+
+class CheckpointReader:
+    """업로드 스트림을 감싸 마지막 날짜 구분선 위치와 그 앞부분의 sha256을 기록하는 읽기 래퍼
+
+    오프셋과 해시는 첫 날짜 구분선부터 센다 (머리말의 "저장한 날짜"는 내보낼 때마다 바뀌므로 제외).
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.origin: Optional[int] = None       # 첫 날짜 구분선의 절대 위치
+        self.checkpoint: Optional[Tuple] = None  # (상대 오프셋, 앞부분 해시 상태, 날짜)
+        self.skipped_bytes = 0
+        self._hasher = hashlib.sha256()
+        self._carry = b''     # 아직 줄바꿈이 오지 않은 마지막 줄
+        self._scanned = 0     # _carry 시작 위치
+        self._target: Optional[int] = None
+        self._target_state = None   # resume() 중 확인할 위치에서의 해시 상태
+
+    def seekable(self) -> bool:
+        return hasattr(self.stream, 'seekable') and self.stream.seekable()
+
+    def read_room_key(self) -> Optional[str]:
+        """첫 줄(방 이름 머리말)을 읽어 방 식별자로 사용, 머리말이 없으면 None"""
+        return read_room_key(self.stream)
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size)
+        self._scan(chunk, final=not chunk)
+        return chunk
+
+    def _scan(self, chunk: bytes, final: bool = False):
+        """완성된 줄에서 날짜 구분선을 찾고 첫 구분선 이후 바이트를 해시에 반영"""
+        buffer = self._carry + chunk
+        cut = len(buffer) if final else buffer.rfind(b'\n') + 1
+        complete, self._carry = buffer[:cut], buffer[cut:]
+        base = self._scanned
+        self._scanned += cut
+        if not complete:
+            return
+
+        hashed = 0 if self.origin is not None else None
+        for match in DAY_LINE_PATTERN.finditer(complete):
+            if hashed is None:
+                self.origin = base + match.start()
+                hashed = match.start()
+            self._hasher.update(complete[hashed:match.start()])
+            hashed = match.start()
+            offset = base + hashed - self.origin
+            day = '-'.join(f'{int(part):02d}' for part in match.groups())
+            if offset == self._target:
+                self._target_state = self._hasher.copy()
+            self.checkpoint = (offset, self._hasher.copy(), day)
+        if hashed is not None:
+            self._hasher.update(complete[hashed:])
+
+    def resume(self, offset: int, prefix_sha256: str) -> bool:
+        """첫 구분선부터 offset까지의 내용이 이전 적재와 같으면 그 위치로 건너뜀"""
+        if not self.seekable() or offset < 0:
+            return False
+
+        self._target = offset
+        while self._target_state is None:
+            if self.origin is not None and self._scanned > self.origin + offset:
+                break
+            if not self.read(VERIFY_CHUNK_SIZE):
+                break
+        state, self._target, self._target_state = self._target_state, None, None
+        matched = state is not None and state.hexdigest() == prefix_sha256
+
+        start = self.origin + offset if matched else 0
+        self.stream.seek(start)
+        self._carry = b''
+        self._scanned = start
+        self.checkpoint = None
+        if matched:
+            self._hasher = state
+            self.skipped_bytes = start
+        else:
+            self.origin = None
+            self._hasher = hashlib.sha256()
+        return matched
+
+    def high_water_mark(self) -> Optional[Tuple[int, str, str]]:
+        """마지막 날짜 구분선의 (상대 오프셋, 앞부분 sha256, 날짜)"""
+        if self.checkpoint is None:
+            return None
+        offset, hasher, day = self.checkpoint
+        return offset, hasher.hexdigest(), day
+
+
+class IncrementalImport:
+    """업로드 한 건의 증분 적재 상태
+
+    방마다 저장된 체크포인트(마지막 날짜 구분선까지의 오프셋과 sha256)가 새 파일의 앞부분과 같으면
+    그 날짜부터만 파싱한다. 다시 읽는 마지막 날의 레코드는 이전에 저장한 해시 목록으로 걸러낸다.
+    """
+
+    def __init__(self, stream: BinaryIO, load_state: Callable[[str], Optional[Dict]]):
+        self.reader = CheckpointReader(stream)
+        self.hasher = RecordHasher()
+        self.room_key = self.reader.read_room_key()
+        self.previous = load_state(self.room_key) if self.room_key else None
+        self.resumed = bool(self.previous) and self.reader.resume(
+            self.previous['byte_offset'], self.previous['prefix_sha256']
+        )
+        self.known: Set[str] = set(self.previous.get('day_hashes') or []) if self.resumed else set()
+        self.skipped_records = 0
+
+    @property
+    def needs_existence_check(self) -> bool:
+        """이전 적재 기록은 있지만 앞부분이 달라 전체를 다시 읽는 경우 (저장소에서 중복 확인 필요)"""
+        return bool(self.previous) and not self.resumed
+
+    def filter(self, records: Iterable[Dict]) -> Tuple[List[Dict], List[str]]:
+        """레코드 해시를 계산하고 이전 업로드에서 이미 저장한 레코드를 제외"""
+        new_records, hashes = [], []
+        for record in records:
+            content_hash = self.hasher.hash(record)
+            if content_hash in self.known:
+                self.skipped_records += 1
+                continue
+            new_records.append(record)
+            hashes.append(content_hash)
+        return new_records, hashes
+
+    def next_state(self) -> Optional[Dict]:
+        """적재가 끝난 뒤 저장할 방의 새 체크포인트"""
+        mark = self.reader.high_water_mark()
+        if self.room_key is None or mark is None:
+            return None
+        offset, prefix_sha256, day = mark
+        if day != self.hasher.day:
+            return None
+        return {
+            'room_key': self.room_key,
+            'byte_offset': offset,
+            'prefix_sha256': prefix_sha256,
+            'day_hashes': list(self.hasher.day_hashes),
+        }
+
+    def summary(self) -> Dict:
+        """업로드 결과에 포함할 증분 적재 정보"""
+        return {
+            'room_key': self.room_key,
+            'resumed': self.resumed,
+            'skipped_bytes': self.reader.skipped_bytes,
+            'skipped_records': self.skipped_records,
+        }
@@ -0,0 +1,279 @@
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 최근 요청/작업 추적을 보관하는 개수
+RECENT_TRACE_LIMIT = 50
+# cProfile 결과 요약에 출력하는 함수 수
+PROFILE_TOP_FUNCTIONS = 40
+
+# /metrics 항목 설명
+METRIC_HELP = {
+    'kakao_http_request_duration_seconds': "HTTP 요청 처리 시간 (경로별)",
+    'kakao_http_requests_total': "HTTP 요청 수 (경로/상태 코드별)",
+    'kakao_span_duration_seconds': "처리 단계 시간 (백엔드/단계별)",
+    'kakao_span_rows_total': "처리 단계에서 다룬 행 수",
+    'kakao_span_bytes_total': "처리 단계에서 다룬 바이트 수",
+    'kakao_span_errors_total': "처리 단계 오류 수",
+}
+
+# 현재 실행 중인 단계 (스레드/작업마다 따로)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('kakao_span', default=None)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels) + '}'
+
+
+class Histogram:
+    """누적 구간 히스토그램 (Prometheus histogram 형식)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", repr(bound)),))} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {self.count}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {self.total:.6f}')
+        lines.append(f'{name}_count{_format_labels(labels)} {self.count}')
+        return lines
+
+
+class MetricsRegistry:
+    """프로세스 안의 카운터/히스토그램과 최근 추적 기록 (/metrics로 노출)"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._lock = threading.Lock()
+        self.recent_traces = deque(maxlen=RECENT_TRACE_LIMIT)
+        # 이 시간보다 오래 걸린 요청/작업은 단계별 시간을 출력
+        self.slow_trace_seconds = float(os.getenv('SLOW_TRACE_SECONDS', 1.0))
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._histograms):
+                lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    lines.extend(histogram.render(name, labels))
+            for name in sorted(self._counters):
+                lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f'{name}{_format_labels(labels)} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def finish_trace(self, trace: Dict):
+        """끝난 최상위 단계 기록 (느리면 단계별 시간 출력)"""
+        self.recent_traces.append(trace)
+        if trace['seconds'] >= self.slow_trace_seconds:
+            print(f"🐢 느린 처리 {trace['name']} {trace['seconds']:.3f}s: "
+                  f"{json.dumps(trace, ensure_ascii=False, default=str)}")
+
+
+metrics = MetricsRegistry()
+
+
+class Span:
+    """처리 단계 하나의 시간/행 수/바이트 수
+
+    같은 이름의 하위 단계(배치마다 반복되는 저장 등)는 부모 안에서 횟수와 합계로 묶는다.
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        # 'supabase.search' -> backend 'supabase'
+        self.backend = name.split('.', 1)[0] if '.' in name else 'app'
+        self.attrs = attrs
+        self.rows = 0
+        self.bytes = 0
+        self.error: Optional[str] = None
+        self.children: Dict[str, Dict] = {}
+        self.parent: Optional['Span'] = None
+        self.started = None
+        self.seconds = 0.0
+        self._token = None
+        self._lock = threading.Lock()
+
+    def start(self) -> 'Span':
+        self.parent = _current_span.get()
+        self.started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        _current_span.reset(self._token)
+        metrics.observe('kakao_span_duration_seconds', self.seconds, backend=self.backend, span=self.name)
+        if self.rows:
+            metrics.inc('kakao_span_rows_total', self.rows, backend=self.backend, span=self.name)
+        if self.bytes:
+            metrics.inc('kakao_span_bytes_total', self.bytes, backend=self.backend, span=self.name)
+        if self.error is not None:
+            metrics.inc('kakao_span_errors_total', backend=self.backend, span=self.name)
+        if self.parent is not None:
+            self.parent._merge_child(self.to_dict())
+        else:
+            metrics.finish_trace({**self.to_dict(), 'finished_at': datetime.now().isoformat()})
+
+    def __enter__(self) -> 'Span':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc is not None and self.error is None:
+            self.error = f'{exc_type.__name__}: {exc}'
+        self.finish()
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        data = {'name': self.name, 'seconds': round(self.seconds, 6), 'count': 1}
+        if self.rows:
+            data['rows'] = self.rows
+        if self.bytes:
+            data['bytes'] = self.bytes
+        if self.attrs:
+            data['attrs'] = self.attrs
+        if self.error is not None:
+            data['error'] = self.error
+        with self._lock:
+            if self.children:
+                data['children'] = list(self.children.values())
+        return data
+
+    def _merge_child(self, child: Dict):
+        """하위 단계 결과를 같은 이름끼리 합산 (여러 스레드에서 호출)"""
+        with self._lock:
+            _merge_summary(self.children, child)
+
+
+def _merge_summary(children: Dict[str, Dict], child: Dict):
+    """단계 요약을 이름별 합계에 더함 (하위 단계도 재귀적으로)"""
+    merged = children.get(child['name'])
+    if merged is None:
+        merged = children[child['name']] = {'name': child['name'], 'seconds': 0.0, 'count': 0}
+        if 'attrs' in child:
+            merged['attrs'] = child['attrs']
+    merged['count'] += child['count']
+    merged['seconds'] = round(merged['seconds'] + child['seconds'], 6)
+    for field in ('rows', 'bytes'):
+        if field in child:
+            merged[field] = merged.get(field, 0) + child[field]
+    if 'error' in child:
+        merged['error'] = child['error']
+    if 'children' in child:
+        nested = {summary['name']: summary for summary in merged.get('children', [])}
+        for grandchild in child['children']:
+            _merge_summary(nested, grandchild)
+        merged['children'] = list(nested.values())
+
+
+def span(name: str, **attrs) -> Span:
+    """처리 단계 측정용 with 블록 (이름의 '.' 앞부분이 백엔드 레이블: supabase.search, sqlite.save 등)"""
+    return Span(name, **attrs)
+
+
+def traced(name: str):
+    """메서드 전체를 단계로 측정하는 데코레이터 (목록을 반환하면 그 길이를 행 수로 기록)"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(name) as current:
+                result = func(*args, **kwargs)
+                if isinstance(result, list):
+                    current.rows = len(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def current_span() -> Optional[Span]:
+    """현재 실행 중인 단계 (없으면 None)"""
+    return _current_span.get()
+
+
+def note_error(error: Exception):
+    """잡아서 처리한 오류를 현재 단계에 기록 (print만 하던 오류도 /metrics에 집계)"""
+    current = _current_span.get()
+    if current is not None and current.error is None:
+        current.error = f'{type(error).__name__}: {error}'
+
+
+class RequestProfiler:
+    """요청 하나를 cProfile로 측정해 PROFILE_DIR에 .prof와 요약 .txt로 저장 (PROFILE_REQUESTS=1일 때만)"""
+
+    def __init__(self, enabled: Optional[bool] = None, directory: Optional[str] = None):
+        self.enabled = os.getenv('PROFILE_REQUESTS') == '1' if enabled is None else enabled
+        self.directory = directory or os.getenv('PROFILE_DIR', 'profiles')
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if not self.enabled:
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def dump(self, profiler: cProfile.Profile, label: str) -> str:
+        """측정을 끝내고 저장, .prof 파일 경로 반환"""
+        import pstats
+        profiler.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        safe_label = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in label).strip('_') or 'request'
+        base = os.path.join(self.directory, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{safe_label}")
+        profiler.dump_stats(base + '.prof')
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(base + '.txt', 'w', encoding='utf-8') as file:
+            file.write(summary.getvalue())
+        return base + '.prof'
@@ -0,0 +1,326 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+# 업로드 작업 상태
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# 진행 상황으로 갱신할 수 있는 컬럼
+PROGRESS_FIELDS = ('stage', 'lines_parsed', 'rows_written')
+
+# 업로드 스트림을 스풀 파일로 복사할 때의 청크 크기
+SPOOL_COPY_SIZE = 1024 * 1024
+
+# 청크 업로드에서 요청 하나에 담는 권장 크기 (요청 본문 상한 MAX_CONTENT_LENGTH보다 작게)
+CHUNK_SIZE = 8 * 1024 * 1024
+# 받는 중인 업로드에서 청크가 이 시간(초) 동안 오지 않으면 중단된 것으로 보고 작업을 실패 처리
+# (받는 동안에는 워커를 차지하지 않으며, 다음 작업 큐 요청 때 정리)
+CHUNK_IDLE_TIMEOUT = 1800
+
+
+class ChunkChecksumError(ValueError):
+    """청크 본문이 함께 보낸 sha256과 다름"""
+
+
+class ChunkConflictError(Exception):
+    """청크 위치가 받은 바이트 수와 맞지 않거나 더 받지 않는 업로드 (offset: 이어 보낼 위치)"""
+
+    def __init__(self, message: str, offset: Optional[int] = None):
+        super().__init__(message)
+        self.offset = offset
+
+
+class ChunkedSpool:
+    """청크 업로드 한 건의 스풀 파일 (요청 스레드가 청크를 이어 붙이고, 다 받으면 작업으로 처리)"""
+
+    def __init__(self, path: str, received: int = 0, on_append: Optional[Callable[[int], None]] = None):
+        self.path = path
+        self.received = received
+        self.on_append = on_append or (lambda received: None)
+        self.complete = False
+        self.closed = False
+        self.last_activity = time.monotonic()
+        self._lock = threading.Lock()
+        # 재시작 후 이어 받을 때는 응답하지 못한(기록되지 않은) 꼬리를 버림
+        with open(path, 'ab') as spool:
+            spool.truncate(received)
+
+    def append(self, offset: int, data: bytes) -> int:
+        """offset 위치의 청크를 이어 붙이고 받은 바이트 수 반환 (이미 받은 구간은 내용이 같으면 건너뜀)"""
+        with self._lock:
+            if self.closed or self.complete:
+                raise ChunkConflictError("더 받지 않는 업로드입니다.", self.received)
+            self.last_activity = time.monotonic()
+            if offset < 0 or offset > self.received:
+                raise ChunkConflictError(f"{self.received} 위치부터 보내야 합니다.", self.received)
+            overlap = min(self.received - offset, len(data))
+            if overlap:
+                with open(self.path, 'rb') as spool:
+                    spool.seek(offset)
+                    if spool.read(overlap) != data[:overlap]:
+                        raise ChunkConflictError("이미 받은 구간과 내용이 다릅니다.", self.received)
+            if len(data) > overlap:
+                with open(self.path, 'ab') as spool:
+                    spool.write(data[overlap:])
+                self.received += len(data) - overlap
+                # 응답 전에 기록해 재시작해도 받았다고 알린 바이트는 남음
+                self.on_append(self.received)
+            return self.received
+
+    def finish(self, size: Optional[int] = None):
+        """마지막 청크까지 받음 (size가 있으면 받은 바이트 수와 같아야 함)"""
+        with self._lock:
+            if self.closed or self.complete:
+                raise ChunkConflictError("더 받지 않는 업로드입니다.", self.received)
+            if size is not None and size != self.received:
+                raise ChunkConflictError(f"{size}바이트 중 {self.received}바이트만 받았습니다.", self.received)
+            self.complete = True
+
+    def close(self):
+        """더 받지 않음 (오래 청크가 오지 않아 중단)"""
+        with self._lock:
+            self.closed = True
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_activity
+
+
+class JobStore:
+    """업로드 작업 상태를 저장하는 SQLite 테이블 (작업 큐 겸 진행 상황 저장소)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS upload_jobs (
+                id VARCHAR(32) PRIMARY KEY,
+                status VARCHAR(20) NOT NULL,
+                stage VARCHAR(30),
+                filename VARCHAR(255),
+                spool_path TEXT,
+                lines_parsed INTEGER DEFAULT 0,
+                rows_written INTEGER DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                receiving INTEGER DEFAULT 0,
+                bytes_received INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # 청크 업로드 컬럼이 없던 DB 마이그레이션
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(upload_jobs)')}
+        if 'receiving' not in columns:
+            self._conn.execute('ALTER TABLE upload_jobs ADD COLUMN receiving INTEGER DEFAULT 0')
+            self._conn.execute('ALTER TABLE upload_jobs ADD COLUMN bytes_received INTEGER DEFAULT 0')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_upload_jobs_status ON upload_jobs(status)')
+
+    def create(self, job_id: str, filename: str, spool_path: str, receiving: bool = False):
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO upload_jobs (id, status, stage, filename, spool_path, receiving) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, STATUS_QUEUED, 'queued', filename, spool_path, int(receiving))
+            )
+
+    def update(self, job_id: str, **fields):
+        """상태/진행 필드 갱신"""
+        if 'result' in fields and fields['result'] is not None:
+            fields['result'] = json.dumps(fields['result'], ensure_ascii=False)
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE upload_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (*fields.values(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            cursor = self._conn.execute('SELECT * FROM upload_jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            job = dict(zip([d[0] for d in cursor.description], row))
+        job.pop('spool_path', None)
+        job['receiving'] = bool(job['receiving'])
+        if job['result']:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def unfinished(self) -> List[Dict]:
+        """재시작 시 다시 실행해야 하는 작업 목록"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT id, filename, spool_path, receiving, bytes_received FROM upload_jobs '
+                'WHERE status IN (?, ?) ORDER BY created_at',
+                (STATUS_QUEUED, STATUS_RUNNING)
+            )
+            fields = ('id', 'filename', 'spool_path', 'receiving', 'bytes_received')
+            return [dict(zip(fields, row)) for row in cursor.fetchall()]
+
+
+class UploadJobQueue:
+    """업로드를 백그라운드 워커 풀에서 처리하는 작업 큐
+
+    요청은 업로드 스트림을 스풀 파일로 복사하고 작업 id만 받아 바로 반환한다.
+    작업 상태는 JobStore에 저장되므로 프로세스가 재시작되면 끝나지 않은 작업을 이어서 실행한다.
+
+    청크 업로드(begin -> append_chunk -> finish_upload)는 요청 스레드에서 청크를 스풀 파일에 이어 붙이고,
+    마지막 청크를 받은 뒤에 작업을 워커 풀에 넣는다. 받는 동안에는 워커를 차지하지 않으므로 멈춘 클라이언트가
+    다른 업로드를 막지 않으며, idle_timeout 동안 청크가 오지 않은 업로드는 실패 처리한다.
+    연결이 끊기면 받은 바이트 수부터 이어 보내면 된다.
+    """
+
+    def __init__(self, storage, db_path: str = None, spool_dir: str = None, workers: int = None):
+        # 저장소 또는 저장소를 돌려주는 함수 (함수면 작업을 처음 실행할 때 저장소 생성)
+        self._storage = storage
+        self.store = JobStore(db_path or os.getenv('JOB_DB_PATH', 'kakao_jobs.db'))
+        self.spool_dir = spool_dir or os.getenv(
+            'JOB_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'kakao_uploads')
+        )
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # 받는 중인 청크 업로드 (작업 id -> 스풀)
+        self._spools: Dict[str, ChunkedSpool] = {}
+        self.idle_timeout = float(os.getenv('CHUNK_IDLE_TIMEOUT', CHUNK_IDLE_TIMEOUT))
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or int(os.getenv('UPLOAD_WORKERS', 2)),
+            thread_name_prefix='upload-job'
+        )
+        self.resume_unfinished()
+
+    @property
+    def storage(self):
+        return self._storage() if callable(self._storage) else self._storage
+
+    def submit(self, stream: BinaryIO, filename: str) -> str:
+        """업로드 스트림을 스풀 파일에 저장하고 작업을 등록, 작업 id 반환"""
+        job_id = uuid.uuid4().hex
+        spool_path = os.path.join(self.spool_dir, f'{job_id}.txt')
+        with open(spool_path, 'wb') as spool:
+            shutil.copyfileobj(stream, spool, SPOOL_COPY_SIZE)
+
+        self.store.create(job_id, filename, spool_path)
+        self.executor.submit(self._run, job_id, spool_path, filename)
+        return job_id
+
+    def begin(self, filename: str) -> str:
+        """청크 업로드 시작: 빈 스풀 파일로 작업을 등록 (마지막 청크를 받으면 실행), 작업 id 반환"""
+        self.expire_idle()
+        job_id = uuid.uuid4().hex
+        spool_path = os.path.join(self.spool_dir, f'{job_id}.txt')
+        self.store.create(job_id, filename, spool_path, receiving=True)
+        self._start_receiving(job_id, spool_path, 0)
+        return job_id
+
+    def _start_receiving(self, job_id: str, spool_path: str, received: int):
+        spool = ChunkedSpool(spool_path, received, lambda received: self.store.update(job_id, bytes_received=received))
+        with self._lock:
+            self._spools[job_id] = spool
+        self.store.update(job_id, stage='receiving')
+
+    def expire_idle(self):
+        """idle_timeout 동안 청크가 오지 않은 업로드를 실패 처리하고 스풀 파일 삭제"""
+        with self._lock:
+            expired = [(job_id, spool) for job_id, spool in self._spools.items()
+                       if spool.idle_seconds() > self.idle_timeout]
+            for job_id, _ in expired:
+                del self._spools[job_id]
+        for job_id, spool in expired:
+            spool.close()
+            self.store.update(
+                job_id, status=STATUS_FAILED, receiving=0,
+                error=f"{self.idle_timeout:.0f}초 동안 청크가 오지 않아 업로드를 중단했습니다."
+            )
+            if os.path.exists(spool.path):
+                os.remove(spool.path)
+
+    def _receiving(self, job_id: str) -> Optional[ChunkedSpool]:
+        """받는 중인 업로드의 스풀 (없는 작업이면 None, 더 받지 않는 작업이면 ChunkConflictError)"""
+        self.expire_idle()
+        with self._lock:
+            spool = self._spools.get(job_id)
+        if spool is None:
+            job = self.store.get(job_id)
+            if job is None:
+                return None
+            raise ChunkConflictError(f"더 받지 않는 업로드입니다 (상태: {job['status']}).", job['bytes_received'])
+        return spool
+
+    def append_chunk(self, job_id: str, offset: int, data: bytes, sha256: Optional[str]) -> Optional[int]:
+        """청크 하나 저장 (본문 sha256 확인), 받은 바이트 수 반환 (없는 작업이면 None)"""
+        if hashlib.sha256(data).hexdigest() != (sha256 or '').strip().lower():
+            raise ChunkChecksumError("청크 sha256이 일치하지 않습니다.")
+        spool = self._receiving(job_id)
+        if spool is None:
+            return None
+        return spool.append(offset, data)
+
+    def finish_upload(self, job_id: str, size: Optional[int] = None) -> Optional[Dict]:
+        """마지막 청크까지 보냈음을 알림 (size가 있으면 받은 바이트 수와 비교), 작업 상태 반환"""
+        spool = self._receiving(job_id)
+        if spool is None:
+            return None
+        spool.finish(size)
+        with self._lock:
+            self._spools.pop(job_id, None)
+        self.store.update(job_id, receiving=0, stage='queued')
+        filename = self.store.get(job_id)['filename']
+        self.executor.submit(self._run, job_id, spool.path, filename)
+        return self.store.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """작업 상태 조회"""
+        self.expire_idle()
+        return self.store.get(job_id)
+
+    def resume_unfinished(self):
+        """이전 프로세스에서 끝나지 않은 작업을 다시 실행 (받던 청크 업로드는 받은 바이트부터 다시 받음)"""
+        for job in self.store.unfinished():
+            if job['spool_path'] and os.path.exists(job['spool_path']):
+                self.store.update(job['id'], status=STATUS_QUEUED, stage='queued')
+                if job['receiving']:
+                    self._start_receiving(job['id'], job['spool_path'], job['bytes_received'])
+                else:
+                    self.executor.submit(self._run, job['id'], job['spool_path'], job['filename'])
+            else:
+                self.store.update(job['id'], status=STATUS_FAILED, error='업로드 파일이 남아 있지 않습니다.')
+
+    def _run(self, job_id: str, spool_path: str, filename: str):
+        """워커 스레드: 스풀 파일을 파이프라인으로 처리"""
+        self.store.update(job_id, status=STATUS_RUNNING)
+
+        def progress(**fields):
+            fields = {name: value for name, value in fields.items() if name in PROGRESS_FIELDS}
+            if fields:
+                self.store.update(job_id, **fields)
+
+        try:
+            with open(spool_path, 'rb') as spool:
+                result = self.storage.process_upload(spool, filename, progress=progress)
+            if result.get('success'):
+                self.store.update(job_id, status=STATUS_DONE, stage='done', result=result)
+            else:
+                self.store.update(job_id, status=STATUS_FAILED, error=result.get('error', '알 수 없는 오류'))
+        except Exception as e:
+            print(f"❌ 업로드 작업 오류 ({job_id}): {e}")
+            self.store.update(job_id, status=STATUS_FAILED, error=str(e))
+        finally:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+
+    def shutdown(self, wait: bool = True):
+        """워커 풀 종료"""
+        self.executor.shutdown(wait=wait)
@@ -1,48 +1,218 @@
 import sqlite3
+import json
+import os
 import re
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
-# 조건부 import for jieba
-try:
-    import jieba  # 한국어 형태소 분석
-    JIEBA_AVAILABLE = True
-except ImportError:
-    JIEBA_AVAILABLE = False
-    print("⚠️ jieba 패키지가 설치되지 않았습니다. 형태소 분석 기능이 제한됩니다.")
+from itertools import islice
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
+from connection_pool import ConnectionPool
+from incremental_import import IncrementalImport, RecordHasher
+from heavy_hitters import (
+    TRENDING_RETENTION_DAYS, USER_TOP_CAPACITY, WINDOW_TOP_CAPACITY, CountMinSketch, HeavyHitters, KeywordTrends,
+    SpaceSaving, merge_summaries, window_start
+)
+from kakao_parser import KakaoTalkParser, day_start_timestamp, kst_day, to_timestamp
+from korean_tokenizer import BaseTokenizer, get_tokenizer, iter_keyword_rows
+from rollups import RollupAccumulator, summarize_user_statistics
+from user_dictionary import NicknameInterner, nickname_grams, query_grams, score_nickname
+
+# executemany 한 번에 넣는 메시지 수
+INSERT_BATCH_SIZE = 5000
+# 중복 확인 시 IN (...) 한 번에 넣는 해시 수 (SQLite 변수 개수 제한)
+HASH_LOOKUP_BATCH_SIZE = 900
+# 내보내기에서 한 번에 읽는 메시지 수 (페이지마다 읽기 연결을 반납)
+EXPORT_PAGE_SIZE = 5000
+# 시각이 없는 행 구간의 처음부터 읽는 페이지 키 (모든 id보다 큼)
+NULL_TS_PAGE_KEY = (2 ** 63 - 1,)
+# 기존 DB의 인기 키워드 요약을 계산할 때 한 번에 읽는 키워드 인덱스 행 수
+KEYWORD_BACKFILL_ROWS = 200000
+
+# 보조 인덱스 (첫 적재 시에는 삭제 후 적재가 끝나면 한 번에 생성)
+SECONDARY_INDEXES = {
+    # 닉네임 조건은 사용자 사전 id로 찾음
+    'idx_messages_user': 'CREATE INDEX IF NOT EXISTS idx_messages_user ON messages(user_id)',
+    # 방 단위 조회는 (room_id, ...) 복합 인덱스로 그 방의 페이지만 읽음
+    'idx_messages_room_ts': 'CREATE INDEX IF NOT EXISTS idx_messages_room_ts ON messages(room_id, ts, message_type, user_id)',
+    # 기간 조건은 이 인덱스의 범위 스캔으로 처리 (통계 집계에 필요한 컬럼까지 포함하는 커버링 인덱스)
+    'idx_messages_ts': 'CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(ts, message_type, user_id)',
+    'idx_messages_type': 'CREATE INDEX IF NOT EXISTS idx_messages_type ON messages(message_type)',
+    'idx_keyword_index_keyword': 'CREATE INDEX IF NOT EXISTS idx_keyword_index_keyword ON keyword_index(keyword)',
+    'idx_keyword_index_message': 'CREATE INDEX IF NOT EXISTS idx_keyword_index_message ON keyword_index(message_id, keyword)',
+    # 같은 내용이라도 방이 다르면 다른 레코드
+    'idx_messages_room_hash': 'CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_room_hash ON messages(room_id, content_hash)',
+}
+
+# 더 이상 쓰지 않는 인덱스 (time_str은 "오후 3:05" 같은 문자열이라 정렬/범위 조회에 쓸 수 없음)
+RETIRED_INDEXES = ('idx_messages_time', 'idx_messages_content_hash', 'idx_messages_nickname')
+
+# 방 머리말이 없는 내보내기 파일과 방 구분 이전 데이터가 속하는 기본 방
+DEFAULT_ROOM_ID = 0
+DEFAULT_ROOM_KEY = ''
+DEFAULT_ROOM_NAME = '기본 방'
+
+# 방마다 따로 집계하는 테이블 (방 구분이 없던 기존 DB는 재구성하면서 기본 방으로 옮김)
+ROOM_SCOPED_TABLES = ('users', 'keyword_stats', 'daily_activity', 'hourly_activity')
+# 재구성 전에 이름을 비워 둘 기존 인덱스
+LEGACY_ROOM_INDEXES = ('idx_users_nickname', 'idx_users_total_messages', 'idx_keyword_stats_frequency')
+
+# trigram 토크나이저는 3글자 이상 검색어에서만 MATCH 가능
+FTS_MIN_KEYWORD_LENGTH = 3
+
+# 검색 결과의 닉네임 (반환하는 행에서만 사전을 조회하므로 실행 계획에 영향을 주지 않음)
+NICKNAME_COLUMN_SQL = '(SELECT nickname FROM user_dictionary WHERE id = m.user_id) AS nickname'
+# 사용자 조회 결과 기본 개수
+USER_LOOKUP_LIMIT = 10
+
+# messages 테이블과 전문 검색 인덱스를 동기화하는 트리거
+FTS_TRIGGERS = {
+    'messages_fts_ai': '''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, message_text) VALUES (new.id, new.message_text);
+        END
+    ''',
+    'messages_fts_ad': '''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, message_text) VALUES ('delete', old.id, old.message_text);
+        END
+    ''',
+    'messages_fts_au': '''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF message_text ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, message_text) VALUES ('delete', old.id, old.message_text);
+            INSERT INTO messages_fts(rowid, message_text) VALUES (new.id, new.message_text);
+        END
+    ''',
+}
 
 class KakaoTalkDatabase:
-    def __init__(self, db_path: str = "kakao_chat.db"):
+    def __init__(self, db_path: str = "kakao_chat.db", tokenizer: Optional[BaseTokenizer] = None):
         self.db_path = db_path
+        # 스레드별 읽기 연결 + 단일 쓰기 연결 (요청마다 새 연결을 만들지 않음)
+        self.pool = ConnectionPool(db_path)
+        # 키워드 추출기 (기본: 한글 어절 토크나이저 + LRU 캐시, KAKAO_TOKENIZER 환경변수로 변경)
+        self.tokenizer = tokenizer or get_tokenizer()
         self.init_database()
     
     def init_database(self):
         """데이터베이스 초기화 및 테이블 생성"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
+        with self.pool.writer() as conn:
+            # 읽기와 적재가 서로 막지 않도록 WAL 모드 사용 (DB 파일에 영구 저장됨)
+            conn.execute('PRAGMA journal_mode=WAL')
+        
+        with self._transaction() as cursor:
             # 메시지 테이블
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS messages (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     message_type VARCHAR(20) NOT NULL,
-                    nickname VARCHAR(255) NOT NULL,
+                    user_id INTEGER NOT NULL DEFAULT 0,
                     time_str VARCHAR(50) NOT NULL,
                     message_text TEXT,
                     raw_line TEXT,
+                    content_hash VARCHAR(32),
+                    ts INTEGER,
+                    room_id INTEGER NOT NULL DEFAULT 0,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            # 내용 해시 컬럼이 없던 기존 DB (기존 행은 날짜 정보가 없어 해시를 채우지 않음)
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(messages)')}
+            if 'content_hash' not in columns:
+                cursor.execute('ALTER TABLE messages ADD COLUMN content_hash VARCHAR(32)')
+            # 시각(epoch 초, KST 날짜 구분선 + 메시지 시간) 컬럼이 없던 기존 DB (기존 행은 날짜를 알 수 없어 NULL)
+            if 'ts' not in columns:
+                cursor.execute('ALTER TABLE messages ADD COLUMN ts INTEGER')
+            # 방 구분이 없던 기존 DB (기존 행은 기본 방)
+            legacy_rooms = 'room_id' not in columns
+            if legacy_rooms:
+                cursor.execute('ALTER TABLE messages ADD COLUMN room_id INTEGER NOT NULL DEFAULT 0')
+            
+            # 사용자 사전 (닉네임 문자열 -> 정수 id, 이름을 바꾼 사람의 닉네임들은 같은 canonical_id로 묶음)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_dictionary (
+                    id INTEGER PRIMARY KEY,
+                    nickname VARCHAR(255) UNIQUE NOT NULL,
+                    canonical_id INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_dictionary_canonical ON user_dictionary(canonical_id)')
+            # 닉네임 부분 일치/유사 조회용 n-gram 색인
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS nickname_grams (
+                    gram VARCHAR(8) NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    PRIMARY KEY (gram, user_id)
+                ) WITHOUT ROWID
+            ''')
+            # 닉네임 문자열을 저장하던 기존 DB는 사전 id로 변환
+            self._intern_legacy_nicknames(cursor)
             
-            # 사용자 테이블
+            # 방 테이블 (room_key는 내보내기 파일 첫 줄의 방 이름)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rooms (
+                    id INTEGER PRIMARY KEY,
+                    room_key VARCHAR(255) UNIQUE NOT NULL,
+                    name VARCHAR(255),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute(
+                'INSERT OR IGNORE INTO rooms (id, room_key, name) VALUES (?, ?, ?)',
+                (DEFAULT_ROOM_ID, DEFAULT_ROOM_KEY, DEFAULT_ROOM_NAME)
+            )
+            
+            # 방별 증분 적재 체크포인트
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS import_state (
+                    room_key VARCHAR(255) PRIMARY KEY,
+                    byte_offset INTEGER NOT NULL,
+                    prefix_sha256 VARCHAR(64) NOT NULL,
+                    day_hashes TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # 원격 저장소에서 복제해 온 마지막 위치 (로컬 복제본 동기화)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    source VARCHAR(64) PRIMARY KEY,
+                    last_id INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # 기존 DB에 적재 기록이 한 방뿐이면 기존 행이 속한 기본 방을 그 방으로 등록
+            if legacy_rooms:
+                room_keys = [row[0] for row in cursor.execute('SELECT room_key FROM import_state')]
+                if len(room_keys) == 1:
+                    cursor.execute(
+                        'UPDATE rooms SET room_key = ?, name = ? WHERE id = ?',
+                        (room_keys[0], room_keys[0], DEFAULT_ROOM_ID)
+                    )
+            
+            # 집계 테이블 존재 여부 (재구성 전에 확인)
+            cursor.execute('''
+                SELECT COUNT(*) FROM sqlite_master
+                WHERE type = 'table' AND name IN ('keyword_stats', 'daily_activity', 'hourly_activity')
+            ''')
+            rollups_existed = cursor.fetchone()[0] == 3
+            cursor.execute('''
+                SELECT COUNT(*) FROM sqlite_master
+                WHERE type = 'table' AND name IN ('keyword_windows', 'user_keywords')
+            ''')
+            keyword_summaries_existed = cursor.fetchone()[0] == 2
+            legacy_tables = self._detach_legacy_room_tables(cursor)
+            
+            # 사용자 테이블 (방마다 따로 집계)
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nickname VARCHAR(255) UNIQUE NOT NULL,
+                    room_id INTEGER NOT NULL DEFAULT 0,
+                    user_id INTEGER NOT NULL,
                     first_seen TIMESTAMP,
                     last_seen TIMESTAMP,
                     total_messages INTEGER DEFAULT 0,
                     join_count INTEGER DEFAULT 0,
-                    leave_count INTEGER DEFAULT 0
+                    leave_count INTEGER DEFAULT 0,
+                    UNIQUE (room_id, user_id)
                 )
             ''')
             
@@ -50,6 +220,7 @@ class KakaoTalkDatabase:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS keyword_index (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    room_id INTEGER NOT NULL DEFAULT 0,
                     message_id INTEGER,
                     keyword VARCHAR(100) NOT NULL,
                     position INTEGER,
@@ -57,154 +228,1102 @@ class KakaoTalkDatabase:
                 )
             ''')
             
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(keyword_index)')}
+            if 'room_id' not in columns:
+                cursor.execute('ALTER TABLE keyword_index ADD COLUMN room_id INTEGER NOT NULL DEFAULT 0')
+            
+            # 집계 테이블 (적재 트랜잭션 안에서 증분 갱신)
+            self._create_rollup_tables(cursor)
+            self._create_keyword_summary_tables(cursor)
+            self._copy_legacy_room_tables(cursor, legacy_tables)
+            
             # 인덱스 생성
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_nickname ON messages(nickname)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_time ON messages(time_str)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_type ON messages(message_type)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_keyword_index_keyword ON keyword_index(keyword)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_nickname ON users(nickname)')
+            for index_name in RETIRED_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+            self._create_indexes(cursor)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_user ON users(user_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_total_messages ON users(room_id, total_messages DESC)')
+            
+            # 집계 테이블이 없던 기존 DB는 한 번만 전체 재계산
+            if not rollups_existed:
+                self._backfill_rollups(cursor)
+            if not keyword_summaries_existed:
+                self._backfill_keyword_summaries(cursor)
             
-            conn.commit()
+            # 전문 검색 인덱스 (FTS5 trigram, messages 테이블을 외부 콘텐츠로 사용)
+            self.fts_enabled = self._init_fts(cursor)
     
-    def save_messages(self, messages: List[Dict]):
-        """파싱된 메시지들을 데이터베이스에 저장"""
-        with sqlite3.connect(self.db_path) as conn:
+    def _create_rollup_tables(self, cursor):
+        """통계 조회용 집계 테이블 생성"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS keyword_stats (
+                room_id INTEGER NOT NULL DEFAULT 0,
+                keyword VARCHAR(100) NOT NULL,
+                frequency INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (room_id, keyword)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_keyword_stats_frequency ON keyword_stats(room_id, frequency DESC)')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_activity (
+                room_id INTEGER NOT NULL DEFAULT 0,
+                day VARCHAR(10) NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                join_count INTEGER NOT NULL DEFAULT 0,
+                leave_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (room_id, day)
+            ) WITHOUT ROWID
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hourly_activity (
+                room_id INTEGER NOT NULL DEFAULT 0,
+                hour INTEGER NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (room_id, hour)
+            ) WITHOUT ROWID
+        ''')
+    
+    def _create_keyword_summary_tables(self, cursor):
+        """인기 키워드 요약 테이블 생성 (적재 트랜잭션 안에서 증분 갱신)"""
+        # 방별 하루치 요약 (Count-Min Sketch + Space-Saving 상위 후보, TRENDING_RETENTION_DAYS일만 보관)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS keyword_windows (
+                room_id INTEGER NOT NULL DEFAULT 0,
+                day VARCHAR(10) NOT NULL,
+                sketch BLOB NOT NULL,
+                top_keywords TEXT NOT NULL,
+                PRIMARY KEY (room_id, day)
+            )
+        ''')
+        # 방별 사용자 상위 키워드 (Space-Saving, 사용자당 카운터 USER_TOP_CAPACITY개)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_keywords (
+                room_id INTEGER NOT NULL DEFAULT 0,
+                user_id INTEGER NOT NULL,
+                top_keywords TEXT NOT NULL,
+                PRIMARY KEY (room_id, user_id)
+            ) WITHOUT ROWID
+        ''')
+    
+    def _backfill_keyword_summaries(self, cursor):
+        """기존 키워드 인덱스로 인기 키워드 요약 계산 (KEYWORD_BACKFILL_ROWS행마다 요약에 반영해 메모리 사용량 일정)"""
+        # 방마다 마지막 메시지 날짜에서 보관 기간 안의 행만 하루치 요약에 넣음
+        cutoffs = {
+            room_id: day_start_timestamp(window_start(kst_day(latest_ts), TRENDING_RETENTION_DAYS))
+            for room_id, latest_ts in cursor.execute(
+                'SELECT room_id, MAX(ts) FROM messages WHERE ts IS NOT NULL GROUP BY room_id'
+            ).fetchall()
+        }
+        rows = cursor.connection.cursor()
+        rows.execute('''
+            SELECT m.room_id, m.ts, m.user_id, k.keyword
+            FROM keyword_index k
+            JOIN messages m ON m.id = k.message_id
+        ''')
+        while True:
+            chunk = rows.fetchmany(KEYWORD_BACKFILL_ROWS)
+            if not chunk:
+                break
+            trends: Dict[int, KeywordTrends] = {}
+            for room_id, ts, user_id, keyword in chunk:
+                recent = ts is not None and ts >= cutoffs.get(room_id, ts)
+                trends.setdefault(room_id, KeywordTrends()).add(kst_day(ts) if recent else None, user_id, keyword)
+            for room_id, room_trends in trends.items():
+                self._apply_keyword_trends(cursor, room_trends, room_id)
+    
+    def _detach_legacy_room_tables(self, cursor) -> List[str]:
+        """방 구분이 없거나 닉네임 문자열로 집계하던 테이블의 이름을 바꿔 두고 목록 반환 (새 테이블 생성 후 복사)"""
+        legacy = []
+        for table in ROOM_SCOPED_TABLES:
+            columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+            if columns and ('room_id' not in columns or 'nickname' in columns):
+                cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+                legacy.append(table)
+        if legacy:
+            for index_name in LEGACY_ROOM_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+        return legacy
+    
+    def _copy_legacy_room_tables(self, cursor, tables: List[str]):
+        """이름을 바꿔 둔 기존 집계 테이블의 행을 옮기고 삭제 (방 구분이 없던 행은 기본 방, 닉네임은 사전 id로)"""
+        for table in tables:
+            columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table}_legacy)')]
+            if 'nickname' in columns:
+                kept = [column for column in columns if column not in ('id', 'nickname')]
+                cursor.execute(f'''
+                    INSERT INTO {table} (user_id, {', '.join(kept)})
+                    SELECT d.id, {', '.join('l.' + column for column in kept)}
+                    FROM {table}_legacy l
+                    JOIN user_dictionary d ON d.nickname = l.nickname
+                ''')
+            else:
+                names = ', '.join(columns)
+                cursor.execute(f'INSERT INTO {table} ({names}) SELECT {names} FROM {table}_legacy')
+            cursor.execute(f'DROP TABLE {table}_legacy')
+    
+    def _intern_legacy_nicknames(self, cursor):
+        """닉네임 문자열을 저장하던 기존 DB의 닉네임을 사전에 등록하고 messages.nickname을 사전 id(user_id)로 교체"""
+        interner = NicknameInterner(cursor)
+        for table in ('messages', 'users'):
+            columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+            if 'nickname' in columns:
+                for nickname in [row[0] for row in cursor.execute(f'SELECT DISTINCT nickname FROM {table}')]:
+                    interner.intern(nickname)
+        
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(messages)')}
+        if 'nickname' not in columns:
+            return
+        if 'user_id' not in columns:
+            cursor.execute('ALTER TABLE messages ADD COLUMN user_id INTEGER NOT NULL DEFAULT 0')
+        cursor.execute('UPDATE messages SET user_id = (SELECT id FROM user_dictionary d WHERE d.nickname = messages.nickname)')
+        # 닉네임 컬럼을 쓰던 인덱스는 지우고 사전 id 기준으로 다시 생성
+        for index_name in (*RETIRED_INDEXES, *SECONDARY_INDEXES):
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+        cursor.execute('ALTER TABLE messages DROP COLUMN nickname')
+    
+    def _backfill_rollups(self, cursor):
+        """기존 데이터로 방마다 집계 테이블(사용자/키워드/일별/시간대별) 재계산 (날짜 정보가 없는 과거 행은 일별 집계에서 제외)"""
+        cursor.execute('DELETE FROM keyword_stats')
+        cursor.execute('''
+            INSERT INTO keyword_stats (room_id, keyword, frequency)
+            SELECT room_id, keyword, COUNT(*) FROM keyword_index GROUP BY room_id, keyword
+        ''')
+        
+        # 사용자는 닉네임 대신 사전 id로 집계 (메시지 행은 한 번만 훑음)
+        rooms: Dict[int, RollupAccumulator] = {}
+        rows = cursor.connection.cursor()
+        rows.execute('SELECT room_id, user_id, message_type, time_str, ts FROM messages')
+        for room_id, user_id, message_type, time_str, ts in rows:
+            rollups = rooms.get(room_id)
+            if rollups is None:
+                rollups = rooms[room_id] = RollupAccumulator()
+            rollups.add({'type': message_type, 'nickname': user_id, 'time': time_str, 'date': kst_day(ts)})
+        
+        cursor.execute('DELETE FROM daily_activity')
+        cursor.execute('DELETE FROM hourly_activity')
+        for room_id, rollups in rooms.items():
+            # 기존 사용자 행의 first_seen/last_seen은 유지하고 수만 메시지 기준으로 맞춤
+            cursor.executemany('''
+                INSERT INTO users (room_id, user_id, first_seen, last_seen, total_messages, join_count, leave_count)
+                VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, ?)
+                ON CONFLICT(room_id, user_id) DO UPDATE SET
+                    total_messages = excluded.total_messages,
+                    join_count = excluded.join_count,
+                    leave_count = excluded.leave_count
+            ''', [(room_id, *row) for row in rollups.user_rows()])
+            cursor.executemany(
+                'INSERT INTO daily_activity (room_id, day, message_count, join_count, leave_count) VALUES (?, ?, ?, ?, ?)',
+                [(room_id, *row) for row in rollups.daily_rows()]
+            )
+            cursor.executemany(
+                'INSERT INTO hourly_activity (room_id, hour, message_count) VALUES (?, ?, ?)',
+                [(room_id, *row) for row in rollups.hourly_rows()]
+            )
+    
+    @contextmanager
+    def _transaction(self):
+        """쓰기 연결에서 BEGIN IMMEDIATE 트랜잭션 실행 (예외 시 롤백)"""
+        with self.pool.writer() as conn:
             cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+                cursor.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+    
+    def close(self):
+        """연결 풀 닫기"""
+        self.pool.close()
+    
+    def get_pool_metrics(self) -> Dict:
+        """연결 풀 적중/대기 통계"""
+        return self.pool.get_metrics()
+    
+    def _init_fts(self, cursor) -> bool:
+        """FTS5 가상 테이블과 동기화 트리거 생성, 사용할 수 없으면 False"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'")
+        existed = cursor.fetchone() is not None
+        
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    message_text,
+                    content='messages',
+                    content_rowid='id',
+                    tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ FTS5 전문 검색을 사용할 수 없습니다. LIKE 검색으로 대체합니다: {e}")
+            return False
+        
+        self._create_fts_triggers(cursor)
+        
+        # 기존 DB에 처음 추가된 경우 이미 저장된 메시지로 인덱스 구축
+        if not existed:
+            cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+        return True
+    
+    def _create_fts_triggers(self, cursor):
+        """전문 검색 동기화 트리거 생성"""
+        for create_sql in FTS_TRIGGERS.values():
+            cursor.execute(create_sql)
+    
+    def _drop_fts_triggers(self, cursor):
+        """대량 적재 전 전문 검색 동기화 트리거 삭제"""
+        for trigger_name in FTS_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+    
+    def ensure_room(self, room_key: Optional[str], name: Optional[str] = None,
+                    room_id: Optional[int] = None) -> int:
+        """방 등록 후 id 반환 (room_key가 없으면 기본 방, room_id를 주면 그 번호로 등록 - 샤드용)"""
+        if not room_key:
+            return DEFAULT_ROOM_ID
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT id FROM rooms WHERE room_key = ?', (room_key,)).fetchone()
+        if row is not None:
+            return row[0]
+        with self._transaction() as cursor:
+            cursor.execute(
+                'INSERT OR IGNORE INTO rooms (id, room_key, name) VALUES (?, ?, ?)',
+                (room_id, room_key, name or room_key)
+            )
+            return cursor.execute('SELECT id FROM rooms WHERE room_key = ?', (room_key,)).fetchone()[0]
+    
+    def get_rooms(self) -> List[Dict]:
+        """방 목록과 방별 메시지/사용자 수 (집계 테이블 기준, 메시지가 없는 기본 방은 제외)"""
+        with self.pool.reader() as conn:
+            cursor = conn.execute('''
+                SELECT r.id, r.room_key, r.name,
+                       COALESCE(SUM(u.total_messages), 0), COUNT(u.user_id)
+                FROM rooms r
+                LEFT JOIN users u ON u.room_id = r.id
+                GROUP BY r.id
+                ORDER BY r.id
+            ''')
+            return [
+                {'room_id': row[0], 'room_key': row[1], 'name': row[2],
+                 'total_messages': row[3], 'users': row[4]}
+                for row in cursor.fetchall()
+                if row[0] != DEFAULT_ROOM_ID or row[4]
+            ]
+    
+    def find_room(self, room_key: str) -> Optional[int]:
+        """room_key로 방 id 조회 (없으면 None)"""
+        if not room_key:
+            return DEFAULT_ROOM_ID
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT id FROM rooms WHERE room_key = ?', (room_key,)).fetchone()
+        return row[0] if row else None
+    
+    def save_messages(self, messages: Iterable[Dict], batch_size: int = INSERT_BATCH_SIZE,
+                      hasher: Optional[RecordHasher] = None, room_id: int = DEFAULT_ROOM_ID) -> int:
+        """파싱된 메시지들을 데이터베이스에 저장 (이미 저장된 레코드는 건너뜀), 새로 저장한 수 반환"""
+        hasher = hasher or RecordHasher()
+        messages = iter(messages)
+        
+        def hashed_batches():
+            while True:
+                batch = list(islice(messages, batch_size))
+                if not batch:
+                    return
+                yield batch, [hasher.hash(msg) for msg in batch]
+        
+        with self._transaction() as cursor:
+            return self._save_hashed_batches(cursor, hashed_batches(), room_id)
+    
+    def save_hashed(self, batches: Iterable[Tuple[List[Dict], List[str]]], room_id: int = DEFAULT_ROOM_ID) -> int:
+        """내용 해시를 이미 계산한 (레코드, 해시) 배치를 저장 (백업 복원 등), 새로 저장한 수 반환"""
+        with self._transaction() as cursor:
+            return self._save_hashed_batches(cursor, batches, room_id)
+    
+    def import_export(self, source, batch_size: int = INSERT_BATCH_SIZE, room_id: Optional[int] = None) -> Dict:
+        """내보내기 파일을 증분 적재 (같은 방의 이전 적재 지점까지는 파싱하지 않고 건너뜀)
+        
+        방은 파일 첫 줄의 방 이름으로 정하며, room_id를 주면 그 방에 적재한다 (샤드 라우터).
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as stream:
+                return self.import_export(stream, batch_size, room_id)
+        
+        incremental = IncrementalImport(source, self.get_import_state)
+        if room_id is None:
+            room_id = self.ensure_room(incremental.room_key)
+        parser = KakaoTalkParser(incremental.reader)
+        with self._transaction() as cursor:
+            inserted = self._save_hashed_batches(
+                cursor, (incremental.filter(batch) for batch in parser.iter_batches(batch_size)), room_id
+            )
+            state = incremental.next_state()
+            if state:
+                self._save_import_state(cursor, state)
+        return {'inserted': inserted, 'lines_read': parser.lines_read, 'room_id': room_id, **incremental.summary()}
+    
+    def get_import_state(self, room_key: str) -> Optional[Dict]:
+        """방의 증분 적재 체크포인트 조회"""
+        with self.pool.reader() as conn:
+            row = conn.execute(
+                'SELECT byte_offset, prefix_sha256, day_hashes FROM import_state WHERE room_key = ?',
+                (room_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'room_key': room_key,
+            'byte_offset': row[0],
+            'prefix_sha256': row[1],
+            'day_hashes': json.loads(row[2] or '[]'),
+        }
+    
+    def get_sync_position(self, source: str) -> int:
+        """원격 저장소에서 마지막으로 복제한 행 id (없으면 0)"""
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT last_id FROM sync_state WHERE source = ?', (source,)).fetchone()
+        return row[0] if row else 0
+    
+    def save_sync_position(self, source: str, last_id: int):
+        """원격 저장소 복제 위치 저장"""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO sync_state (source, last_id, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(source) DO UPDATE SET
+                    last_id = excluded.last_id,
+                    updated_at = excluded.updated_at
+            ''', (source, last_id))
+    
+    def save_import_state(self, state: Dict):
+        """방의 증분 적재 체크포인트 저장 (다른 저장소에 적재한 업로드의 체크포인트를 로컬에도 기록)"""
+        with self._transaction() as cursor:
+            self._save_import_state(cursor, state)
+    
+    def _save_import_state(self, cursor, state: Dict):
+        """방의 증분 적재 체크포인트 저장 (메시지 적재와 같은 트랜잭션)"""
+        cursor.execute('''
+            INSERT INTO import_state (room_key, byte_offset, prefix_sha256, day_hashes, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(room_key) DO UPDATE SET
+                byte_offset = excluded.byte_offset,
+                prefix_sha256 = excluded.prefix_sha256,
+                day_hashes = excluded.day_hashes,
+                updated_at = excluded.updated_at
+        ''', (state['room_key'], state['byte_offset'], state['prefix_sha256'], json.dumps(state['day_hashes'])))
+    
+    def _save_hashed_batches(self, cursor, batches: Iterable[Tuple[List[Dict], List[str]]],
+                             room_id: int = DEFAULT_ROOM_ID) -> int:
+        """(레코드, 내용 해시) 배치를 방에 저장 (배치 단위 executemany + 집계 테이블 UPSERT)"""
+        # 빈 테이블에 처음 적재할 때는 인덱스를 나중에 한 번에 생성
+        first_load = cursor.execute('SELECT 1 FROM messages LIMIT 1').fetchone() is None
+        # 방에 처음 적재하는 경우 해시 순번으로 구분되므로 중복 확인 생략
+        room_empty = first_load or cursor.execute(
+            'SELECT 1 FROM messages WHERE room_id = ? LIMIT 1', (room_id,)
+        ).fetchone() is None
+        if first_load:
+            self._drop_indexes(cursor)
+        if self.fts_enabled:
+            # 행마다 트리거로 전문 검색 인덱스를 갱신하면 추가 적재 시간 대부분을 차지하므로 끝에서 한 번에 반영
+            self._drop_fts_triggers(cursor)
+        
+        # 쓰기 잠금을 잡은 상태이므로 id를 직접 할당해도 충돌하지 않음
+        first_id = next_id = self._next_message_id(cursor)
+        # 사용자/키워드/일별/시간대별 카운터는 메모리에서 집계 후 마지막에 한 번만 반영
+        rollups = RollupAccumulator()
+        # 닉네임은 사용자 사전 id로 저장 (처음 보는 닉네임만 사전에 추가)
+        interner = NicknameInterner(cursor)
+        # 인기 키워드 요약도 날짜별/사용자별 빈도를 모아 마지막에 한 번만 반영
+        trends = KeywordTrends()
+        
+        for batch, hashes in batches:
+            # 이미 저장된 레코드는 행과 집계 모두에서 제외
+            existing = set() if room_empty else self._existing_hashes(cursor, hashes, room_id)
             
-            for msg in messages:
-                # 메시지 저장
-                cursor.execute('''
-                    INSERT INTO messages (message_type, nickname, time_str, message_text, raw_line)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    msg['type'],
-                    msg['nickname'],
-                    msg['time'],
-                    msg.get('message', ''),
-                    msg['raw_line']
+            message_rows = []
+            keyword_texts = []
+            # 메시지 id -> (날짜, 사용자 사전 id)
+            keyword_owners = {}
+            for msg, content_hash in zip(batch, hashes):
+                if content_hash in existing:
+                    continue
+                message_type = msg['type']
+                message_text = msg.get('message', '')
+                user_id = interner.intern(msg['nickname'])
+                message_rows.append((
+                    next_id,
+                    message_type,
+                    user_id,
+                    msg.get('time', ''),
+                    message_text,
+                    msg['raw_line'],
+                    content_hash,
+                    to_timestamp(msg.get('date'), msg.get('time')),
+                    room_id
                 ))
                 
-                message_id = cursor.lastrowid
+                rollups.add(msg)
                 
-                # 사용자 정보 업데이트
-                self._update_user_info(cursor, msg)
+                # 키워드 인덱싱 (메시지인 경우만, 배치 단위로 한 번에 토큰화)
+                if message_type == 'message' and message_text:
+                    keyword_texts.append((next_id, message_text))
+                    keyword_owners[next_id] = (msg.get('date'), user_id)
                 
-                # 키워드 인덱싱 (메시지인 경우만)
-                if msg['type'] == 'message' and msg.get('message'):
-                    self._index_keywords(cursor, message_id, msg['message'])
+                next_id += 1
             
-            conn.commit()
+            cursor.executemany('''
+                INSERT INTO messages (id, message_type, user_id, time_str, message_text, raw_line, content_hash, ts, room_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', message_rows)
+            keyword_rows = list(iter_keyword_rows(self.tokenizer, keyword_texts))
+            cursor.executemany('''
+                INSERT INTO keyword_index (room_id, message_id, keyword, position)
+                VALUES (?, ?, ?, ?)
+            ''', [(room_id, *row) for row in keyword_rows])
+            rollups.add_keywords(row[1] for row in keyword_rows)
+            for message_id, keyword, _ in keyword_rows:
+                day, user_id = keyword_owners[message_id]
+                trends.add(day, user_id, keyword)
+        
+        self._apply_rollups(cursor, rollups, interner, room_id)
+        self._apply_keyword_trends(cursor, trends, room_id)
+        
+        if first_load:
+            self._create_indexes(cursor)
+        if self.fts_enabled:
+            if first_load:
+                # 행마다 트리거를 거치는 대신 적재 후 전문 검색 인덱스를 한 번에 구축
+                cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+            else:
+                # 이번에 추가한 행(id가 first_id 이상)만 한 문장으로 색인
+                cursor.execute(
+                    'INSERT INTO messages_fts (rowid, message_text) SELECT id, message_text FROM messages WHERE id >= ?',
+                    (first_id,)
+                )
+            self._create_fts_triggers(cursor)
+        return next_id - first_id
+    
+    def _existing_hashes(self, cursor, hashes: List[str], room_id: int = DEFAULT_ROOM_ID) -> set:
+        """배치의 내용 해시 중 그 방에 이미 저장된 것"""
+        existing = set()
+        for start in range(0, len(hashes), HASH_LOOKUP_BATCH_SIZE):
+            chunk = hashes[start:start + HASH_LOOKUP_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(
+                f'SELECT content_hash FROM messages WHERE room_id = ? AND content_hash IN ({placeholders})',
+                [room_id, *chunk]
+            )
+            existing.update(row[0] for row in cursor)
+        return existing
+    
+    def _next_message_id(self, cursor) -> int:
+        """AUTOINCREMENT 규칙과 동일하게 다음 메시지 id 계산"""
+        cursor.execute('''
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'messages'), 0),
+                COALESCE((SELECT MAX(id) FROM messages), 0)
+            )
+        ''')
+        return cursor.fetchone()[0] + 1
     
-    def _update_user_info(self, cursor, msg: Dict):
-        """사용자 정보 업데이트"""
-        nickname = msg['nickname']
+    def _apply_rollups(self, cursor, rollups: RollupAccumulator, interner: NicknameInterner,
+                       room_id: int = DEFAULT_ROOM_ID):
+        """집계된 증분을 방의 항목당 한 번의 UPSERT로 반영"""
+        cursor.executemany('''
+            INSERT INTO users (room_id, user_id, first_seen, last_seen, total_messages, join_count, leave_count)
+            VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, ?)
+            ON CONFLICT(room_id, user_id) DO UPDATE SET
+                total_messages = total_messages + excluded.total_messages,
+                join_count = join_count + excluded.join_count,
+                leave_count = leave_count + excluded.leave_count,
+                last_seen = CASE
+                    WHEN excluded.total_messages + excluded.join_count > 0 THEN CURRENT_TIMESTAMP
+                    ELSE last_seen
+                END
+        ''', [(room_id, interner.intern(nickname), *counters) for nickname, *counters in rollups.user_rows()])
         
-        # 사용자 존재 여부 확인
-        cursor.execute('SELECT id FROM users WHERE nickname = ?', (nickname,))
-        user = cursor.fetchone()
+        cursor.executemany('''
+            INSERT INTO keyword_stats (room_id, keyword, frequency) VALUES (?, ?, ?)
+            ON CONFLICT(room_id, keyword) DO UPDATE SET frequency = frequency + excluded.frequency
+        ''', [(room_id, *row) for row in rollups.keyword_rows()])
         
-        if user:
-            # 기존 사용자 정보 업데이트
-            if msg['type'] == 'message':
-                cursor.execute('''
-                    UPDATE users 
-                    SET last_seen = CURRENT_TIMESTAMP, total_messages = total_messages + 1
-                    WHERE nickname = ?
-                ''', (nickname,))
-            elif msg['type'] == 'join':
-                cursor.execute('''
-                    UPDATE users 
-                    SET last_seen = CURRENT_TIMESTAMP, join_count = join_count + 1
-                    WHERE nickname = ?
-                ''', (nickname,))
-            elif msg['type'] == 'leave':
+        cursor.executemany('''
+            INSERT INTO daily_activity (room_id, day, message_count, join_count, leave_count) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(room_id, day) DO UPDATE SET
+                message_count = message_count + excluded.message_count,
+                join_count = join_count + excluded.join_count,
+                leave_count = leave_count + excluded.leave_count
+        ''', [(room_id, *row) for row in rollups.daily_rows()])
+        
+        cursor.executemany('''
+            INSERT INTO hourly_activity (room_id, hour, message_count) VALUES (?, ?, ?)
+            ON CONFLICT(room_id, hour) DO UPDATE SET message_count = message_count + excluded.message_count
+        ''', [(room_id, *row) for row in rollups.hourly_rows()])
+    
+    def _apply_keyword_trends(self, cursor, trends: KeywordTrends, room_id: int = DEFAULT_ROOM_ID):
+        """날짜별/사용자별 키워드 빈도를 방의 요약에 합침 (보관 기간보다 오래된 날짜는 버림)"""
+        if not trends:
+            return
+        stored = cursor.execute('SELECT MAX(day) FROM keyword_windows WHERE room_id = ?', (room_id,)).fetchone()[0]
+        latest = max(filter(None, (stored, *trends.days)), default=None)
+        if latest is not None:
+            cutoff = window_start(latest, TRENDING_RETENTION_DAYS)
+            for day, counts in trends.days.items():
+                if day < cutoff:
+                    continue
+                row = cursor.execute(
+                    'SELECT sketch, top_keywords FROM keyword_windows WHERE room_id = ? AND day = ?', (room_id, day)
+                ).fetchone()
+                summary = self._load_window(row) if row else HeavyHitters()
+                summary.update(counts)
                 cursor.execute('''
-                    UPDATE users 
-                    SET leave_count = leave_count + 1
-                    WHERE nickname = ?
-                ''', (nickname,))
-        else:
-            # 새 사용자 추가
+                    INSERT INTO keyword_windows (room_id, day, sketch, top_keywords) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(room_id, day) DO UPDATE SET
+                        sketch = excluded.sketch,
+                        top_keywords = excluded.top_keywords
+                ''', (room_id, day, summary.sketch.to_bytes(), summary.counters.to_json()))
+            cursor.execute('DELETE FROM keyword_windows WHERE room_id = ? AND day < ?', (room_id, cutoff))
+        
+        for user_id, counts in trends.users.items():
+            row = cursor.execute(
+                'SELECT top_keywords FROM user_keywords WHERE room_id = ? AND user_id = ?', (room_id, user_id)
+            ).fetchone()
+            summary = SpaceSaving.from_json(row[0], USER_TOP_CAPACITY) if row else SpaceSaving(USER_TOP_CAPACITY)
+            summary.update(counts)
             cursor.execute('''
-                INSERT INTO users (nickname, first_seen, last_seen, total_messages, join_count, leave_count)
-                VALUES (?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, ?)
-            ''', (
-                nickname,
-                1 if msg['type'] == 'message' else 0,
-                1 if msg['type'] == 'join' else 0,
-                1 if msg['type'] == 'leave' else 0
-            ))
-    
-    def _index_keywords(self, cursor, message_id: int, message_text: str):
-        """메시지 텍스트에서 키워드 추출하여 인덱싱"""
-        # 한국어 형태소 분석으로 키워드 추출
-        keywords = jieba.cut(message_text)
-        
-        for i, keyword in enumerate(keywords):
-            if len(keyword.strip()) > 1:  # 1글자 이상만 인덱싱
-                cursor.execute('''
-                    INSERT INTO keyword_index (message_id, keyword, position)
-                    VALUES (?, ?, ?)
-                ''', (message_id, keyword.strip(), i))
+                INSERT INTO user_keywords (room_id, user_id, top_keywords) VALUES (?, ?, ?)
+                ON CONFLICT(room_id, user_id) DO UPDATE SET top_keywords = excluded.top_keywords
+            ''', (room_id, user_id, summary.to_json()))
+    
+    @staticmethod
+    def _load_window(row: Tuple[bytes, str]) -> HeavyHitters:
+        """keyword_windows 행 (sketch, top_keywords) -> 요약"""
+        return HeavyHitters(CountMinSketch.from_bytes(row[0]), SpaceSaving.from_json(row[1], WINDOW_TOP_CAPACITY))
+    
+    def _create_indexes(self, cursor):
+        """보조 인덱스 생성"""
+        for create_sql in SECONDARY_INDEXES.values():
+            cursor.execute(create_sql)
+    
+    def _drop_indexes(self, cursor):
+        """대량 적재 전 보조 인덱스 삭제"""
+        for index_name in SECONDARY_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
     
     def search_messages(self, 
                        keyword: str = None, 
                        nickname: str = None, 
                        message_type: str = None,
-                       limit: int = 100) -> List[Dict]:
-        """메시지 검색"""
-        query = "SELECT * FROM messages WHERE 1=1"
-        params = []
+                       limit: int = 100,
+                       order: str = 'recent',
+                       after: Optional[Tuple] = None,
+                       start: Optional[int] = None,
+                       end: Optional[int] = None,
+                       room_id: Optional[int] = None) -> List[Dict]:
+        """메시지 검색
         
-        if keyword:
-            query += " AND message_text LIKE ?"
-            params.append(f"%{keyword}%")
+        order='recent'는 최신순, 'relevance'는 bm25 관련도순(전문 검색 시)으로 정렬한다.
+        after에 이전 페이지 마지막 행의 next_page_key()를 넘기면 그 다음 페이지를 반환한다.
+        start/end(epoch 초, end는 미포함)를 주면 그 기간의 메시지만 idx_messages_ts 범위 스캔으로 조회한다.
+        room_id를 주면 그 방의 메시지만 (room_id, ts) 인덱스 순서로 읽는다.
+        """
+        ranged = start is not None or end is not None or room_id is not None
+        use_fts = bool(keyword) and self.fts_enabled and len(keyword) >= FTS_MIN_KEYWORD_LENGTH
+        if order == 'relevance' and not use_fts:
+            order = 'recent'
         
-        if nickname:
-            query += " AND nickname LIKE ?"
-            params.append(f"%{nickname}%")
+        if use_fts:
+            query = f'''
+                SELECT m.*, {NICKNAME_COLUMN_SQL},
+                       snippet(messages_fts, 0, '<mark>', '</mark>', '…', 16) AS snippet,
+                       messages_fts.rank AS rank
+                FROM messages_fts
+                JOIN messages m ON m.id = messages_fts.rowid
+                WHERE messages_fts MATCH ?
+            '''
+            # 검색어 전체를 하나의 구문으로 취급 (FTS 쿼리 문법 무력화)
+            params = ['"' + keyword.replace('"', '""') + '"']
+        else:
+            query = f"SELECT m.*, {NICKNAME_COLUMN_SQL} FROM messages m WHERE 1=1"
+            params = []
+            
+            if keyword:
+                # trigram으로 찾을 수 없는 짧은 검색어
+                query += " AND m.message_text LIKE ?"
+                params.append(f"%{keyword}%")
+        
+        if nickname and nickname.strip():
+            # 닉네임 문자열 대신 일치하는 사용자(와 별칭)의 사전 id로 비교
+            user_ids = self._match_nickname_ids(nickname)
+            if not user_ids:
+                return []
+            # 일치 행이 적으면 idx_messages_user로 찾고, 많으면 (+로 인덱스를 끄고) 정렬 순서대로 읽으면서 거름
+            column = 'm.user_id' if not use_fts and self._seek_by_user(user_ids, limit, room_id) else '+m.user_id'
+            # 정수 id는 SQL에 직접 넣음 (바인딩 변수 개수 제한)
+            query += f" AND {column} IN ({', '.join(map(str, user_ids))})"
         
         if message_type:
-            query += " AND message_type = ?"
+            query += " AND m.message_type = ?"
             params.append(message_type)
         
-        query += " ORDER BY id DESC LIMIT ?"
+        if room_id is not None:
+            query += " AND m.room_id = ?"
+            params.append(room_id)
+        
+        if start is not None:
+            query += " AND m.ts >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND m.ts < ?"
+            params.append(end)
+        
+        # 키셋 페이지네이션: OFFSET 없이 이전 페이지 마지막 키 다음부터 조회
+        if order == 'relevance':
+            if after:
+                query += " AND (messages_fts.rank, m.id) > (?, ?)"
+                params.extend(after)
+            query += " ORDER BY messages_fts.rank, m.id LIMIT ?"
+        elif ranged:
+            # 기간/방 조건이 있으면 (시각, id) 역순으로 인덱스를 따라 읽음
+            if after:
+                if len(after) == 2:
+                    query += " AND (m.ts, m.id) < (?, ?)"
+                    params.extend(after)
+                else:
+                    # 시각이 없는 행은 역순 정렬의 맨 뒤이므로 그 구간 안에서만 이어 읽음
+                    query += " AND m.ts IS NULL AND m.id < ?"
+                    params.append(after[-1])
+            query += " ORDER BY m.ts DESC, m.id DESC LIMIT ?"
+        else:
+            # 전문 검색은 FTS 테이블의 rowid 역순으로 읽어야 일치 행 전체를 정렬하지 않고 LIMIT에서 멈춤
+            id_column = 'messages_fts.rowid' if use_fts else 'm.id'
+            if after:
+                query += f" AND {id_column} < ?"
+                params.append(after[-1])
+            query += f" ORDER BY {id_column} DESC LIMIT ?"
         params.append(limit)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.reader() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             
             columns = [description[0] for description in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        
+        # (시각, id) 비교는 시각이 없는 행(역순 정렬의 맨 뒤)을 빼므로, 시각이 있는 행을 다 읽었으면 그 구간으로 이어 감
+        if ranged and order != 'relevance' and after and len(after) == 2 and len(results) < limit \
+                and start is None and end is None:
+            results += self.search_messages(keyword, nickname, message_type, limit - len(results), order,
+                                            NULL_TS_PAGE_KEY, start, end, room_id)
+        return results
     
-    def get_user_statistics(self) -> List[Dict]:
-        """사용자별 통계 정보"""
-        with sqlite3.connect(self.db_path) as conn:
+    @staticmethod
+    def next_page_key(results: List[Dict], order: str = 'recent') -> Optional[Tuple]:
+        """검색 결과 마지막 행에서 다음 페이지 조회용 키 생성"""
+        if not results:
+            return None
+        last = results[-1]
+        if order == 'relevance' and 'rank' in last:
+            return (last['rank'], last['id'])
+        if last.get('ts') is not None:
+            # 기간 조건 검색은 (시각, id), 그 외에는 마지막 값(id)만 사용
+            return (last['ts'], last['id'])
+        return (last['id'],)
+    
+    def iter_messages(self, page_size: int = EXPORT_PAGE_SIZE, **criteria) -> Iterator[Dict]:
+        """search_messages 조건에 맞는 메시지 전체를 키셋 페이지로 이어 읽어 반환 (내보내기용)
+        
+        페이지마다 읽기 연결을 반납하므로 느린 클라이언트로 오래 내보내도 연결 풀을 붙잡지 않는다.
+        """
+        after = None
+        while True:
+            page = self.search_messages(limit=page_size, after=after, **criteria)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = self.next_page_key(page, criteria.get('order', 'recent'))
+    
+    def _match_nickname_ids(self, nickname: str) -> List[int]:
+        """닉네임에 검색어가 들어간 사용자와 그 별칭들의 사전 id
+        
+        n-gram 색인에서 검색어의 n-gram을 모두 가진 닉네임만 후보로 고른 뒤 LIKE로 확인한다.
+        """
+        needle = nickname.strip()
+        grams = sorted(query_grams(needle))
+        placeholders = ', '.join('?' * len(grams))
+        pattern = needle.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        with self.pool.reader() as conn:
+            rows = conn.execute(f'''
+                SELECT alias.id FROM user_dictionary alias
+                WHERE alias.canonical_id IN (
+                    SELECT d.canonical_id FROM user_dictionary d
+                    WHERE d.id IN (
+                        SELECT user_id FROM nickname_grams WHERE gram IN ({placeholders})
+                        GROUP BY user_id HAVING COUNT(*) = ?
+                    )
+                    AND d.nickname LIKE ? ESCAPE '\\'
+                )
+            ''', [*grams, len(grams), f"%{pattern}%"]).fetchall()
+        return [row[0] for row in rows]
+    
+    def _seek_by_user(self, user_ids: List[int], limit: int, room_id: Optional[int]) -> bool:
+        """닉네임 조건에 idx_messages_user를 쓸지 (users 집계 테이블의 행 수로 판단)
+        
+        일치 행 n개를 인덱스로 모두 찾아 정렬하는 비용과, 전체 N행을 정렬 순서대로 읽으며 limit개를 찾을 때
+        읽는 약 limit × N / n행을 비교해 n² <= limit × N이면 인덱스로 찾는다.
+        """
+        room_filter, params = ('AND room_id = ?', [room_id, room_id]) if room_id is not None else ('', [])
+        rows = 'COALESCE(SUM(total_messages + join_count + leave_count), 0)'
+        with self.pool.reader() as conn:
+            matched, total = conn.execute(f'''
+                SELECT (SELECT {rows} FROM users WHERE user_id IN ({', '.join(map(str, user_ids))}) {room_filter}),
+                       (SELECT {rows} FROM users WHERE 1=1 {room_filter})
+            ''', params).fetchone()
+        return matched * matched <= limit * total
+    
+    def find_users(self, query: str, limit: int = USER_LOOKUP_LIMIT, room_id: Optional[int] = None) -> List[Dict]:
+        """닉네임 유사 조회 (n-gram을 하나라도 공유하는 닉네임을 같음/접두어/포함/n-gram 유사도 순으로)
+        
+        room_id를 주면 그 방에서 활동한 사용자만, 별칭으로 묶인 닉네임은 대표 닉네임과 함께 반환한다.
+        """
+        grams = sorted(nickname_grams(query))
+        if not grams:
+            return []
+        placeholders = ', '.join('?' * len(grams))
+        room_filter, params = ('AND u.room_id = ?', [room_id]) if room_id is not None else ('', [])
+        with self.pool.reader() as conn:
+            rows = conn.execute(f'''
+                SELECT d.nickname, c.nickname,
+                       (SELECT SUM(u.total_messages) FROM users u WHERE u.user_id = d.id {room_filter})
+                FROM (SELECT DISTINCT user_id FROM nickname_grams WHERE gram IN ({placeholders})) g
+                JOIN user_dictionary d ON d.id = g.user_id
+                JOIN user_dictionary c ON c.id = d.canonical_id
+            ''', params + grams).fetchall()
+        users = [
+            {'nickname': row[0], 'canonical_nickname': row[1], 'total_messages': row[2] or 0,
+             'score': round(score_nickname(query, row[0]), 3)}
+            for row in rows
+            if room_id is None or row[2] is not None
+        ]
+        users.sort(key=lambda user: (user['score'], user['total_messages']), reverse=True)
+        return users[:limit]
+    
+    def merge_nicknames(self, alias: str, nickname: str) -> Optional[Dict]:
+        """alias(와 이미 묶인 별칭들)를 nickname과 같은 사용자로 병합하고 nickname을 대표 닉네임으로 함
+        
+        카카오톡 내보내기에는 닉네임 변경 기록이 없으므로 이름을 바꾼 사람은 이렇게 직접 묶는다.
+        메시지는 사전 id로 저장되어 있어 다시 쓰지 않고, 통계와 닉네임 검색이 묶인 닉네임을 함께 센다.
+        둘 중 하나라도 사전에 없으면 None 반환.
+        """
+        with self._transaction() as cursor:
+            found = {
+                row[0]: (row[1], row[2]) for row in cursor.execute(
+                    'SELECT nickname, id, canonical_id FROM user_dictionary WHERE nickname IN (?, ?)', (alias, nickname)
+                )
+            }
+            if alias not in found or nickname not in found:
+                return None
+            target_id = found[nickname][0]
+            cursor.execute(
+                'UPDATE user_dictionary SET canonical_id = ? WHERE canonical_id IN (?, ?)',
+                (target_id, found[alias][1], found[nickname][1])
+            )
+            return self._identity(cursor, target_id)
+    
+    def split_nickname(self, nickname: str) -> Optional[Dict]:
+        """별칭 병합에서 nickname을 떼어 냄 (대표였다면 남은 닉네임 중 먼저 등록된 것이 대표), 사전에 없으면 None"""
+        with self._transaction() as cursor:
+            row = cursor.execute(
+                'SELECT id, canonical_id FROM user_dictionary WHERE nickname = ?', (nickname,)
+            ).fetchone()
+            if row is None:
+                return None
+            user_id, canonical_id = row
+            cursor.execute('UPDATE user_dictionary SET canonical_id = id WHERE id = ?', (user_id,))
+            if canonical_id == user_id:
+                cursor.execute('''
+                    UPDATE user_dictionary
+                    SET canonical_id = (SELECT MIN(id) FROM user_dictionary WHERE canonical_id = ? AND id != ?)
+                    WHERE canonical_id = ? AND id != ?
+                ''', (user_id, user_id, user_id, user_id))
+            return self._identity(cursor, user_id)
+    
+    @staticmethod
+    def _identity(cursor, canonical_id: int) -> Dict:
+        """대표 닉네임과 그에 묶인 별칭 목록"""
+        names = [row[0] for row in cursor.execute(
+            'SELECT nickname FROM user_dictionary WHERE canonical_id = ? ORDER BY id', (canonical_id,)
+        )]
+        nickname = cursor.execute('SELECT nickname FROM user_dictionary WHERE id = ?', (canonical_id,)).fetchone()[0]
+        return {'nickname': nickname, 'aliases': [name for name in names if name != nickname]}
+    
+    @staticmethod
+    def _canonical_nicknames(conn) -> Dict[int, str]:
+        """사전 id -> 대표 닉네임 (별칭은 대표 닉네임으로)"""
+        return dict(conn.execute('''
+            SELECT d.id, c.nickname FROM user_dictionary d JOIN user_dictionary c ON c.id = d.canonical_id
+        ''').fetchall())
+    
+    def get_user_statistics(self, limit: Optional[int] = None, room_id: Optional[int] = None) -> List[Dict]:
+        """사용자별 통계 정보 (별칭으로 묶인 닉네임은 대표 닉네임으로, room_id가 없고 방이 여러 개면 합산)"""
+        room_id = self._rollup_scope(room_id)
+        where, params = ('WHERE u.room_id = ?', [room_id]) if room_id is not None else ('', [])
+        with self.pool.reader() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT nickname, total_messages, join_count, leave_count, 
-                       first_seen, last_seen
-                FROM users 
+            cursor.execute(f'''
+                SELECT c.nickname AS nickname, SUM(u.total_messages) AS total_messages,
+                       SUM(u.join_count) AS join_count, SUM(u.leave_count) AS leave_count,
+                       MIN(u.first_seen) AS first_seen, MAX(u.last_seen) AS last_seen
+                FROM users u
+                JOIN user_dictionary d ON d.id = u.user_id
+                JOIN user_dictionary c ON c.id = d.canonical_id
+                {where}
+                GROUP BY d.canonical_id
                 ORDER BY total_messages DESC
-            ''')
-            
+                LIMIT ?
+            ''', params + [-1 if limit is None else limit])
+    
             columns = [description[0] for description in cursor.description]
             return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
-    def get_keyword_frequency(self, limit: int = 20) -> List[Dict]:
-        """키워드 빈도 분석"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_keyword_frequency(self, limit: int = 20, room_id: Optional[int] = None) -> List[Dict]:
+        """키워드 빈도 분석 (집계 테이블에서 상위 limit개만 읽음)"""
+        room_id = self._rollup_scope(room_id)
+        with self.pool.reader() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT keyword, COUNT(*) as frequency
-                FROM keyword_index
-                GROUP BY keyword
+            if room_id is not None:
+                cursor.execute('''
+                    SELECT keyword, frequency
+                    FROM keyword_stats
+                    WHERE room_id = ?
+                    ORDER BY frequency DESC
+                    LIMIT ?
+                ''', (room_id, limit))
+            else:
+                cursor.execute('''
+                    SELECT keyword, SUM(frequency) AS frequency
+                    FROM keyword_stats
+                    GROUP BY keyword
+                    ORDER BY frequency DESC
+                    LIMIT ?
+                ''', (limit,))
+    
+            return [{'keyword': row[0], 'frequency': row[1]} for row in cursor.fetchall()]
+    
+    def latest_keyword_day(self, room_id: Optional[int] = None) -> Optional[str]:
+        """인기 키워드 요약이 있는 마지막 날짜 (room_id가 None이면 전체 방)"""
+        with self.pool.reader() as conn:
+            if room_id is not None:
+                row = conn.execute('SELECT MAX(day) FROM keyword_windows WHERE room_id = ?', (room_id,)).fetchone()
+            else:
+                row = conn.execute('SELECT MAX(day) FROM keyword_windows').fetchone()
+        return row[0]
+    
+    def keyword_window(self, since: str, until: str, room_id: Optional[int] = None) -> Optional[HeavyHitters]:
+        """since~until(포함) 하루치 요약을 합친 키워드 요약 (요약이 없으면 None)"""
+        query = 'SELECT sketch, top_keywords FROM keyword_windows WHERE day BETWEEN ? AND ?'
+        params = [since, until]
+        if room_id is not None:
+            query += ' AND room_id = ?'
+            params.append(room_id)
+        with self.pool.reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return merge_summaries(self._load_window(row) for row in rows)
+    
+    def user_keyword_summary(self, nickname: str, room_id: Optional[int] = None) -> Optional[SpaceSaving]:
+        """사용자(별칭 병합된 닉네임 포함)의 상위 키워드 요약, 사전에 없는 닉네임이면 None"""
+        with self.pool.reader() as conn:
+            row = conn.execute('SELECT canonical_id FROM user_dictionary WHERE nickname = ?', (nickname,)).fetchone()
+            if row is None:
+                return None
+            query = '''
+                SELECT k.top_keywords
+                FROM user_keywords k
+                JOIN user_dictionary d ON d.id = k.user_id
+                WHERE d.canonical_id = ?
+            '''
+            params = [row[0]]
+            if room_id is not None:
+                query += ' AND k.room_id = ?'
+                params.append(room_id)
+            rows = conn.execute(query, params).fetchall()
+        summary = SpaceSaving(USER_TOP_CAPACITY)
+        for (top_keywords,) in rows:
+            summary.merge(SpaceSaving.from_json(top_keywords, USER_TOP_CAPACITY))
+        return summary
+    
+    def get_activity_histogram(self, room_id: Optional[int] = None) -> Dict:
+        """일별/시간대별 활동 히스토그램"""
+        room_id = self._rollup_scope(room_id)
+        # 방이 정해지면 그 방의 기본 키 구간만, 아니면 방별 행을 합산
+        where, params = ('WHERE room_id = ?', (room_id,)) if room_id is not None else ('', ())
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT day, SUM(message_count), SUM(join_count), SUM(leave_count)
+                FROM daily_activity
+                {where}
+                GROUP BY day
+                ORDER BY day
+            ''', params)
+            daily = [
+                {'day': row[0], 'messages': row[1], 'joins': row[2], 'leaves': row[3]}
+                for row in cursor.fetchall()
+            ]
+    
+            cursor.execute(f'SELECT hour, SUM(message_count) FROM hourly_activity {where} GROUP BY hour', params)
+            hourly = [0] * 24
+            for hour, count in cursor.fetchall():
+                hourly[hour] = count
+    
+            return {'daily': daily, 'hourly': hourly}
+    
+    def _rollup_scope(self, room_id: Optional[int]) -> Optional[int]:
+        """집계 테이블 조회 범위: 방을 지정하지 않았어도 데이터가 한 방뿐이면 그 방 (합산 GROUP BY 생략)"""
+        if room_id is not None:
+            return room_id
+        with self.pool.reader() as conn:
+            # (room_id, ...) 인덱스 양 끝만 읽음
+            low, high = conn.execute('SELECT MIN(room_id), MAX(room_id) FROM users').fetchone()
+        return low if low is not None and low == high else None
+    
+    def get_range_statistics(self, start: Optional[int] = None, end: Optional[int] = None,
+                             keyword_limit: int = 20, room_id: Optional[int] = None) -> Dict:
+        """기간(epoch 초, end 미포함) 통계
+    
+        집계 테이블은 전체 기간 누계라 기간 조건에 쓸 수 없으므로 (room_id,) ts 커버링 인덱스의
+        범위 스캔으로 사용자/일별/시간대별 수를 세고, 키워드는 그 기간 메시지의 키워드 인덱스만 읽는다.
+        """
+        where, params = self._ts_range_clause('', start, end, room_id)
+        index = self._ts_index(room_id)
+    
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            users: Dict[str, Dict] = {}
+            # 커버링 인덱스에서 사전 id별로 센 뒤 대표 닉네임 기준으로 합산
+            cursor.execute(f'''
+                SELECT c.nickname, g.message_type, SUM(g.count)
+                FROM (
+                    SELECT user_id, message_type, COUNT(*) AS count
+                    FROM messages INDEXED BY {index}
+                    WHERE {where}
+                    GROUP BY user_id, message_type
+                ) g
+                JOIN user_dictionary d ON d.id = g.user_id
+                JOIN user_dictionary c ON c.id = d.canonical_id
+                GROUP BY d.canonical_id, g.message_type
+            ''', params)
+            for nickname, message_type, count in cursor.fetchall():
+                user = users.setdefault(nickname, {
+                    'nickname': nickname, 'total_messages': 0, 'join_count': 0, 'leave_count': 0
+                })
+                if message_type == 'message':
+                    user['total_messages'] = count
+                elif message_type == 'join':
+                    user['join_count'] = count
+                elif message_type == 'leave':
+                    user['leave_count'] = count
+            user_stats = sorted(users.values(), key=lambda user: user['total_messages'], reverse=True)
+    
+            # 일/시간은 KST 기준 (epoch 초 + 9시간)
+            cursor.execute(f'''
+                SELECT date(ts + 32400, 'unixepoch') AS day,
+                       SUM(message_type = 'message'), SUM(message_type = 'join'), SUM(message_type = 'leave')
+                FROM messages INDEXED BY {index}
+                WHERE {where}
+                GROUP BY day
+                ORDER BY day
+            ''', params)
+            daily = [
+                {'day': row[0], 'messages': row[1], 'joins': row[2], 'leaves': row[3]}
+                for row in cursor.fetchall()
+            ]
+    
+            cursor.execute(f'''
+                SELECT (ts + 32400) % 86400 / 3600 AS hour, COUNT(*)
+                FROM messages INDEXED BY {index}
+                WHERE {where} AND message_type = 'message'
+                GROUP BY hour
+            ''', params)
+            hourly = [0] * 24
+            for hour, count in cursor.fetchall():
+                hourly[hour] = count
+    
+            cursor.execute(f'''
+                SELECT k.keyword, COUNT(*) AS frequency
+                FROM messages m INDEXED BY {index}
+                JOIN keyword_index k ON k.message_id = m.id
+                WHERE {self._ts_range_clause('m.', start, end, room_id)[0]}
+                GROUP BY k.keyword
                 ORDER BY frequency DESC
                 LIMIT ?
-            ''', (limit,))
-            
-            return [{'keyword': row[0], 'frequency': row[1]} for row in cursor.fetchall()]
+            ''', params + [keyword_limit])
+            keyword_stats = [{'keyword': row[0], 'frequency': row[1]} for row in cursor.fetchall()]
+    
+        return {
+            "user_statistics": user_stats,
+            "keyword_frequency": keyword_stats,
+            "activity": {'daily': daily, 'hourly': hourly},
+            "range": {'start': start, 'end': end},
+            **summarize_user_statistics(user_stats)
+        }
+    
+    def iter_activity_rows(self, start: Optional[int] = None, end: Optional[int] = None,
+                           batch_size: int = INSERT_BATCH_SIZE,
+                           room_id: Optional[int] = None) -> Iterator[Tuple[int, str, str]]:
+        """분석용 (ts, 종류, 대표 닉네임) 행을 시각 순서대로 반환 (커버링 인덱스만 읽고 닉네임은 사전에서)"""
+        where, params = self._ts_range_clause('', start, end, room_id)
+        with self.pool.reader() as conn:
+            nicknames = self._canonical_nicknames(conn)
+            cursor = conn.execute(f'''
+                SELECT ts, message_type, user_id
+                FROM messages INDEXED BY {self._ts_index(room_id)}
+                WHERE {where}
+                ORDER BY ts
+            ''', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for ts, message_type, user_id in rows:
+                    yield ts, message_type, nicknames[user_id]
+    
+    @staticmethod
+    def _ts_index(room_id: Optional[int]) -> str:
+        """기간 조회에 쓸 인덱스 (방을 지정하면 그 방의 구간만 읽는 복합 인덱스)"""
+        return 'idx_messages_ts' if room_id is None else 'idx_messages_room_ts'
+    
+    @staticmethod
+    def _ts_range_clause(alias: str, start: Optional[int], end: Optional[int],
+                         room_id: Optional[int] = None) -> Tuple[str, List[int]]:
+        """기간/방 조건 SQL (기간이 열려 있어도 시각을 알 수 없는 과거 행은 제외)"""
+        conditions, params = [], []
+        if room_id is not None:
+            conditions.append(f'{alias}room_id = ?')
+            params.append(room_id)
+        conditions.append(f'{alias}ts IS NOT NULL')
+        if start is not None:
+            conditions.append(f'{alias}ts >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append(f'{alias}ts < ?')
+            params.append(end)
+        return ' AND '.join(conditions), params
+    
+    def get_statistics(self, start: Optional[int] = None, end: Optional[int] = None,
+                       room_id: Optional[int] = None) -> Dict:
+        """대시보드용 통계 (기간 조건이 없으면 집계 테이블만 조회, room_id를 주면 그 방만)"""
+        if start is not None or end is not None:
+            return self.get_range_statistics(start, end, room_id=room_id)
+        user_stats = self.get_user_statistics(room_id=room_id)
+        return {
+            "user_statistics": user_stats,
+            "keyword_frequency": self.get_keyword_frequency(room_id=room_id),
+            "activity": self.get_activity_histogram(room_id),
+            **summarize_user_statistics(user_stats)
+        }
 
 # 사용 예시
 if __name__ == "__main__":
@@ -215,9 +1334,8 @@ if __name__ == "__main__":
     from kakao_parser import KakaoTalkParser
     
     parser = KakaoTalkParser("KakaoTalk_20250730_2058_15_796_group.txt")
-    messages = parser.parse_messages()
     
-    # 데이터베이스에 저장
-    db.save_messages(messages)
+    # 데이터베이스에 저장 (파일 전체를 메모리에 올리지 않고 순차 저장)
+    db.save_messages(parser.iter_messages())
     
     print("데이터베이스 저장 완료!") 
\ No newline at end of file
@@ -1,86 +1,452 @@
 import re
-from datetime import datetime
-from typing import List, Dict, Optional
+import codecs
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Optional, Iterable, Iterator, Union, BinaryIO, Tuple
+
+# 스트림에서 한 번에 읽어 들이는 바이트 수
+READ_CHUNK_SIZE = 64 * 1024
+
+# 병렬 파싱 시 청크 하나의 최소 바이트 수 (이보다 작은 파일은 순차 파싱)
+MIN_PARALLEL_CHUNK_SIZE = 4 * 1024 * 1024
+# 워커당 청크 수 (청크별 처리 시간 편차를 흡수)
+CHUNKS_PER_WORKER = 4
+
+# 저장하지 않는 시스템 알림 줄 (초대/내보내기/삭제·가림 알림/방장 변경, 파일 머리말)
+# 알림 문구 전체가 일치할 때만 해당 (출석체크 봇이나 사진·이모티콘 자리표시처럼 메시지 본문에도 나올 수 있는 줄은
+# 다른 맞지 않는 줄과 같이 메시지 다음 줄이면 이어 붙이고, 시스템 줄 뒤에 오면 버림)
+SYSTEM_LINE = (
+    r'.+님이 .+님을 초대했습니다\.'
+    r'|.+님을 내보냈습니다\.'
+    r'|삭제된 메시지입니다\.|메시지가 삭제되었습니다\.|채팅방 관리자가 메시지를 가렸습니다\.'
+    r'|.+님이 방장이 되었습니다\.|방장이 .+님으로 변경되었습니다\.'
+    r'|.+ 님과 카카오톡 대화|저장한 날짜 : .+'
+)
+
+# 한 줄을 한 번의 매칭으로 분류하는 통합 패턴
+# - message: [닉네임] [시간] 메시지 (닉네임은 어떤 형식이든 가능)
+# - join / leave: 입장/퇴장 시스템 메시지 (출석체크 제외)
+# - day: --------------- 2025년 7월 30일 수요일 --------------- 날짜 구분선
+# - system: 저장하지 않는 시스템 알림 줄 (여러 줄 메시지도 여기서 끝남)
+LINE_PATTERN = re.compile(
+    r'\[(?P<nickname>[^\]]+)\] \[(?P<time>[^\]]+)\] (?P<message>.+)'
+    r'|(?P<join>.*)님이 들어왔습니다\.$'
+    r'|(?P<leave>.*)님이 나갔습니다\.$'
+    r'|-+ (?P<year>\d{4})년 (?P<month>\d{1,2})월 (?P<day>\d{1,2})일 .*-$'
+    rf'|(?P<system>{SYSTEM_LINE})$'
+)
+
+# 메시지 시간 표기: "오후 3:05" 또는 "15:05"
+TIME_PATTERN = re.compile(r'(?:(?P<ampm>오전|오후) )?(?P<hour>\d{1,2}):(?P<minute>\d{2})')
+
+# 카카오톡 내보내기 파일의 날짜/시간은 한국 표준시 기준
+KST = timezone(timedelta(hours=9), 'KST')
+
+# 검색/통계 기간 조건: "2025-07-30", "2025-07-30 15:05", "2025-07-30T15:05:00" 또는 epoch 초
+TIME_BOUND_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S')
+
+
+@lru_cache(maxsize=4096)
+def day_start_timestamp(date: Optional[str]) -> Optional[int]:
+    """날짜(YYYY-MM-DD) 00:00 KST의 epoch 초, 해석할 수 없으면 None"""
+    if not date:
+        return None
+    try:
+        return int(datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=KST).timestamp())
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _epoch_day_label(epoch_day: int) -> str:
+    return (datetime(1970, 1, 1) + timedelta(days=epoch_day)).strftime('%Y-%m-%d')
+
+
+def kst_day(ts: Optional[int]) -> Optional[str]:
+    """epoch 초의 KST 날짜(YYYY-MM-DD), ts가 None이면 None"""
+    if ts is None:
+        return None
+    return _epoch_day_label((ts + 9 * 3600) // 86400)
+
+
+def to_timestamp(date: Optional[str], time_str: Optional[str] = None) -> Optional[int]:
+    """날짜 구분선의 날짜와 메시지 시간으로 epoch 초 계산 (시간이 없는 입장/퇴장은 그 날 00:00)"""
+    day_start = day_start_timestamp(date)
+    if day_start is None:
+        return None
+    time_of_day = parse_time_of_day(time_str)
+    if time_of_day is None:
+        return day_start
+    return day_start + time_of_day[0] * 3600 + time_of_day[1] * 60
+
+
+def parse_time_bound(value: Optional[str], end: bool = False) -> Optional[int]:
+    """기간 조건 문자열을 epoch 초로 변환 (end=True이고 날짜만 주어지면 그 다음 날 00:00, 즉 그 날 포함)
+
+    잘못된 형식이면 ValueError를 발생시킨다.
+    """
+    if value is None or not str(value).strip():
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    for time_format in TIME_BOUND_FORMATS:
+        try:
+            moment = datetime.strptime(value, time_format).replace(tzinfo=KST)
+        except ValueError:
+            continue
+        if end and time_format == '%Y-%m-%d':
+            moment += timedelta(days=1)
+        return int(moment.timestamp())
+    raise ValueError(f"잘못된 기간 형식: {value} (YYYY-MM-DD, YYYY-MM-DD HH:MM 또는 epoch 초)")
+
+
+@lru_cache(maxsize=4096)
+def parse_time_of_day(time_str: Optional[str]) -> Optional[Tuple[int, int]]:
+    """메시지 시간 문자열을 24시간제 (시, 분)으로 변환, 해석할 수 없으면 None"""
+    if not time_str:
+        return None
+    match = TIME_PATTERN.fullmatch(time_str)
+    if match is None:
+        return None
+    
+    hour, minute = int(match.group('hour')), int(match.group('minute'))
+    ampm = match.group('ampm')
+    if ampm == '오전' and hour == 12:
+        hour = 0
+    elif ampm == '오후' and hour != 12:
+        hour += 12
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+class ChatRecord:
+    """파싱된 한 줄의 경량 레코드 (딕셔너리처럼 msg['type'], msg.get('message') 접근 가능)"""
+    
+    __slots__ = ('type', 'nickname', 'time', 'message', 'date')
+    _fields = __slots__
+    
+    def __init__(self, message_type: str, nickname: str, time: Optional[str] = None,
+                 message: Optional[str] = None, date: Optional[str] = None):
+        self.type = message_type
+        self.nickname = nickname
+        self.time = time
+        self.message = message
+        self.date = date
+    
+    @property
+    def raw_line(self) -> str:
+        """원본 줄을 필요할 때만 복원 (레코드마다 중복 저장하지 않음)"""
+        if self.type == 'message':
+            return f"[{self.nickname}] [{self.time}] {self.message}"
+        if self.type == 'join':
+            return f"{self.nickname}님이 들어왔습니다."
+        return f"{self.nickname}님이 나갔습니다."
+    
+    def __getitem__(self, key: str):
+        if key == 'raw_line':
+            return self.raw_line
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key == 'raw_line' or (key in self._fields and getattr(self, key) is not None)
+    
+    def get(self, key: str, default=None):
+        # 적재 경로에서 레코드마다 여러 번 호출되므로 __contains__/__getitem__을 거치지 않고 바로 읽음
+        if key == 'raw_line':
+            return self.raw_line
+        value = getattr(self, key) if key in self._fields else None
+        return default if value is None else value
+    
+    @property
+    def timestamp(self) -> Optional[int]:
+        """날짜와 시간으로 계산한 epoch 초 (KST 기준, 날짜 구분선 이전 레코드는 None)"""
+        return to_timestamp(self.date, self.time)
+    
+    def __reduce__(self):
+        # 프로세스 간 전달 시 슬롯 상태 딕셔너리 대신 생성자 인자 튜플로 직렬화
+        return (ChatRecord, (self.type, self.nickname, self.time, self.message, self.date))
+    
+    def to_dict(self) -> Dict:
+        """JSON 직렬화용 딕셔너리 (값이 없는 필드는 제외)"""
+        return {key: getattr(self, key) for key in self._fields if getattr(self, key) is not None}
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChatRecord):
+            return all(getattr(self, key) == getattr(other, key) for key in self._fields)
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"ChatRecord({self.to_dict()!r})"
+
+
+class ChunkBoundary:
+    """병렬 파싱 시 청크 경계에 걸친 상태 (앞쪽 이어지는 줄, 끝 날짜, 열린 메시지 여부)"""
+    
+    __slots__ = ('leading', 'open', 'date')
+    
+    def __init__(self):
+        self.leading = []  # 첫 분류 줄 이전의 이어지는 줄 (이전 청크 마지막 메시지에 붙음)
+        self.open = None  # 청크가 메시지로 끝났는지 여부 (분류된 줄이 없으면 None)
+        self.date = None  # 청크 끝 시점의 날짜 구분선
+
+
+def iter_records(lines: Iterable[str], boundary: Optional[ChunkBoundary] = None) -> Iterator[ChatRecord]:
+    """줄 단위 입력을 분류하여 레코드로 변환 (boundary가 주어지면 청크 경계 상태를 기록)"""
+    match_line = LINE_PATTERN.match
+    pending = None  # 다음 줄이 이어질 수 있는 메시지
+    current_date = None
+    classified = False
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        
+        match = match_line(line)
+        if match is None:
+            # 어떤 패턴에도 맞지 않으면 여러 줄 메시지의 다음 줄 (시스템 줄 뒤에 오면 버림)
+            if pending is not None:
+                pending.message += '\n' + line
+            elif boundary is not None and not classified:
+                boundary.leading.append(line)
+            continue
+        
+        classified = True
+        kind = match.lastgroup
+        if pending is not None:
+            yield pending
+            pending = None
+        
+        if kind == 'message':
+            nickname, time_str, message = match.group('nickname', 'time', 'message')
+            pending = ChatRecord('message', nickname, time_str, message, current_date)
+        elif kind == 'join':
+            yield ChatRecord('join', match.group('join'), date=current_date)
+        elif kind == 'leave':
+            yield ChatRecord('leave', match.group('leave'), date=current_date)
+        elif kind == 'system':
+            continue
+        else:
+            year, month, day = match.group('year', 'month', 'day')
+            current_date = f"{year}-{int(month):02d}-{int(day):02d}"
+    
+    if boundary is not None:
+        boundary.open = pending is not None if classified else None
+        boundary.date = current_date
+    if pending is not None:
+        yield pending
+
+
+def _parse_byte_range(file_path: str, start: int, end: int, encoding: str) -> Tuple[List[ChatRecord], ChunkBoundary, Dict]:
+    """워커 프로세스: 파일의 [start, end) 바이트 구간을 파싱하고 부분 통계를 함께 반환"""
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    
+    # 모든 구간을 같은 인코딩으로 디코딩 (utf-8-sig는 구간 앞에 BOM이 있을 때만 제거하므로 중간 구간에도 그대로 사용)
+    parser = KakaoTalkParser(io.BytesIO(data), encoding)
+    boundary = ChunkBoundary()
+    records = list(iter_records(parser._iter_lines(), boundary))
+    return records, boundary, parser.get_statistics(records)
+
 
 class KakaoTalkParser:
-    def __init__(self, file_path: str):
-        self.file_path = file_path
+    def __init__(self, source: Union[str, os.PathLike, BinaryIO, Iterable], encoding: str = 'utf-8-sig'):
+        """source: 파일 경로, 바이너리/텍스트 스트림 또는 줄 단위 iterable"""
+        self.source = source
+        self.encoding = encoding
+        self.file_path = os.fspath(source) if isinstance(source, (str, os.PathLike)) else None
+        # 지금까지 읽은 원본 줄 수 (진행 상황 보고용)
+        self.lines_read = 0
         
-    def parse_messages(self) -> List[Dict]:
-        messages = []
+    def parse_messages(self, workers: int = 1) -> List[ChatRecord]:
+        if workers != 1 and self.file_path is not None:
+            return self.parse_parallel(workers)[0]
+        return list(self.iter_messages())
+    
+    def parse_parallel(self, workers: Optional[int] = None) -> Tuple[List[ChatRecord], Dict]:
+        """파일을 줄 경계 기준 바이트 구간으로 나누어 프로세스 풀에서 파싱 후 원래 순서대로 병합"""
+        if self.file_path is None:
+            raise ValueError("병렬 파싱은 파일 경로 입력에서만 지원합니다.")
         
-        with open(self.file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # 메시지 패턴 파싱
-                message_data = self._parse_message_line(line)
-                if message_data:
-                    messages.append(message_data)
-                    
-        return messages
-    
-    def _parse_message_line(self, line: str) -> Optional[Dict]:
-        # 메시지 패턴: [닉네임] [시간] 메시지
-        # 닉네임은 어떤 형식이든 가능하도록 수정
-        pattern = r'\[([^\]]+)\] \[([^\]]+)\] (.+)'
-        match = re.match(pattern, line)
+        workers = workers or os.cpu_count() or 1
+        # 줄바꿈이 한 바이트 b'\n'이 아닌 인코딩(UTF-16 등)은 바이트 단위로 줄 경계를 찾을 수 없어 순차 파싱
+        if '\n'.encode(self.encoding) != b'\n':
+            workers = 1
+        ranges = self._split_byte_ranges(workers * CHUNKS_PER_WORKER)
+        if workers == 1 or len(ranges) == 1:
+            messages = self.parse_messages()
+            return messages, self.get_statistics(messages)
         
-        if match:
-            nickname, time_str, message = match.groups()
-            
-            return {
-                'type': 'message',
-                'nickname': nickname,  # 닉네임을 통째로 저장
-                'time': time_str,
-                'message': message,
-                'raw_line': line
-            }
+        # 프로세스 풀(multiprocessing)은 병렬 파싱할 때만 import
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_parse_byte_range, self.file_path, start, end, self.encoding)
+                for start, end in ranges
+            ]
+            results = [future.result() for future in futures]
         
-        # 시스템 메시지 파싱 (출석체크 제외)
-        system_data = self._parse_system_message(line)
-        if system_data:
-            return system_data
-            
-        return None
+        return self._merge_chunks(results)
     
-    def _parse_system_message(self, line: str) -> Optional[Dict]:
-        # 입장/퇴장 메시지만 파싱 (출석체크 제외)
-        if '님이 들어왔습니다.' in line:
-            nickname = line.replace('님이 들어왔습니다.', '')
-            return {
-                'type': 'join',
-                'nickname': nickname,
-                'raw_line': line
-            }
-        elif '님이 나갔습니다.' in line:
-            nickname = line.replace('님이 나갔습니다.', '')
-            return {
-                'type': 'leave',
-                'nickname': nickname,
-                'raw_line': line
-            }
+    def _split_byte_ranges(self, chunk_count: int) -> List[Tuple[int, int]]:
+        """파일을 chunk_count 개 이하의 구간으로 나누되 각 경계를 다음 줄 시작으로 맞춤"""
+        size = os.path.getsize(self.file_path)
+        chunk_size = max(MIN_PARALLEL_CHUNK_SIZE, -(-size // chunk_count))
         
-        return None
+        ranges = []
+        start = 0
+        with open(self.file_path, 'rb') as file:
+            while start < size:
+                end = start + chunk_size
+                if end < size:
+                    file.seek(end)
+                    file.readline()
+                    end = file.tell()
+                end = min(end, size)
+                ranges.append((start, end))
+                start = end
+        return ranges or [(0, 0)]
+    
+    def _merge_chunks(self, results: List[Tuple[List[ChatRecord], ChunkBoundary, Dict]]) -> Tuple[List[ChatRecord], Dict]:
+        """청크별 결과를 순서대로 이어 붙이면서 경계에 걸친 여러 줄 메시지와 날짜를 보정"""
+        messages = []
+        current_date = None
+        open_message = False
+        
+        for records, boundary, _ in results:
+            # 이전 청크가 메시지로 끝났다면 이번 청크 앞부분의 줄은 그 메시지의 다음 줄
+            if boundary.leading and open_message:
+                messages[-1].message += '\n' + '\n'.join(boundary.leading)
+            
+            # 청크 안에서 첫 날짜 구분선 이전 레코드는 이전 청크의 날짜를 이어받음
+            for record in records:
+                if record.date is not None:
+                    break
+                record.date = current_date
+            
+            messages.extend(records)
+            if boundary.open is not None:
+                open_message = boundary.open
+            if boundary.date is not None:
+                current_date = boundary.date
+        
+        statistics = self.merge_statistics(partial for _, _, partial in results)
+        return messages, statistics
     
-    def get_statistics(self, messages: List[Dict]) -> Dict:
+    def iter_messages(self) -> Iterator[ChatRecord]:
+        """파싱된 메시지를 한 건씩 순서대로 반환하는 제너레이터"""
+        yield from iter_records(self._iter_lines())
+    
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[List[ChatRecord]]:
+        """메시지를 batch_size 개씩 묶어서 반환"""
+        messages = self.iter_messages()
+        while True:
+            batch = list(islice(messages, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def _iter_lines(self) -> Iterator[str]:
+        """입력 소스 종류에 관계없이 줄 단위 문자열을 반환"""
+        if self.file_path is not None:
+            with open(self.file_path, 'rb') as file:
+                yield from self._iter_stream_lines(file)
+        elif hasattr(self.source, 'read'):
+            if isinstance(self.source, io.TextIOBase):
+                for line in self.source:
+                    self.lines_read += 1
+                    yield line
+            else:
+                yield from self._iter_stream_lines(self.source)
+        else:
+            decoder = None
+            for line in self.source:
+                self.lines_read += 1
+                if isinstance(line, bytes):
+                    # 줄 경계는 이미 나뉘어 있으므로 BOM 처리만 증분 디코더에 맡김
+                    if decoder is None:
+                        decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+                    line = decoder.decode(line)
+                yield line
+    
+    def _iter_stream_lines(self, stream: BinaryIO) -> Iterator[str]:
+        """바이너리 스트림을 청크 단위로 읽어 증분 디코딩 후 줄 단위로 분리"""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        pending = ''
+        while True:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                pending += chunk
+            else:
+                pending += decoder.decode(chunk)
+            lines = pending.split('\n')
+            pending = lines.pop()
+            self.lines_read += len(lines)
+            yield from lines
+        pending += decoder.decode(b'', final=True)
+        if pending:
+            self.lines_read += 1
+            yield pending
+    
+    def get_statistics(self, messages: Iterable[Dict]) -> Dict:
         """메시지 통계 정보 반환"""
-        stats = {
-            'total_messages': len([m for m in messages if m['type'] == 'message']),
-            'total_joins': len([m for m in messages if m['type'] == 'join']),
-            'total_leaves': len([m for m in messages if m['type'] == 'leave']),
-            'unique_users': len(set([m['nickname'] for m in messages if m['type'] == 'message'])),
+        stats = self.empty_statistics()
+        self.update_statistics(stats, messages)
+        return stats
+    
+    @staticmethod
+    def empty_statistics() -> Dict:
+        """빈 통계 딕셔너리"""
+        return {
+            'total_messages': 0,
+            'total_joins': 0,
+            'total_leaves': 0,
+            'unique_users': 0,
             'user_message_counts': {}
         }
+    
+    @staticmethod
+    def merge_statistics(partials: Iterable[Dict]) -> Dict:
+        """워커별 부분 통계를 하나로 병합"""
+        stats = KakaoTalkParser.empty_statistics()
+        user_counts = stats['user_message_counts']
+        for partial in partials:
+            stats['total_messages'] += partial['total_messages']
+            stats['total_joins'] += partial['total_joins']
+            stats['total_leaves'] += partial['total_leaves']
+            for nickname, count in partial['user_message_counts'].items():
+                user_counts[nickname] = user_counts.get(nickname, 0) + count
         
-        # 사용자별 메시지 수 계산
+        stats['unique_users'] = len(user_counts)
+        return stats
+    
+    @staticmethod
+    def update_statistics(stats: Dict, messages: Iterable[Dict]) -> Dict:
+        """메시지 묶음을 한 번만 순회하면서 통계를 누적"""
+        user_counts = stats['user_message_counts']
         for message in messages:
-            if message['type'] == 'message':
+            message_type = message['type']
+            if message_type == 'message':
+                stats['total_messages'] += 1
+                # 사용자별 메시지 수 계산
                 nickname = message['nickname']
-                stats['user_message_counts'][nickname] = stats['user_message_counts'].get(nickname, 0) + 1
+                user_counts[nickname] = user_counts.get(nickname, 0) + 1
+            elif message_type == 'join':
+                stats['total_joins'] += 1
+            elif message_type == 'leave':
+                stats['total_leaves'] += 1
         
+        stats['unique_users'] = len(user_counts)
         return stats
 
 # 테스트 코드
@@ -0,0 +1,229 @@
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# (위치, 키워드) 목록
+Tokens = Tuple[Tuple[int, str], ...]
+
+# 토큰 캐시 기본 크기 (대화 로그는 짧은 문장이 반복되므로 작은 캐시로도 적중률이 높음)
+DEFAULT_CACHE_SIZE = 50_000
+
+# 인덱싱하는 키워드 최소 길이
+MIN_KEYWORD_LENGTH = 2
+
+# 한글 음절 / 영문 / 숫자 덩어리 (ㅋㅋㅋ, ㅠㅠ 같은 자모만으로 된 문자열은 제외)
+WORD_PATTERN = re.compile(r'[가-힣]+|[A-Za-z]+|[0-9]+')
+
+# 어절 끝에서 떼어낼 조사 (긴 것부터 비교, 떼고 남는 말이 짧으면 어절 그대로 사용: '가을')
+PARTICLES = tuple(sorted({
+    '은', '는', '이', '가', '을', '를', '에', '의', '도', '만', '와', '과', '로', '으로',
+    '에서', '에게', '께서', '한테', '까지', '부터', '보다', '처럼', '마다', '이나', '나',
+    '랑', '이랑', '하고', '에서도', '에게서', '으로는', '로는', '에는', '에도', '이요', '요',
+}, key=len, reverse=True))
+
+# 어절 끝에서 떼어낼 서술격 조사/어미 (긴 것부터 비교, 떼고 남는 말이 짧으면 서술어라 어절을 버림: '입니다', '좋습니다')
+ENDINGS = tuple(sorted({
+    '입니다', '습니다', '합니다', '했습니다', '하겠습니다', '겠습니다', '었습니다', '았습니다', '였습니다',
+    '셨습니다', '으셨습니다', '해요', '했어요', '이에요', '예요', '인가요', '나요', '하나요', '세요', '하세요',
+    '으세요', '네요', '어요', '아요', '었어요', '았어요', '겠어요', '는데', '했는데', '했다', '한다', '이다',
+    '입니까', '습니까', '합니까',
+}, key=len, reverse=True))
+
+# 조사/어미를 떼고도 키워드로 쓰지 않는 말 (서술격 조사, 대명사, 부사, 접속사)
+STOPWORDS = frozenset({
+    '입니다', '이에요', '예요', '있습니다', '없습니다', '있어요', '없어요', '있는', '없는', '하는', '했는',
+    '그리고', '그런데', '근데', '그래서', '하지만', '그러면', '그럼', '그냥', '진짜', '정말', '너무', '아주',
+    '이거', '저거', '그거', '이건', '그건', '제가', '저는', '저도', '우리', '이제', '지금', '아니',
+})
+
+
+class BaseTokenizer(ABC):
+    """토크나이저 인터페이스"""
+
+    name = 'base'
+
+    @abstractmethod
+    def tokenize(self, text: str) -> Tokens:
+        """텍스트에서 (위치, 키워드) 목록 추출"""
+        raise NotImplementedError
+
+    def tokenize_many(self, texts: List[str]) -> List[Tokens]:
+        """여러 텍스트를 한 번에 토큰화 (일괄 처리를 지원하는 분석기는 재정의)"""
+        return [self.tokenize(text) for text in texts]
+
+
+# 이름 -> 토크나이저 생성 함수
+_REGISTRY: Dict[str, Callable[[], BaseTokenizer]] = {}
+
+
+def register_tokenizer(name: str):
+    """토크나이저 플러그인 등록 데코레이터"""
+    def decorator(factory):
+        _REGISTRY[name] = factory
+        return factory
+    return decorator
+
+
+@register_tokenizer('hangul')
+class HangulTokenizer(BaseTokenizer):
+    """순수 파이썬 어절 토크나이저: 어절 단위로 나눈 뒤 끝의 조사/어미를 제거하고 불용어는 제외"""
+
+    name = 'hangul'
+
+    def tokenize(self, text: str) -> Tokens:
+        tokens = []
+        for position, eojeol in enumerate(text.split()):
+            if '://' in eojeol:  # URL은 키워드로 쓰지 않음
+                continue
+            for word in WORD_PATTERN.findall(eojeol):
+                word = self._strip_particle(word).lower()
+                if len(word) >= MIN_KEYWORD_LENGTH and word not in STOPWORDS:
+                    tokens.append((position, word))
+        return tuple(tokens)
+
+    @staticmethod
+    def _strip_particle(word: str) -> str:
+        # 어미는 떼고 남는 말이 짧으면 서술어뿐이므로 빈 문자열 (예: '확인했습니다' -> '확인', '좋습니다' -> '')
+        for ending in ENDINGS:
+            if word.endswith(ending):
+                stem = word[:-len(ending)]
+                return stem if len(stem) >= MIN_KEYWORD_LENGTH else ''
+        # 조사를 떼고도 두 글자 이상 남는 경우에만 제거 (예: '회의에서' -> '회의', '가을'은 유지)
+        for particle in PARTICLES:
+            if word.endswith(particle) and len(word) - len(particle) >= MIN_KEYWORD_LENGTH:
+                return word[:-len(particle)]
+        return word
+
+
+@register_tokenizer('kiwi')
+class KiwiTokenizer(BaseTokenizer):
+    """kiwipiepy 형태소 분석기 플러그인 (명사/외국어/숫자만 키워드로 사용)"""
+
+    name = 'kiwi'
+    KEYWORD_TAGS = ('NNG', 'NNP', 'SL', 'SN')
+
+    def __init__(self):
+        from kiwipiepy import Kiwi
+        self.kiwi = Kiwi()
+
+    def tokenize(self, text: str) -> Tokens:
+        return self._to_keywords(self.kiwi.tokenize(text))
+
+    def tokenize_many(self, texts: List[str]) -> List[Tokens]:
+        return [self._to_keywords(tokens) for tokens in self.kiwi.tokenize(texts)]
+
+    def _to_keywords(self, tokens) -> Tokens:
+        return tuple(
+            (position, token.form)
+            for position, token in enumerate(tokens)
+            if token.tag in self.KEYWORD_TAGS and len(token.form) >= MIN_KEYWORD_LENGTH
+        )
+
+
+@register_tokenizer('jieba')
+class JiebaTokenizer(BaseTokenizer):
+    """기존 jieba 분할 방식 (호환용)"""
+
+    name = 'jieba'
+
+    def __init__(self):
+        import jieba
+        self.jieba = jieba
+
+    def tokenize(self, text: str) -> Tokens:
+        return tuple(
+            (position, keyword.strip())
+            for position, keyword in enumerate(self.jieba.cut(text))
+            if len(keyword.strip()) >= MIN_KEYWORD_LENGTH
+        )
+
+
+class CachedTokenizer(BaseTokenizer):
+    """메시지 텍스트 -> 토큰 LRU 캐시 (반복되는 짧은 메시지의 재분석 방지)"""
+
+    def __init__(self, tokenizer: BaseTokenizer, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.name = tokenizer.name
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: 'OrderedDict[str, Tokens]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tokenize(self, text: str) -> Tokens:
+        return self.tokenize_many([text])[0]
+
+    def tokenize_many(self, texts: List[str]) -> List[Tokens]:
+        results: List[Optional[Tokens]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                tokens = self._cache.get(text)
+                if tokens is not None:
+                    self._cache.move_to_end(text)
+                    self.hits += 1
+                    results[i] = tokens
+                else:
+                    # 같은 배치 안의 중복 텍스트는 한 번만 분석
+                    missing.setdefault(text, []).append(i)
+            self.misses += len(missing)
+            self.hits += sum(len(indexes) - 1 for indexes in missing.values())
+
+        if missing:
+            unique_texts = list(missing)
+            analyzed = self.tokenizer.tokenize_many(unique_texts)
+            with self._lock:
+                for text, tokens in zip(unique_texts, analyzed):
+                    for i in missing[text]:
+                        results[i] = tokens
+                    self._cache[text] = tokens
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return results
+
+    def cache_info(self) -> Dict:
+        """캐시 적중 통계"""
+        total = self.hits + self.misses
+        return {
+            'tokenizer': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._cache),
+        }
+
+
+def available_tokenizers() -> List[str]:
+    """등록된 토크나이저 이름 목록"""
+    return list(_REGISTRY)
+
+
+def get_tokenizer(name: Optional[str] = None, cache_size: int = DEFAULT_CACHE_SIZE) -> CachedTokenizer:
+    """이름으로 토크나이저 생성 (선택 분석기가 설치되지 않았으면 기본 한글 토크나이저 사용)"""
+    name = name or os.getenv('KAKAO_TOKENIZER', 'hangul')
+    factory = _REGISTRY.get(name)
+    if factory is None:
+        print(f"⚠️ 알 수 없는 토크나이저 '{name}'. 기본 한글 토크나이저를 사용합니다.")
+        factory = HangulTokenizer
+
+    try:
+        tokenizer = factory()
+    except ImportError:
+        print(f"⚠️ '{name}' 토크나이저 패키지가 설치되지 않았습니다. 기본 한글 토크나이저를 사용합니다.")
+        tokenizer = HangulTokenizer()
+
+    return CachedTokenizer(tokenizer, cache_size)
+
+
+def iter_keyword_rows(tokenizer: BaseTokenizer, messages: Iterable[Tuple[int, str]]) -> Iterable[Tuple[int, str, int]]:
+    """(메시지 id, 텍스트) 목록을 일괄 토큰화하여 keyword_index 행으로 변환"""
+    messages = list(messages)
+    token_lists = tokenizer.tokenize_many([text for _, text in messages])
+    for (message_id, _), tokens in zip(messages, token_lists):
+        for position, keyword in tokens:
+            yield (message_id, keyword, position)
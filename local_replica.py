@@ -0,0 +1,190 @@
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from instrumentation import note_error, span
+from kakao_parser import KST
+
+# Supabase에서 복제본을 따라잡을 때 한 번에 읽는 행 수
+SYNC_PAGE_SIZE = 1000
+# 동기화 위치를 저장하는 이름 (sync_state.source)
+SYNC_SOURCE = 'supabase'
+
+
+def record_from_row(row: Dict) -> Dict:
+    """Supabase messages 행을 파서 레코드 형식으로 복원 (날짜는 ts의 KST 날짜)"""
+    ts = row.get('ts')
+    time_str = row.get('timestamp') or ''
+    return {
+        'type': 'message',
+        'date': datetime.fromtimestamp(ts, KST).strftime('%Y-%m-%d') if ts is not None else None,
+        'time': time_str,
+        'nickname': row['nickname'],
+        'message': row.get('message') or '',
+        'raw_line': f"[{row['nickname']}] [{time_str}] {row.get('message') or ''}",
+    }
+
+
+class LocalReplica:
+    """Supabase 메시지의 로컬 SQLite 복제본
+
+    업로드는 Supabase와 복제본에 함께 쓰고(write-through), 검색/통계는 복제본에서 읽는다.
+    시작할 때 Supabase의 마지막으로 받은 id 이후 행을 받아 복제본을 따라잡으며(sync),
+    따라잡기 전이거나 복제본 쓰기가 실패한 동안에는 Supabase에서 읽는다.
+    같은 메시지는 내용 해시로 구분하므로 업로드로 이미 쓴 행을 다시 받아도 중복되지 않는다.
+    """
+
+    def __init__(self, rooms: Callable, supabase, on_change: Optional[Callable[[], None]] = None,
+                 page_size: int = SYNC_PAGE_SIZE):
+        # rooms: 로컬 방 라우터를 돌려주는 함수 (처음 사용할 때 DB 연결)
+        self._rooms = rooms
+        self.supabase = supabase
+        self.on_change = on_change or (lambda: None)
+        self.page_size = page_size
+        self.last_sync: Dict = {}
+        self._ready = threading.Event()
+        # 동기화 중 복제본 쓰기가 실패하면 끝나도 준비 상태로 두지 않음
+        self._stale = False
+        self._sync_lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        """복제본에서 읽어도 되는지 (Supabase를 따라잡았고 이후 쓰기 실패가 없음)"""
+        return self._ready.is_set()
+
+    def start_sync(self):
+        """백그라운드 스레드에서 따라잡기 시작 (이미 진행 중이면 무시)"""
+        if self._sync_thread is not None and self._sync_thread.is_alive():
+            return
+        self._sync_thread = threading.Thread(target=self.sync, name='replica-sync', daemon=True)
+        self._sync_thread.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def sync(self) -> Dict:
+        """마지막으로 받은 id 이후의 Supabase 행을 복제본에 반영, {'fetched', 'inserted', 'last_id'} 반환"""
+        with self._sync_lock, span('replica.sync') as stage:
+            self._stale = False
+            try:
+                rooms = self._rooms()
+                last_id = rooms.catalog.get_sync_position(SYNC_SOURCE)
+                fetched = inserted = 0
+                if self.supabase.supabase:
+                    for page in self.supabase.iter_messages_after(last_id, self.page_size):
+                        inserted += self._apply_page(rooms, page)
+                        fetched += len(page)
+                        last_id = page[-1]['id']
+                        rooms.catalog.save_sync_position(SYNC_SOURCE, last_id)
+                stage.rows = inserted
+                self.last_sync = {
+                    'fetched': fetched, 'inserted': inserted, 'last_id': last_id,
+                    'finished_at': datetime.now().isoformat()
+                }
+            except Exception as e:
+                print(f"❌ 로컬 복제본 동기화 오류: {e}")
+                note_error(e)
+                self._ready.clear()
+                return {'error': str(e)}
+        # Supabase를 쓸 수 없으면 복제본이 유일한 저장소
+        if not self._stale:
+            self._ready.set()
+        if inserted:
+            self.on_change()
+        return self.last_sync
+
+    @staticmethod
+    def _apply_page(rooms, page: List[Dict]) -> int:
+        """받은 행을 방별로 나눠 저장 (방 안의 순서 유지)"""
+        by_room: Dict[str, Tuple[List[Dict], List[str]]] = {}
+        for row in page:
+            records, hashes = by_room.setdefault(row.get('room_key') or '', ([], []))
+            records.append(record_from_row(row))
+            hashes.append(row['idempotency_key'])
+        inserted = 0
+        for room_key, batch in by_room.items():
+            database, room_id = rooms.route(room_key or None)
+            inserted += database.save_hashed([batch], room_id)
+        return inserted
+
+    def write(self, batches: Iterable[Tuple[List[Dict], List[str]]], room_key: Optional[str]) -> bool:
+        """업로드의 (레코드, 해시) 배치들을 한 트랜잭션으로 복제본에도 저장, 성공 여부 반환 (실패하면 다시 따라잡을 때까지 Supabase에서 읽음)"""
+        try:
+            with span('sqlite.replica_write') as stage:
+                database, room_id = self._rooms().route(room_key)
+                stage.rows = database.save_hashed(batches, room_id)
+            return True
+        except Exception as e:
+            print(f"⚠️ 로컬 복제본 저장 실패: {e}")
+            note_error(e)
+            self._stale = True
+            self._ready.clear()
+            return False
+    
+    def get_import_state(self, room_key: str) -> Optional[Dict]:
+        """로컬 카탈로그에 저장한 방의 증분 적재 체크포인트"""
+        try:
+            return self._rooms().catalog.get_import_state(room_key)
+        except Exception as e:
+            print(f"⚠️ 로컬 증분 적재 체크포인트 조회 실패: {e}")
+            note_error(e)
+            return None
+    
+    def save_import_state(self, state: Dict) -> bool:
+        """업로드 레코드를 복제본에 모두 저장한 뒤 방의 체크포인트를 로컬 카탈로그에 저장"""
+        try:
+            self._rooms().catalog.save_import_state(state)
+            return True
+        except Exception as e:
+            print(f"❌ 로컬 증분 적재 체크포인트 저장 오류: {e}")
+            note_error(e)
+            return False
+
+    def search(self, keyword: Optional[str], nickname: Optional[str], limit: int,
+               start: Optional[int], end: Optional[int], room: Optional[str],
+               after: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        """복제본 검색 한 페이지 (Supabase 검색 결과와 같은 필드), (결과, 다음 페이지 키 또는 None) 반환
+
+        한 행을 더 읽어 다음 페이지가 있는지 확인하며, after에 이전 페이지의 키를 넘기면 그 다음부터 읽는다.
+        """
+        with span('sqlite.search') as stage:
+            rooms = self._rooms()
+            rows = rooms.search(
+                room, limit=limit + 1, after=after, keyword=keyword, nickname=nickname, message_type='message',
+                start=start, end=end
+            )
+            next_key = rooms.next_page_key(rows[:limit]) if len(rows) > limit else None
+            room_keys = rooms.room_keys()
+            stage.rows = min(len(rows), limit)
+            return [to_supabase_row(row, room_keys) for row in rows[:limit]], next_key
+
+    def iter_messages(self, keyword: Optional[str], nickname: Optional[str], start: Optional[int],
+                      end: Optional[int], room: Optional[str]) -> Iterator[Dict]:
+        """복제본에서 검색 조건에 맞는 메시지 전체 (검색 결과와 같은 필드, 최신순)"""
+        rooms = self._rooms()
+        room_keys = rooms.room_keys()
+        rows = rooms.iter_messages(
+            room, keyword=keyword, nickname=nickname, message_type='message', start=start, end=end
+        )
+        return (to_supabase_row(row, room_keys) for row in rows)
+
+    def get_statistics(self, start: Optional[int], end: Optional[int], room: Optional[str]) -> Dict:
+        """복제본 통계 (기간이 있으면 키워드 빈도도 그 기간 기준)"""
+        with span('sqlite.statistics'):
+            return self._rooms().get_statistics(room, start, end)
+
+
+def to_supabase_row(row: Dict, room_keys: Dict[int, str]) -> Dict:
+    """로컬 messages 행을 Supabase 검색 결과 형식으로 변환"""
+    converted = {
+        'id': row['id'],
+        'nickname': row['nickname'],
+        'message': row['message_text'],
+        'timestamp': row['time_str'],
+        'ts': row['ts'],
+        'message_type': 'text',
+        'room_key': room_keys.get(row.get('room_id'), ''),
+    }
+    if 'snippet' in row:
+        converted['snippet'] = row['snippet']
+    return converted
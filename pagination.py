@@ -0,0 +1,46 @@
+import base64
+import binascii
+import json
+from typing import Optional, Tuple, Union
+
+# 검색 한 페이지 기본 행 수
+DEFAULT_PAGE_SIZE = 100
+# 검색 한 페이지 최대 행 수 (요청한 limit이 더 커도 서버에서 줄임)
+MAX_PAGE_SIZE = 500
+# 커서를 만든 저장소 (로컬 복제본과 Supabase는 id가 달라 서로의 커서를 쓸 수 없음)
+CURSOR_SOURCES = ('local', 'supabase')
+
+
+def clamp_page_size(limit: Union[int, str, None]) -> int:
+    """요청한 페이지 크기를 1~MAX_PAGE_SIZE로 제한 (없으면 기본값, 정수가 아니면 ValueError)"""
+    if limit is None or limit == '':
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError(f'limit은 정수여야 합니다: {limit}')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(source: str, key: Tuple) -> str:
+    """다음 페이지 키(마지막 행의 (시각, id) 등)를 URL에 넣을 수 있는 불투명 문자열로 변환"""
+    payload = json.dumps([source, list(key)], separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[Optional[str], Optional[Tuple]]:
+    """커서 문자열 -> (저장소, 다음 페이지 키), 커서가 없으면 (None, None), 잘못된 커서면 ValueError"""
+    if not cursor:
+        return None, None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        source, key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise ValueError('잘못된 검색 커서입니다.')
+    valid_key = (
+        isinstance(key, list) and 1 <= len(key) <= 3
+        and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in key)
+    )
+    if source not in CURSOR_SOURCES or not valid_key:
+        raise ValueError('잘못된 검색 커서입니다.')
+    return source, tuple(key)
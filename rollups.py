@@ -0,0 +1,86 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from kakao_parser import parse_time_of_day
+
+
+class RollupAccumulator:
+    """적재 중인 메시지에서 집계 테이블(사용자/키워드/일별/시간대별) 증분을 메모리에 모음
+
+    적재 트랜잭션 끝에서 항목당 한 번의 UPSERT로 반영하므로,
+    통계 조회는 전체 메시지를 다시 훑지 않고 집계 테이블만 읽으면 된다.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, List[int]] = {}   # nickname -> [메시지 수, 입장 수, 퇴장 수]
+        self.daily: Dict[str, List[int]] = {}   # YYYY-MM-DD -> [메시지 수, 입장 수, 퇴장 수]
+        self.hourly = [0] * 24                  # 시간대별 메시지 수
+        self.keywords = Counter()
+
+    def add(self, msg: Dict):
+        """레코드 하나를 집계에 반영"""
+        message_type = msg['type']
+        if message_type == 'message':
+            slot = 0
+            time_of_day = parse_time_of_day(msg.get('time'))
+            if time_of_day is not None:
+                self.hourly[time_of_day[0]] += 1
+        elif message_type == 'join':
+            slot = 1
+        elif message_type == 'leave':
+            slot = 2
+        else:
+            return
+
+        counters = self.users.get(msg['nickname'])
+        if counters is None:
+            counters = self.users[msg['nickname']] = [0, 0, 0]
+        counters[slot] += 1
+
+        day = msg.get('date')
+        if day:
+            counters = self.daily.get(day)
+            if counters is None:
+                counters = self.daily[day] = [0, 0, 0]
+            counters[slot] += 1
+
+    def add_keywords(self, keywords: Iterable[str]):
+        """추출된 키워드를 빈도 집계에 반영"""
+        self.keywords.update(keywords)
+
+    def user_rows(self) -> List[Tuple[str, int, int, int]]:
+        return [(nickname, *counters) for nickname, counters in self.users.items()]
+
+    def daily_rows(self) -> List[Tuple[str, int, int, int]]:
+        return [(day, *counters) for day, counters in self.daily.items()]
+
+    def hourly_rows(self) -> List[Tuple[int, int]]:
+        return [(hour, count) for hour, count in enumerate(self.hourly) if count]
+
+    def keyword_rows(self) -> List[Tuple[str, int]]:
+        return list(self.keywords.items())
+
+    def to_payload(self) -> Dict:
+        """원격 DB 함수(apply_rollup_deltas)에 넘기는 JSON 증분"""
+        return {
+            'users': [
+                {'nickname': n, 'messages': m, 'joins': j, 'leaves': l}
+                for n, m, j, l in self.user_rows()
+            ],
+            'keywords': [{'keyword': k, 'frequency': f} for k, f in self.keyword_rows()],
+            'daily': [
+                {'day': d, 'messages': m, 'joins': j, 'leaves': l}
+                for d, m, j, l in self.daily_rows()
+            ],
+            'hourly': [{'hour': h, 'messages': c} for h, c in self.hourly_rows()],
+        }
+
+
+def summarize_user_statistics(user_stats: List[Dict]) -> Dict:
+    """사용자별 집계에서 대시보드 요약 수치 계산"""
+    return {
+        "total_messages": sum(row.get('total_messages') or 0 for row in user_stats),
+        "total_joins": sum(row.get('join_count') or 0 for row in user_stats),
+        "total_leaves": sum(row.get('leave_count') or 0 for row in user_stats),
+        "unique_users": sum(1 for row in user_stats if row.get('total_messages'))
+    }
@@ -0,0 +1,325 @@
+import heapq
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from incremental_import import read_room_key
+from heavy_hitters import TRENDING_WINDOWS, SpaceSaving, merge_summaries, trending_keywords, window_start
+from kakao_database import INSERT_BATCH_SIZE, USER_LOOKUP_LIMIT, KakaoTalkDatabase
+from rollups import summarize_user_statistics
+
+# 샤드 파일 이름 (방 id 기준)
+SHARD_FILE_FORMAT = 'room_{room_id}.db'
+
+
+def _import_shard(db_path: str, shard_dir: Optional[str], paths: List[str], batch_size: int) -> List[Dict]:
+    """작업 프로세스에서 한 방의 파일들을 순서대로 적재 (방마다 샤드 파일이 달라 쓰기 잠금을 나누지 않음)"""
+    router = RoomRouter(db_path, shard_dir)
+    try:
+        return [router.import_export(path, batch_size) for path in paths]
+    finally:
+        router.close()
+
+
+class RoomRouter:
+    """방 단위로 DB를 고르는 라우터
+
+    shard_dir이 없으면 db_path 하나에 room_id로 구분해 저장하고, 있으면 방 목록(rooms)만 db_path에 두고
+    방마다 shard_dir/room_{id}.db 파일에 따로 저장한다. 샤드는 쓰기 잠금을 공유하지 않으므로
+    여러 방을 동시에 적재할 수 있다.
+    """
+
+    def __init__(self, db_path: str = 'kakao_chat.db', shard_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.shard_dir = shard_dir
+        # 방 목록 (단일 파일 모드에서는 데이터도 여기에 저장)
+        self.catalog = KakaoTalkDatabase(db_path)
+        self._shards: Dict[int, KakaoTalkDatabase] = {}
+        self._lock = threading.Lock()
+        if shard_dir:
+            os.makedirs(shard_dir, exist_ok=True)
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self.shard_dir)
+
+    def close(self):
+        """샤드와 방 목록 DB 연결 종료"""
+        with self._lock:
+            for shard in self._shards.values():
+                shard.close()
+            self._shards.clear()
+        self.catalog.close()
+
+    def _shard(self, room_id: int, room_key: Optional[str]) -> KakaoTalkDatabase:
+        """방 id의 샤드 (처음 열 때 방 목록과 같은 id로 방을 등록)"""
+        with self._lock:
+            shard = self._shards.get(room_id)
+            if shard is None:
+                path = os.path.join(self.shard_dir, SHARD_FILE_FORMAT.format(room_id=room_id))
+                shard = self._shards[room_id] = KakaoTalkDatabase(path)
+                shard.ensure_room(room_key, room_id=room_id)
+            return shard
+
+    def route(self, room_key: Optional[str], name: Optional[str] = None) -> Tuple[KakaoTalkDatabase, int]:
+        """방을 등록하고 (저장할 DB, 그 DB 안의 room_id) 반환"""
+        room_id = self.catalog.ensure_room(room_key, name)
+        if not self.sharded:
+            return self.catalog, room_id
+        return self._shard(room_id, room_key), room_id
+
+    def find(self, room_key: str) -> Optional[Tuple[KakaoTalkDatabase, int]]:
+        """등록된 방의 (DB, room_id), 없으면 None"""
+        room_id = self.catalog.find_room(room_key)
+        if room_id is None:
+            return None
+        if not self.sharded:
+            return self.catalog, room_id
+        return self._shard(room_id, room_key), room_id
+
+    def _targets(self, room_key: Optional[str]) -> List[Tuple[KakaoTalkDatabase, Optional[int]]]:
+        """조회 대상 (room_key가 None이면 전체: 단일 파일은 방 구분 없이, 샤드는 방마다)"""
+        if room_key is not None:
+            target = self.find(room_key)
+            return [target] if target else []
+        if not self.sharded:
+            return [(self.catalog, None)]
+        return [
+            (self._shard(room['room_id'], room['room_key']), room['room_id'])
+            for room in self._catalog_rooms()
+        ]
+
+    def room_keys(self) -> Dict[int, str]:
+        """방 id -> room_key"""
+        return {room['room_id']: room['room_key'] for room in self._catalog_rooms()}
+
+    def _catalog_rooms(self) -> List[Dict]:
+        """방 목록 DB에 등록된 모든 방 (샤드 모드에서는 방 목록 DB에 메시지가 없음)"""
+        with self.catalog.pool.reader() as conn:
+            rows = conn.execute('SELECT id, room_key, name FROM rooms ORDER BY id').fetchall()
+        return [{'room_id': row[0], 'room_key': row[1], 'name': row[2]} for row in rows]
+
+    def import_export(self, source, batch_size: int = INSERT_BATCH_SIZE) -> Dict:
+        """내보내기 파일 첫 줄의 방 이름으로 DB를 골라 증분 적재"""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as stream:
+                return self.import_export(stream, batch_size)
+        db, room_id = self.route(read_room_key(source))
+        return db.import_export(source, batch_size, room_id)
+
+    def import_many(self, paths: Iterable[str], workers: Optional[int] = None,
+                    batch_size: int = INSERT_BATCH_SIZE) -> List[Dict]:
+        """여러 내보내기 파일 적재 (샤드 모드에서는 방마다 다른 프로세스에서 병렬로)
+
+        같은 방의 파일은 같은 작업에서 주어진 순서대로 적재해 증분 체크포인트가 이어지게 한다.
+        """
+        groups: Dict[Optional[str], List[str]] = {}
+        for path in paths:
+            with open(path, 'rb') as stream:
+                groups.setdefault(read_room_key(stream), []).append(path)
+
+        if not self.sharded or len(groups) < 2 or workers == 1:
+            return [self.import_export(path, batch_size) for group in groups.values() for path in group]
+
+        # 방 id는 방 목록 DB에서 미리 발급 (작업 프로세스끼리 방 목록 쓰기가 겹치지 않게)
+        for room_key in groups:
+            self.catalog.ensure_room(room_key)
+        results = []
+        with ProcessPoolExecutor(max_workers=workers or min(len(groups), os.cpu_count() or 1)) as executor:
+            futures = [
+                executor.submit(_import_shard, self.db_path, self.shard_dir, group, batch_size)
+                for group in groups.values()
+            ]
+            for future in futures:
+                results.extend(future.result())
+        return results
+
+    def rooms(self) -> List[Dict]:
+        """방 목록과 방별 메시지/사용자 수"""
+        if not self.sharded:
+            return self.catalog.get_rooms()
+        rooms = []
+        for room in self._catalog_rooms():
+            shard = self._shard(room['room_id'], room['room_key'])
+            rooms.extend(entry for entry in shard.get_rooms() if entry['room_id'] == room['room_id'])
+        return rooms
+
+    def get_statistics(self, room_key: Optional[str] = None, start: Optional[int] = None,
+                       end: Optional[int] = None, keyword_limit: int = 20) -> Dict:
+        """방(room_key가 None이면 전체) 통계, 여러 샤드에 걸치면 샤드별 결과를 합산"""
+        targets = self._targets(room_key)
+        if len(targets) == 1:
+            db, room_id = targets[0]
+            return db.get_statistics(start, end, room_id)
+
+        ranged = start is not None or end is not None
+        users: Dict[str, Dict] = {}
+        keywords: Counter = Counter()
+        daily: Dict[str, Dict] = {}
+        hourly = [0] * 24
+        for db, room_id in targets:
+            if ranged:
+                # 상위 키워드는 샤드를 합친 뒤에 정해야 하므로 전체를 받음
+                stats = db.get_range_statistics(start, end, keyword_limit=-1, room_id=room_id)
+            else:
+                stats = {
+                    'user_statistics': db.get_user_statistics(room_id=room_id),
+                    'keyword_frequency': db.get_keyword_frequency(-1, room_id),
+                    'activity': db.get_activity_histogram(room_id),
+                }
+            for row in stats['user_statistics']:
+                _merge_user(users, row)
+            keywords.update({row['keyword']: row['frequency'] for row in stats['keyword_frequency']})
+            for row in stats['activity']['daily']:
+                day = daily.setdefault(row['day'], {'day': row['day'], 'messages': 0, 'joins': 0, 'leaves': 0})
+                for field in ('messages', 'joins', 'leaves'):
+                    day[field] += row[field] or 0
+            for hour, count in enumerate(stats['activity']['hourly']):
+                hourly[hour] += count or 0
+
+        user_stats = sorted(users.values(), key=lambda user: user['total_messages'], reverse=True)
+        result = {
+            'user_statistics': user_stats,
+            'keyword_frequency': [
+                {'keyword': keyword, 'frequency': frequency}
+                for keyword, frequency in keywords.most_common(keyword_limit)
+            ],
+            'activity': {'daily': [daily[day] for day in sorted(daily)], 'hourly': hourly},
+            **summarize_user_statistics(user_stats)
+        }
+        if ranged:
+            result['range'] = {'start': start, 'end': end}
+        return result
+
+    def search(self, room_key: Optional[str] = None, limit: int = 100, after: Optional[Tuple] = None,
+               **criteria) -> List[Dict]:
+        """방(room_key가 None이면 전체) 메시지 검색, 여러 샤드는 (시각, id, 방 id) 역순으로 병합
+
+        after에 이전 페이지의 next_page_key()를 넘기면 그 다음 페이지를 반환한다.
+        """
+        targets = self._targets(room_key)
+        if not self.sharded:
+            if not targets:
+                return []
+            db, room_id = targets[0]
+            return db.search_messages(limit=limit, after=after, room_id=room_id, **criteria)
+        pages = [
+            db.search_messages(limit=limit, after=_shard_after(after, room_id), room_id=room_id, **criteria)
+            for db, room_id in targets
+        ]
+        merged = heapq.merge(*pages, key=_shard_order, reverse=True)
+        return list(merged)[:limit]
+
+    def next_page_key(self, results: List[Dict]) -> Optional[Tuple]:
+        """검색 결과 마지막 행에서 search(after=...)용 키 생성 (샤드는 샤드마다 id가 따로라 방 id까지 포함)"""
+        if not results or not self.sharded or results[-1].get('ts') is None:
+            return KakaoTalkDatabase.next_page_key(results)
+        return _shard_order(results[-1])
+
+    def iter_messages(self, room_key: Optional[str] = None, **criteria) -> Iterator[Dict]:
+        """방(room_key가 None이면 전체) 메시지 전체를 키셋 페이지로 읽어 반환, 여러 샤드는 (시각, id) 역순으로 병합"""
+        streams = [db.iter_messages(room_id=room_id, **criteria) for db, room_id in self._targets(room_key)]
+        if len(streams) == 1:
+            return streams[0]
+        return heapq.merge(*streams, key=lambda row: (row.get('ts') or 0, row['id']), reverse=True)
+
+    def find_users(self, query: str, limit: int = USER_LOOKUP_LIMIT, room_key: Optional[str] = None) -> List[Dict]:
+        """닉네임 유사 조회 (room_key가 None이면 전체), 여러 샤드는 닉네임별로 메시지 수를 합산"""
+        targets = self._targets(room_key)
+        if len(targets) == 1:
+            db, room_id = targets[0]
+            return db.find_users(query, limit, room_id)
+        users: Dict[str, Dict] = {}
+        for db, room_id in targets:
+            for user in db.find_users(query, limit, room_id):
+                merged = users.setdefault(user['nickname'], dict(user, total_messages=0))
+                merged['total_messages'] += user['total_messages']
+        ranked = sorted(users.values(), key=lambda user: (user['score'], user['total_messages']), reverse=True)
+        return ranked[:limit]
+    
+    def merge_nicknames(self, alias: str, nickname: str) -> Optional[Dict]:
+        """모든 방(샤드마다 사전이 따로 있음)에서 alias를 nickname과 같은 사용자로 병합, 두 닉네임이 함께 있는 방이 없으면 None"""
+        return _merge_identities(db.merge_nicknames(alias, nickname) for db, _ in self._targets(None))
+    
+    def split_nickname(self, nickname: str) -> Optional[Dict]:
+        """모든 방에서 nickname을 별칭 병합에서 떼어 냄, 어느 방에도 없으면 None"""
+        return _merge_identities(db.split_nickname(nickname) for db, _ in self._targets(None))
+    
+    def get_trending_keywords(self, window: str = 'week', limit: int = 20, room_key: Optional[str] = None) -> Dict:
+        """마지막 데이터 날짜까지 window(day/week/month) 기간의 인기 키워드, 여러 샤드는 요약을 합쳐 계산"""
+        targets = self._targets(room_key)
+        until = max(filter(None, (db.latest_keyword_day(room_id) for db, room_id in targets)), default=None)
+        if until is None:
+            return trending_keywords(window, None, None, limit)
+        since = window_start(until, TRENDING_WINDOWS[window])
+        summary = merge_summaries(db.keyword_window(since, until, room_id) for db, room_id in targets)
+        return trending_keywords(window, until, summary, limit)
+    
+    def get_user_keywords(self, nickname: str, limit: int = 10, room_key: Optional[str] = None) -> Optional[Dict]:
+        """사용자(별칭 포함)가 많이 쓴 키워드, 어느 방에도 없는 닉네임이면 None"""
+        merged: Optional[SpaceSaving] = None
+        for db, room_id in self._targets(room_key):
+            summary = db.user_keyword_summary(nickname, room_id)
+            if summary is None:
+                continue
+            if merged is None:
+                merged = summary
+            else:
+                merged.merge(summary)
+        if merged is None:
+            return None
+        return {'nickname': nickname, 'keywords': merged.top(limit)}
+    
+    def iter_activity_rows(self, room_key: Optional[str] = None, start: Optional[int] = None,
+                           end: Optional[int] = None) -> Iterator[Tuple[int, str, str]]:
+        """분석용 (ts, 종류, 닉네임) 행, 여러 샤드는 시각 순서로 병합"""
+        targets = self._targets(room_key)
+        streams = [db.iter_activity_rows(start, end, room_id=room_id) for db, room_id in targets]
+        if len(streams) == 1:
+            return streams[0]
+        return heapq.merge(*streams, key=lambda row: row[0])
+
+
+def _shard_order(row: Dict) -> Tuple:
+    """샤드 검색 결과 병합 순서 (같은 시각/id가 여러 샤드에 있어도 방 id로 순서가 정해짐)"""
+    return (row.get('ts') or 0, row['id'], row.get('room_id') or 0)
+
+
+def _shard_after(after: Optional[Tuple], room_id: Optional[int]) -> Optional[Tuple]:
+    """(시각, id, 방 id) 페이지 키를 한 샤드의 (시각, id) 키로 변환
+
+    방 id가 키보다 작은 샤드는 키와 같은 (시각, id) 행이 병합 순서상 뒤에 오므로 그 행부터 포함한다.
+    """
+    if after is None or len(after) != 3:
+        return after
+    ts, message_id, after_room = after
+    if (room_id or 0) < after_room:
+        return (ts, message_id + 1)
+    return (ts, message_id)
+
+
+def _merge_identities(results: Iterable[Optional[Dict]]) -> Optional[Dict]:
+    """샤드별 별칭 병합 결과를 하나로 (별칭은 합집합)"""
+    merged = None
+    for result in results:
+        if result is None:
+            continue
+        if merged is None:
+            merged = {'nickname': result['nickname'], 'aliases': []}
+        merged['aliases'].extend(alias for alias in result['aliases'] if alias not in merged['aliases'])
+    return merged
+
+
+def _merge_user(users: Dict[str, Dict], row: Dict):
+    """샤드별 사용자 통계를 닉네임 기준으로 합산"""
+    user = users.get(row['nickname'])
+    if user is None:
+        users[row['nickname']] = dict(row)
+        return
+    for field in ('total_messages', 'join_count', 'leave_count'):
+        user[field] = (user.get(field) or 0) + (row.get(field) or 0)
+    for field, pick in (('first_seen', min), ('last_seen', max)):
+        values = [value for value in (user.get(field), row.get(field)) if value is not None]
+        if values:
+            user[field] = pick(values)
@@ -0,0 +1,310 @@
+import gzip
+import json
+import os
+import struct
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from kakao_parser import ChatRecord
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 스냅샷 파일 머리말: 매직 + 형식 버전 + 압축 방식 (압축하지 않은 상태로 기록)
+MAGIC = b'KKSNAP'
+# 2: 블록 앞에 머리 프레임(방 정보) 추가, 1도 읽을 수 있음
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+CODECS = {'gzip': b'g', 'zstd': b'z'}
+
+# 블록 하나에 담는 레코드 수 (블록 단위로 직렬화하므로 쓰기/읽기 모두 메모리 사용량이 일정)
+SNAPSHOT_BLOCK_SIZE = 5000
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# 프레임: 종류 1바이트 + 길이 4바이트 + JSON 본문
+FRAME_HEADER = struct.Struct('>cI')
+FRAME_HEADER_INFO = b'H'
+FRAME_BLOCK = b'B'
+FRAME_METADATA = b'M'
+
+TYPE_CODES = {'message': 'm', 'join': 'j', 'leave': 'l'}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+
+class SnapshotError(Exception):
+    """스냅샷 형식이 아니거나 손상된 경우"""
+
+
+def default_codec() -> str:
+    """SNAPSHOT_CODEC 환경변수 (기본: zstd를 사용할 수 있으면 zstd, 아니면 gzip)"""
+    codec = os.getenv('SNAPSHOT_CODEC') or ('zstd' if ZSTD_AVAILABLE else 'gzip')
+    if codec == 'zstd' and not ZSTD_AVAILABLE:
+        print("⚠️ zstandard 패키지가 설치되지 않았습니다. gzip으로 압축합니다.")
+        codec = 'gzip'
+    return codec
+
+
+def _open_compressor(stream: BinaryIO, codec: str):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(stream, closefd=False)
+    return gzip.GzipFile(fileobj=stream, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _open_decompressor(stream: BinaryIO, codec: str):
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise SnapshotError("zstd 스냅샷을 읽으려면 zstandard 패키지가 필요합니다.")
+        return zstandard.ZstdDecompressor().stream_reader(stream, closefd=False)
+    return gzip.GzipFile(fileobj=stream, mode='rb')
+
+
+class SnapshotWriter:
+    """레코드를 블록 단위 컬럼 형식으로 압축 저장하는 스트리밍 작성기
+
+    블록마다 닉네임과 시간 문자열은 처음 나온 것만 사전에 추가하고 번호로 기록하며,
+    날짜는 연속 구간 길이로, 종류는 한 글자 코드로 저장한다 (raw_line은 복원 가능하므로 저장하지 않음).
+    적재할 때 계산한 내용 해시를 함께 넘기면 블록에 기록해 복원할 때 그대로 사용한다
+    (증분 업로드의 백업은 파일 뒷부분만 담고 있어 복원할 때 다시 계산하면 같은 날 순번이 처음부터 다시 매겨짐).
+    """
+
+    def __init__(self, stream: BinaryIO, codec: Optional[str] = None, block_size: int = SNAPSHOT_BLOCK_SIZE,
+                 header: Optional[Dict] = None):
+        """header: 블록보다 먼저 기록할 정보 (복원 시 레코드를 읽기 전에 방을 정하는 데 사용)"""
+        self.codec = codec or default_codec()
+        if self.codec not in CODECS:
+            raise ValueError(f"지원하지 않는 압축 방식: {self.codec}")
+        stream.write(MAGIC + bytes([FORMAT_VERSION]) + CODECS[self.codec])
+        self._out = _open_compressor(stream, self.codec)
+        self.block_size = block_size
+        self.record_count = 0
+        self._nicknames: Dict[str, int] = {}
+        self._times: Dict[str, int] = {}
+        self._pending: List[Dict] = []
+        self._pending_hashes: List[Optional[str]] = []
+        self._closed = False
+        self._write_frame(FRAME_HEADER_INFO, header or {})
+
+    def write(self, records: Iterable[Dict], hashes: Optional[Iterable[str]] = None):
+        """레코드 추가 (block_size가 찰 때마다 블록 기록), hashes는 레코드별 내용 해시"""
+        hashes = iter(hashes) if hashes is not None else None
+        for record in records:
+            self._pending.append(record)
+            self._pending_hashes.append(next(hashes) if hashes is not None else None)
+            if len(self._pending) >= self.block_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        records, self._pending = self._pending, []
+        hashes, self._pending_hashes = self._pending_hashes, []
+
+        types, nick_ids, time_ids, texts, dates = [], [], [], [], []
+        new_nicks, new_times = [], []
+        for record in records:
+            message_type = record['type']
+            types.append(TYPE_CODES[message_type])
+
+            nickname = record['nickname']
+            nick_id = self._nicknames.get(nickname)
+            if nick_id is None:
+                nick_id = self._nicknames[nickname] = len(self._nicknames)
+                new_nicks.append(nickname)
+            nick_ids.append(nick_id)
+
+            if message_type == 'message':
+                time_str = record.get('time') or ''
+                time_id = self._times.get(time_str)
+                if time_id is None:
+                    time_id = self._times[time_str] = len(self._times)
+                    new_times.append(time_str)
+                time_ids.append(time_id)
+                texts.append(record.get('message') or '')
+
+            # 날짜는 (날짜, 연속 개수) 구간으로 저장
+            date = record.get('date')
+            if dates and dates[-1][0] == date:
+                dates[-1][1] += 1
+            else:
+                dates.append([date, 1])
+
+        block = {
+            'types': ''.join(types),
+            'new_nicks': new_nicks,
+            'nicks': nick_ids,
+            'new_times': new_times,
+            'times': time_ids,
+            'dates': dates,
+            'texts': texts,
+        }
+        # 해시는 블록의 모든 레코드에 있을 때만 기록 (없는 블록은 복원할 때 다시 계산)
+        if None not in hashes:
+            block['hashes'] = hashes
+        self._write_frame(FRAME_BLOCK, block)
+        self.record_count += len(records)
+
+    def _write_frame(self, kind: bytes, body: Dict):
+        payload = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self._out.write(FRAME_HEADER.pack(kind, len(payload)))
+        self._out.write(payload)
+
+    def close(self, metadata: Optional[Dict] = None):
+        """남은 레코드와 메타데이터(방 정보, 통계)를 기록하고 압축 스트림 종료 (원본 스트림은 닫지 않음)"""
+        if self._closed:
+            return
+        self._flush()
+        self._write_frame(FRAME_METADATA, {**(metadata or {}), 'record_count': self.record_count})
+        self._out.close()
+        self._closed = True
+
+
+class SnapshotReader:
+    """스냅샷을 블록 단위로 읽어 레코드를 복원하는 스트리밍 판독기
+
+    머리 정보(header)는 바로, 메타데이터는 끝까지 읽은 뒤 사용 가능하다.
+    """
+
+    def __init__(self, stream: BinaryIO, header: Optional[bytes] = None):
+        header = header if header is not None else stream.read(len(MAGIC) + 2)
+        if len(header) != len(MAGIC) + 2 or not header.startswith(MAGIC):
+            raise SnapshotError("스냅샷 파일이 아닙니다.")
+        if header[len(MAGIC)] not in READABLE_VERSIONS:
+            raise SnapshotError(f"지원하지 않는 스냅샷 버전: {header[len(MAGIC)]}")
+        codec = {code: name for name, code in CODECS.items()}.get(header[-1:])
+        if codec is None:
+            raise SnapshotError("알 수 없는 압축 방식입니다.")
+
+        self.codec = codec
+        self.metadata: Optional[Dict] = None
+        self._in = _open_decompressor(stream, codec)
+        self._nicknames: List[str] = []
+        self._times: List[str] = []
+        self.header: Dict = {}
+        self._next_frame = None
+        if header[len(MAGIC)] >= 2:
+            kind, body = self._read_frame()
+            if kind == FRAME_HEADER_INFO:
+                self.header = body
+            else:
+                self._next_frame = (kind, body)
+    
+    @property
+    def room_key(self) -> Optional[str]:
+        """백업한 방 (머리 정보가 없는 버전 1 스냅샷은 None)"""
+        return self.header.get('room_key')
+    
+    def _read_frame(self):
+        kind, length = FRAME_HEADER.unpack(self._read_exact(FRAME_HEADER.size))
+        return kind, json.loads(self._read_exact(length))
+
+    def _read_exact(self, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            chunk = self._in.read(size)
+            if not chunk:
+                raise SnapshotError("스냅샷이 중간에 끊겼습니다.")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def iter_batches(self) -> Iterator[List[ChatRecord]]:
+        """블록 하나씩 레코드 목록으로 반환"""
+        for records, _ in self.iter_hashed_batches():
+            yield records
+
+    def iter_hashed_batches(self) -> Iterator[Tuple[List[ChatRecord], Optional[List[str]]]]:
+        """블록 하나씩 (레코드 목록, 저장된 내용 해시 또는 None) 반환"""
+        while self.metadata is None:
+            if self._next_frame is not None:
+                (kind, body), self._next_frame = self._next_frame, None
+            else:
+                kind, body = self._read_frame()
+            if kind == FRAME_METADATA:
+                self.metadata = body
+            elif kind == FRAME_BLOCK:
+                yield self._decode_block(body), body.get('hashes')
+            else:
+                raise SnapshotError(f"알 수 없는 프레임: {kind!r}")
+
+    def __iter__(self) -> Iterator[ChatRecord]:
+        for batch in self.iter_batches():
+            yield from batch
+
+    def _decode_block(self, block: Dict) -> List[ChatRecord]:
+        nicknames, times = self._nicknames, self._times
+        nicknames.extend(block['new_nicks'])
+        times.extend(block['new_times'])
+
+        dates = []
+        for date, count in block['dates']:
+            dates.extend([date] * count)
+        time_ids = iter(block['times'])
+        texts = iter(block['texts'])
+
+        records = []
+        for code, nick_id, date in zip(block['types'], block['nicks'], dates):
+            if code == 'm':
+                records.append(ChatRecord('message', nicknames[nick_id], times[next(time_ids)], next(texts), date))
+            else:
+                records.append(ChatRecord(TYPE_NAMES[code], nicknames[nick_id], date=date))
+        return records
+
+
+def write_snapshot(stream: BinaryIO, records: Iterable[Dict], metadata: Optional[Dict] = None,
+                   codec: Optional[str] = None, header: Optional[Dict] = None) -> int:
+    """레코드 전체를 스냅샷으로 저장, 저장한 레코드 수 반환"""
+    writer = SnapshotWriter(stream, codec, header=header)
+    writer.write(records)
+    writer.close(metadata)
+    return writer.record_count
+
+
+class LegacyBackupReader:
+    """예전 JSON 백업 판독기 (JSON 전체를 한 번에 해석하므로 스냅샷과 달리 스트리밍되지 않음)"""
+
+    def __init__(self, stream: BinaryIO, head: bytes = b''):
+        data = json.loads(head + stream.read())
+        self._messages = data.get('messages', [])
+        self.metadata = {'room_info': data.get('room_info'), 'statistics': data.get('statistics')}
+        # 예전 백업의 방 이름은 머리말이 없으면 기본값("카카오톡 대화내용")이라 방 구분에 쓰지 않음
+        self.header: Dict = {}
+        self.room_key = None
+
+    def iter_batches(self, batch_size: int = SNAPSHOT_BLOCK_SIZE) -> Iterator[List[ChatRecord]]:
+        for start in range(0, len(self._messages), batch_size):
+            yield [
+                ChatRecord(msg['type'], msg['nickname'], msg.get('time'), msg.get('message'), msg.get('date'))
+                for msg in self._messages[start:start + batch_size]
+            ]
+
+    def iter_hashed_batches(self) -> Iterator[Tuple[List[ChatRecord], Optional[List[str]]]]:
+        """예전 백업에는 내용 해시가 없음"""
+        for batch in self.iter_batches():
+            yield batch, None
+
+    def __iter__(self) -> Iterator[ChatRecord]:
+        for batch in self.iter_batches():
+            yield from batch
+
+
+def open_backup(stream: BinaryIO):
+    """머리말을 보고 스냅샷 또는 예전 JSON 백업 판독기 반환"""
+    header = stream.read(len(MAGIC) + 2)
+    if header.startswith(MAGIC):
+        return SnapshotReader(stream, header)
+    return LegacyBackupReader(stream, header)
+
+
+def load_backup(stream: BinaryIO) -> Dict:
+    """백업을 {"messages", "room_info", "statistics"} 형태로 읽음 (예전 JSON 백업도 지원)"""
+    reader = open_backup(stream)
+    messages = [record.to_dict() for record in reader]
+    metadata = reader.metadata
+    return {
+        'messages': messages,
+        'room_info': metadata.get('room_info'),
+        'statistics': metadata.get('statistics'),
+    }
@@ -114,55 +114,70 @@ const Search = {
         });
     },
 
-    // Perform search
-    performSearch: function() {
+    // Perform search (cursor가 있으면 이전 결과 뒤에 다음 페이지를 붙임)
+    performSearch: function(cursor) {
         const keyword = $('#searchInput').val().trim();
         const nickname = $('#nicknameInput').val().trim();
         const limit = $('#limitInput').val() || 100;
 
         if (!keyword && !nickname) {
             $('#searchResults').html('<p class="text-muted text-center">검색어를 입력해주세요.</p>');
+            $('#searchPager').empty();
             return;
         }
 
         // Show loading
-        $('#searchResults').html('<div class="text-center"><i class="bi bi-arrow-clockwise spin"></i> 검색 중...</div>');
+        if (cursor) {
+            $('#searchPager').html('<div class="text-center w-100"><i class="bi bi-arrow-clockwise spin"></i> 불러오는 중...</div>');
+        } else {
+            $('#searchResults').html('<div class="text-center"><i class="bi bi-arrow-clockwise spin"></i> 검색 중...</div>');
+            $('#searchPager').empty();
+        }
 
         // API call
-        $.get('/api/search', { keyword, nickname, limit })
+        const params = { keyword, nickname, limit };
+        if (cursor) {
+            params.cursor = cursor;
+        }
+        $.get('/api/search', params)
             .done((response) => {
-                this.displayResults(response.results);
-                this.saveSearchHistory(keyword, nickname);
+                this.displayResults(response.results, Boolean(cursor));
+                this.displayPager(response.next_cursor);
+                if (!cursor) {
+                    this.saveSearchHistory(keyword, nickname);
+                }
             })
             .fail(() => {
                 $('#searchResults').html('<p class="text-danger text-center">검색 중 오류가 발생했습니다.</p>');
+                $('#searchPager').empty();
             });
     },
 
     // Display search results
-    displayResults: function(results) {
+    displayResults: function(results, append) {
         const container = $('#searchResults');
         
-        if (results.length === 0) {
+        if (results.length === 0 && !append) {
             container.html('<p class="text-muted text-center">검색 결과가 없습니다.</p>');
             return;
         }
 
-        let html = `<div class="mb-3"><strong>${results.length}개의 결과를 찾았습니다.</strong></div>`;
+        let html = '';
         
         results.forEach((result, index) => {
+            const text = result.message || '';
             html += `
                 <div class="search-result">
                     <div class="message-meta">
                         <span class="badge bg-primary">${result.nickname}</span>
-                        <span class="text-muted">${result.time_str}</span>
-                        <span class="badge bg-secondary">${result.message_type}</span>
+                        <span class="text-muted">${result.timestamp || ''}</span>
+                        ${result.room_key ? `<span class="badge bg-secondary">${result.room_key}</span>` : ''}
                     </div>
                     <div class="message-content">
-                        ${this.highlightText(result.message_text || result.raw_line)}
+                        ${this.highlightText(text)}
                     </div>
                     <div class="mt-2">
-                        <button class="btn btn-sm btn-outline-primary" onclick="Utils.copyToClipboard('${result.raw_line.replace(/'/g, "\\'")}')">
+                        <button class="btn btn-sm btn-outline-primary" onclick="Utils.copyToClipboard('${text.replace(/'/g, "\\'")}')">
                             <i class="bi bi-clipboard"></i> 복사
                         </button>
                     </div>
@@ -170,7 +185,23 @@ const Search = {
             `;
         });
 
-        container.html(html);
+        if (append) {
+            container.append(html);
+        } else {
+            container.html(html);
+        }
+    },
+
+    // Next page button (서버가 준 커서로 마지막 결과 다음부터 조회)
+    displayPager: function(nextCursor) {
+        const pager = $('#searchPager');
+        pager.empty();
+        if (!nextCursor) {
+            return;
+        }
+        $('<button class="btn btn-outline-primary w-100"><i class="bi bi-chevron-down"></i> 더 보기</button>')
+            .on('click', () => this.performSearch(nextCursor))
+            .appendTo(pager);
     },
 
     // Highlight search terms
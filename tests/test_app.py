@@ -0,0 +1,38 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('flask')
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('JOB_DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setenv('JOB_SPOOL_DIR', str(tmp_path / 'spool'))
+    monkeypatch.setenv('LOCAL_DB_PATH', str(tmp_path / 'chat.db'))
+    sys.modules.pop('app', None)
+    module = importlib.import_module('app')
+    yield module
+    if module._upload_jobs is not None:
+        module._upload_jobs.shutdown()
+    sys.modules.pop('app', None)
+
+
+def test_import_does_not_create_job_queue(app_module, tmp_path):
+    assert app_module._upload_jobs is None
+    assert not os.path.exists(tmp_path / 'jobs.db')
+    assert not os.path.exists(tmp_path / 'spool')
+
+
+def test_job_queue_is_created_once_and_resumes_unfinished_jobs(app_module, tmp_path):
+    from job_queue import STATUS_FAILED, JobStore
+
+    # 이전 프로세스에서 스풀 파일을 잃은 작업
+    JobStore(str(tmp_path / 'jobs.db')).create('lost', 'chat.txt', str(tmp_path / 'missing.txt'))
+
+    queue = app_module.get_upload_jobs()
+    assert app_module.get_upload_jobs() is queue
+    assert queue.get('lost')['status'] == STATUS_FAILED
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+from benchmark import generate_export
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv('BACKUP_STORE', 'local')
+    monkeypatch.setenv('BACKUP_DIR', str(tmp_path / 'backups'))
+    monkeypatch.setenv('LOCAL_DB_PATH', str(tmp_path / 'chat.db'))
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_ANON_KEY', raising=False)
+    from hybrid_storage import HybridStorage
+    return HybridStorage()
+
+
+def test_uploads_in_the_same_second_get_distinct_backups(storage, tmp_path, monkeypatch):
+    import hybrid_storage
+
+    class FrozenClock:
+        @staticmethod
+        def now():
+            from datetime import datetime
+            return datetime(2026, 10, 17, 13, 54, 56)
+
+    monkeypatch.setattr(hybrid_storage, 'datetime', FrozenClock)
+    first, second = tmp_path / 'first.txt', tmp_path / 'second.txt'
+    generate_export(str(first), 300, seed=1, room='방A')
+    generate_export(str(second), 300, seed=2, room='방B')
+
+    results = [storage.process_upload(path.read_bytes(), path.name) for path in (first, second)]
+    ids = [result['cloudinary_id'] for result in results]
+    assert all(result['success'] for result in results)
+    assert ids[0] != ids[1]
+    assert all(backup_id.startswith('chat_data/chat_20261017_135456_') for backup_id in ids)
+
+    # 두 백업 모두 새 id로 내려받고 복원할 수 있음
+    rooms = [storage.get_backup(backup_id)['room_info']['name'] for backup_id in ids]
+    assert rooms == ['방A', '방B']
+    restored = storage.restore_backup(ids[1])
+    assert restored['success'] and restored['room_key'] == '방B'
+    assert storage.get_backup('chat_data/없는백업.kksnap') is None
+
+
+EXPORT_HEADER = """방C 님과 카카오톡 대화
+저장한 날짜 : 2025-07-30 20:58:15
+
+--------------- 2025년 7월 30일 수요일 ---------------
+"""
+
+
+def test_restoring_full_and_incremental_backups_keeps_repeated_messages(tmp_path, monkeypatch):
+    from hybrid_storage import HybridStorage
+
+    monkeypatch.setenv('BACKUP_STORE', 'local')
+    monkeypatch.setenv('BACKUP_DIR', str(tmp_path / 'backups'))
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_ANON_KEY', raising=False)
+    first = EXPORT_HEADER + '[A] [오후 3:00] ㅋㅋ\n[B] [오후 3:01] 안녕\n'
+    # 다시 내보낸 파일: 체크포인트 날짜에 A가 같은 시각에 같은 말을 한 번 더 함
+    second = first + '[A] [오후 3:00] ㅋㅋ\n[B] [오후 3:02] 잘가\n'
+
+    monkeypatch.setenv('LOCAL_DB_PATH', str(tmp_path / 'live.db'))
+    live = HybridStorage()
+    uploads = [live.process_upload(text.encode('utf-8'), 'export.txt') for text in (first, second)]
+    assert uploads[1]['incremental']['resumed'] and uploads[1]['message_count'] == 2
+
+    monkeypatch.setenv('LOCAL_DB_PATH', str(tmp_path / 'restored.db'))
+    restored = HybridStorage()
+    inserted = [restored.restore_backup(upload['cloudinary_id'])['inserted'] for upload in uploads]
+    assert inserted == [2, 2]
+
+    query = 'SELECT COUNT(*), SUM(message_text = ?) FROM messages'
+    counts = []
+    for name in ('live.db', 'restored.db'):
+        conn = sqlite3.connect(tmp_path / name)
+        counts.append(conn.execute(query, ('ㅋㅋ',)).fetchone())
+        conn.close()
+    assert counts == [(4, 2), (4, 2)]
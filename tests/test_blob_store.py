@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from blob_store import BlobNotFoundError, BlobStore, LocalBlobStore
+
+
+def test_backend_without_open_fails_at_construction():
+    class UploadOnlyStore(BlobStore):
+        def put(self, public_id, stream, file_format):
+            return {'public_id': public_id, 'secure_url': ''}
+
+    with pytest.raises(TypeError):
+        UploadOnlyStore()
+    with pytest.raises(TypeError):
+        BlobStore()
+
+
+def test_cloudinary_storage_implements_the_interface():
+    from hybrid_storage import CloudinaryStorage
+
+    assert not CloudinaryStorage.__abstractmethods__
+    assert isinstance(CloudinaryStorage(), BlobStore)
+
+
+def test_local_blob_store_round_trip(tmp_path):
+    store = LocalBlobStore(str(tmp_path / 'backups'))
+    payload = b'KKSNAP' + bytes(range(256)) * 8192
+    stream = io.BytesIO(payload)
+    stream.seek(100)
+
+    result = store.put('chat_data/chat_1.kksnap', stream, 'kksnap')
+    assert result['public_id'] == 'chat_data/chat_1.kksnap'
+    # put은 스트림의 현재 위치와 관계없이 처음부터 저장
+    with store.open('chat_data/chat_1.kksnap') as stored:
+        assert stored.read() == payload
+
+    with pytest.raises(BlobNotFoundError):
+        with store.open('chat_data/없는백업.kksnap'):
+            pass
+    with pytest.raises(ValueError):
+        store.put('../바깥.kksnap', io.BytesIO(b''), 'kksnap')
@@ -0,0 +1,57 @@
+import sqlite3
+import threading
+
+import pytest
+
+from connection_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_idle_readers=4)
+    with pool.writer() as conn:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY)')
+        conn.execute('INSERT INTO items VALUES (1)')
+    yield pool
+    pool.close()
+
+
+def test_short_lived_threads_do_not_leak_readers(pool):
+    def query():
+        with pool.reader() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM items').fetchone() == (1,)
+
+    for _ in range(30):
+        threads = [threading.Thread(target=query) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    metrics = pool.get_metrics()
+    assert metrics['open_readers'] <= 4 and metrics['idle_readers'] == metrics['open_readers']
+    assert metrics['reader_hits'] > 0
+    assert metrics['reader_opens'] - metrics['reader_closes'] == metrics['open_readers']
+
+
+def test_nested_readers_get_separate_connections(pool):
+    with pool.reader() as outer, pool.reader() as inner:
+        assert outer is not inner
+        assert outer.execute('SELECT 1').fetchone() == inner.execute('SELECT 1').fetchone()
+    with pool.reader() as conn:
+        # 가장 최근에 반납한 연결을 재사용
+        assert conn is outer
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute('INSERT INTO items VALUES (2)')
+
+
+def test_close_releases_idle_and_in_use_readers(pool):
+    with pool.reader():
+        pass
+    with pool.reader() as conn:
+        pool.close()
+        assert pool.get_metrics()['open_readers'] == 0
+        assert conn.execute('SELECT 1').fetchone() == (1,)
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
@@ -0,0 +1,64 @@
+import sqlite3
+
+from kakao_database import KakaoTalkDatabase
+from kakao_parser import ChatRecord
+
+
+def records(day, texts):
+    return [ChatRecord('message', f'사용자{i % 3}', f'오후 {1 + i % 12}:{i % 60:02d}', text, day)
+            for i, text in enumerate(texts)]
+
+
+def test_append_keeps_full_text_index_in_sync(tmp_path):
+    path = str(tmp_path / 'chat.db')
+    db = KakaoTalkDatabase(path)
+    assert db.save_messages(records('2025-07-30', ['첫 적재 메시지'] * 5)) == 5
+    # 행이 있는 DB에 추가 적재 (트리거 대신 끝에서 한 번에 색인하는 경로)
+    assert db.save_messages(records('2025-07-31', ['추가 적재 메시지'] * 4)) == 4
+    assert db.fts_enabled
+
+    assert len(db.search_messages(keyword='추가 적재', limit=100)) == 4
+    assert len(db.search_messages(keyword='적재 메시지', limit=100)) == 9
+    db.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO messages_fts(messages_fts, rank) VALUES ('integrity-check', 1)")
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert {'messages_fts_ai', 'messages_fts_ad', 'messages_fts_au'} <= triggers
+    conn.close()
+
+
+def test_rollup_backfill_rebuilds_every_table_per_room(tmp_path):
+    from benchmark import generate_export
+
+    path = str(tmp_path / 'chat.db')
+    db = KakaoTalkDatabase(path)
+    for seed, room in ((1, '방A'), (2, '방B')):
+        export = tmp_path / f'{room}.txt'
+        generate_export(str(export), 12000, seed=seed, room=room)
+        db.import_export(str(export))
+    db.close()
+
+    tables = {
+        'users': 'room_id, user_id, total_messages, join_count, leave_count',
+        'keyword_stats': 'room_id, keyword, frequency',
+        'daily_activity': 'room_id, day, message_count, join_count, leave_count',
+        'hourly_activity': 'room_id, hour, message_count',
+    }
+    conn = sqlite3.connect(path)
+    expected = {table: sorted(conn.execute(f'SELECT {columns} FROM {table}')) for table, columns in tables.items()}
+    assert len({row[0] for row in expected['daily_activity']}) == 2
+    # 집계 테이블이 생기기 전의 DB: 집계 테이블이 없고 사용자 수가 맞지 않음
+    conn.executescript('''
+        DROP TABLE keyword_stats;
+        DROP TABLE daily_activity;
+        DROP TABLE hourly_activity;
+        UPDATE users SET total_messages = 0, join_count = 0, leave_count = 0;
+    ''')
+    conn.close()
+
+    KakaoTalkDatabase(path).close()
+    conn = sqlite3.connect(path)
+    for table, columns in tables.items():
+        assert sorted(conn.execute(f'SELECT {columns} FROM {table}')) == expected[table], table
+    conn.close()
@@ -0,0 +1,104 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from heavy_hitters import (
+    SKETCH_DEPTH, SKETCH_WIDTH, WINDOW_TOP_CAPACITY, CountMinSketch, HeavyHitters, SpaceSaving, merge_summaries
+)
+
+STREAM_LENGTH = 200_000
+VOCABULARY = 20_000
+DAYS = 30
+
+
+@pytest.fixture(scope='module')
+def stream():
+    """고정 시드 Zipf(지수 1.1) 키워드 스트림을 하루치 30개로 나눈 정확한 빈도"""
+    rng = random.Random(20261017)
+    weights = [1 / rank ** 1.1 for rank in range(1, VOCABULARY + 1)]
+    items = rng.choices([f'키워드{rank}' for rank in range(VOCABULARY)], weights=weights, k=STREAM_LENGTH)
+    size = STREAM_LENGTH // DAYS + 1
+    return [Counter(items[start:start + size]) for start in range(0, STREAM_LENGTH, size)]
+
+
+def total_counts(days):
+    total = Counter()
+    for counts in days:
+        total.update(counts)
+    return total
+
+
+def test_count_min_overestimate_within_bound(stream):
+    truth = total_counts(stream)
+    sketch = CountMinSketch()
+    for counts in stream:
+        for item, count in counts.items():
+            sketch.add(item, count)
+
+    bound = math.e / SKETCH_WIDTH * STREAM_LENGTH
+    over = [sketch.estimate(item) - count for item, count in truth.items()]
+    assert min(over) >= 0
+    # 항목마다 확률 1 - e^-깊이로 초과분 <= ε·N
+    violations = sum(1 for excess in over if excess > bound)
+    assert violations <= math.exp(-SKETCH_DEPTH) * len(truth)
+    # 상위 빈도 항목은 모두 상한 안
+    for item, count in truth.most_common(100):
+        assert sketch.estimate(item) - count <= bound
+
+
+def test_count_min_merge_keeps_bound(stream):
+    truth = total_counts(stream)
+    merged = CountMinSketch()
+    for counts in stream:
+        daily = CountMinSketch()
+        for item, count in counts.items():
+            daily.add(item, count)
+        merged.merge(CountMinSketch.from_bytes(daily.to_bytes()))
+
+    bound = math.e / SKETCH_WIDTH * STREAM_LENGTH
+    over = [merged.estimate(item) - count for item, count in truth.items()]
+    assert min(over) >= 0
+    assert sum(1 for excess in over if excess > bound) <= math.exp(-SKETCH_DEPTH) * len(truth)
+
+
+@pytest.mark.parametrize('merge_days', [False, True])
+def test_space_saving_returns_guaranteed_heavy_hitters(stream, merge_days):
+    truth = total_counts(stream)
+    if merge_days:
+        # 하루치 요약을 따로 만들고 저장/복원한 뒤 합침 (기간 인기 키워드 조회와 같은 경로)
+        summary = SpaceSaving(WINDOW_TOP_CAPACITY)
+        for counts in stream:
+            daily = SpaceSaving(WINDOW_TOP_CAPACITY)
+            daily.update(counts)
+            summary.merge(SpaceSaving.from_json(daily.to_json(), WINDOW_TOP_CAPACITY))
+    else:
+        summary = SpaceSaving(WINDOW_TOP_CAPACITY)
+        for counts in stream:
+            summary.update(counts)
+
+    heavy = {item for item, count in truth.items() if count > STREAM_LENGTH / WINDOW_TOP_CAPACITY}
+    assert heavy and heavy <= summary.counters.keys()
+    for row in summary.top(-1):
+        true_count = truth[row['keyword']]
+        assert row['frequency'] - row['error'] <= true_count <= row['frequency']
+
+
+def test_heavy_hitters_top_is_exact_for_leading_keywords(stream):
+    truth = total_counts(stream)
+    summary = merge_summaries(None if index % 7 == 0 else day_summary(counts) for index, counts in enumerate(stream))
+    kept = total_counts(counts for index, counts in enumerate(stream) if index % 7)
+
+    top = summary.top(10)
+    assert [row['keyword'] for row in top] == [item for item, _ in kept.most_common(10)]
+    for row in top:
+        assert row['frequency'] - row['error'] <= kept[row['keyword']] <= row['frequency']
+        assert kept[row['keyword']] <= truth[row['keyword']]
+    assert merge_summaries([None, None]) is None
+
+
+def day_summary(counts):
+    summary = HeavyHitters()
+    summary.update(counts)
+    return summary
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from benchmark import generate_export
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv('BACKUP_STORE', 'local')
+    monkeypatch.setenv('BACKUP_DIR', str(tmp_path / 'backups'))
+    monkeypatch.setenv('LOCAL_DB_PATH', str(tmp_path / 'chat.db'))
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_ANON_KEY', raising=False)
+    from hybrid_storage import HybridStorage
+    return HybridStorage()
+
+
+def write_prefix(source, target, lines: int):
+    with open(source, 'rb') as full, open(target, 'wb') as prefix:
+        for index, line in enumerate(full):
+            if index >= lines:
+                break
+            prefix.write(line)
+
+
+def test_reupload_resumes_from_local_checkpoint_without_supabase(storage, tmp_path):
+    full, old = tmp_path / 'full.txt', tmp_path / 'old.txt'
+    generate_export(str(full), 12000, room='방A')
+    write_prefix(full, old, 11000)
+
+    first = storage.process_upload(old.read_bytes(), old.name)
+    assert first['success'] and not first['incremental']['resumed']
+    state = storage.local_rooms().catalog.get_import_state('방A')
+    assert state is not None and state['byte_offset'] > 0
+
+    second = storage.process_upload(full.read_bytes(), full.name)
+    assert second['incremental']['resumed']
+    assert second['incremental']['skipped_bytes'] > 0
+    assert second['message_count'] < first['message_count']
+
+    # 이어서 적재한 결과가 전체 파일을 한 번에 적재한 것과 같음
+    from kakao_database import KakaoTalkDatabase
+    reference = KakaoTalkDatabase(str(tmp_path / 'reference.db'))
+    reference.import_export(str(full))
+    reference.close()
+    query = 'SELECT COUNT(*), COUNT(DISTINCT content_hash) FROM messages'
+    with sqlite3.connect(tmp_path / 'chat.db') as local, sqlite3.connect(tmp_path / 'reference.db') as expected:
+        assert local.execute(query).fetchone() == expected.execute(query).fetchone()
+
+    third = storage.process_upload(full.read_bytes(), full.name)
+    assert third['incremental']['resumed'] and third['message_count'] == 0
+
+
+def test_failed_replica_write_keeps_previous_checkpoint(storage, tmp_path, monkeypatch):
+    export = tmp_path / 'export.txt'
+    generate_export(str(export), 500, room='방B')
+
+    def failing_write(batches, room_key):
+        for _ in batches:
+            pass
+        return False
+
+    monkeypatch.setattr(storage.replica, 'write', failing_write)
+
+    assert storage.process_upload(export.read_bytes(), export.name)['success']
+    assert storage.local_rooms().catalog.get_import_state('방B') is None
@@ -0,0 +1,75 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from job_queue import STATUS_DONE, STATUS_FAILED, ChunkConflictError, UploadJobQueue
+
+
+class RecordingStorage:
+    """process_upload에 들어온 파일 내용만 기록하는 저장소 대역"""
+
+    def __init__(self):
+        self.uploads = {}
+
+    def process_upload(self, stream, filename, progress=None):
+        self.uploads[filename] = stream.read()
+        return {'success': True}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    storage = RecordingStorage()
+    queue = UploadJobQueue(storage, str(tmp_path / 'jobs.db'), str(tmp_path / 'spool'), workers=1)
+    yield queue
+    queue.shutdown()
+
+
+def wait_done(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in (STATUS_DONE, STATUS_FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'작업이 끝나지 않음: {queue.get(job_id)}')
+
+
+def send(queue, job_id, offset, data):
+    return queue.append_chunk(job_id, offset, data, hashlib.sha256(data).hexdigest())
+
+
+def test_stalled_chunked_uploads_do_not_block_workers(queue):
+    # 워커가 하나뿐이어도 청크를 기다리는 업로드 둘이 일반 업로드를 막지 않음
+    stalled = [queue.begin(f'stalled{index}.txt') for index in range(2)]
+    send(queue, stalled[0], 0, b'first ')
+
+    plain = queue.submit(io.BytesIO(b'plain upload'), 'plain.txt')
+    assert wait_done(queue, plain)['status'] == STATUS_DONE
+    assert queue.storage.uploads == {'plain.txt': b'plain upload'}
+    assert queue.get(stalled[0])['stage'] == 'receiving'
+
+    send(queue, stalled[0], 6, b'second')
+    queue.finish_upload(stalled[0], 12)
+    assert wait_done(queue, stalled[0])['status'] == STATUS_DONE
+    assert queue.storage.uploads['stalled0.txt'] == b'first second'
+    with pytest.raises(ChunkConflictError):
+        send(queue, stalled[0], 12, b'late')
+
+
+def test_idle_chunked_upload_expires(queue):
+    job_id = queue.begin('idle.txt')
+    send(queue, job_id, 0, b'partial')
+    spool_path = os.path.join(queue.spool_dir, f'{job_id}.txt')
+    assert os.path.exists(spool_path)
+
+    queue.idle_timeout = 0.05
+    time.sleep(0.1)
+    job = queue.get(job_id)
+    assert job['status'] == STATUS_FAILED and not job['receiving']
+    assert not os.path.exists(spool_path)
+    with pytest.raises(ChunkConflictError):
+        send(queue, job_id, 7, b'more')
+    assert queue.storage.uploads == {}
@@ -0,0 +1,116 @@
+import re
+
+import kakao_parser
+from kakao_parser import KakaoTalkParser
+
+# 알 수 없는 줄이 섞인 내보내기 (초대/삭제 알림/출석체크 봇/사진·이모티콘 자리표시/여러 줄 메시지)
+SAMPLE = """테스트방 님과 카카오톡 대화
+저장한 날짜 : 2025-07-30 20:58:15
+
+--------------- 2025년 7월 30일 수요일 ---------------
+철수님이 영희님을 초대했습니다.
+영희님이 들어왔습니다.
+[영희] [오후 3:05] 안녕하세요
+오늘 모임 몇 시인가요?
+[철수] [오후 3:06] 사진
+삭제된 메시지입니다.
+사진 3장
+[민수] [오후 3:07] 확인했습니다
+채팅방 관리자가 메시지를 가렸습니다.
+출석체크 봇: 오늘 출석 3명
+[출석봇] [오후 3:08] 출석체크 완료
+민수님이 방장이 되었습니다.
+이모티콘
+민수님을 내보냈습니다.
+--------------- 2025년 7월 31일 목요일 ---------------
+[영희] [오전 9:00] 좋은 아침
+둘째 줄
+셋째 줄
+영희님이 나갔습니다.
+"""
+
+
+def baseline_records(lines):
+    """여러 줄 메시지를 도입하기 전 파서의 결과 (맞지 않는 줄은 모두 버림)"""
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        match = re.match(r'\[([^\]]+)\] \[([^\]]+)\] (.+)', line)
+        if match:
+            nickname, time_str, message = match.groups()
+            records.append(('message', nickname, time_str, message))
+        elif '님이 들어왔습니다.' in line:
+            records.append(('join', line.replace('님이 들어왔습니다.', ''), None, None))
+        elif '님이 나갔습니다.' in line:
+            records.append(('leave', line.replace('님이 나갔습니다.', ''), None, None))
+    return records
+
+
+def first_lines(records):
+    return [
+        (r.type, r.nickname, r.time, r.message.split('\n')[0] if r.message is not None else None)
+        for r in records
+    ]
+
+
+def test_records_match_baseline_parser():
+    records = list(KakaoTalkParser(SAMPLE.splitlines()).iter_messages())
+    assert first_lines(records) == baseline_records(SAMPLE.splitlines())
+
+
+def test_system_lines_are_not_appended_to_messages():
+    records = list(KakaoTalkParser(SAMPLE.splitlines()).iter_messages())
+    messages = {(r.nickname, r.time): r.message for r in records if r.type == 'message'}
+    assert messages[('영희', '오후 3:05')] == '안녕하세요\n오늘 모임 몇 시인가요?'
+    assert messages[('철수', '오후 3:06')] == '사진'
+    assert messages[('민수', '오후 3:07')] == '확인했습니다'
+    assert messages[('출석봇', '오후 3:08')] == '출석체크 완료'
+    assert messages[('영희', '오전 9:00')] == '좋은 아침\n둘째 줄\n셋째 줄'
+
+
+def test_unknown_line_after_system_line_is_dropped():
+    lines = ['[영희] [오후 3:05] 안녕', '삭제된 메시지입니다.', '어디에도 속하지 않는 줄']
+    records = list(KakaoTalkParser(lines).iter_messages())
+    assert [r.message for r in records] == ['안녕']
+
+
+def test_message_body_lines_that_look_like_notices_are_kept():
+    lines = [
+        '[영희] [오후 3:05] 공지입니다', '1. 내일 출석체크 꼭 하세요', '2. 회비는 만원', '3. 장소는 강남',
+        '사진', '방장이 바뀌면 다시 알려드릴게요. 변경되었습니다.',
+        '[철수] [오후 3:06] 넵',
+    ]
+    records = list(KakaoTalkParser(lines).iter_messages())
+    assert [r.message for r in records] == [
+        '공지입니다\n1. 내일 출석체크 꼭 하세요\n2. 회비는 만원\n3. 장소는 강남\n사진\n'
+        '방장이 바뀌면 다시 알려드릴게요. 변경되었습니다.',
+        '넵',
+    ]
+
+
+def test_parallel_parse_matches_sequential(tmp_path, monkeypatch):
+    path = tmp_path / 'export.txt'
+    path.write_text(SAMPLE * 200, encoding='utf-8')
+    monkeypatch.setattr(kakao_parser, 'MIN_PARALLEL_CHUNK_SIZE', 1024)
+    parser = KakaoTalkParser(str(path))
+    assert parser.parse_parallel(2)[0] == parser.parse_messages()
+
+
+def test_parallel_parse_keeps_encoding_after_first_chunk(tmp_path, monkeypatch):
+    path = tmp_path / 'export_cp949.txt'
+    path.write_bytes((SAMPLE * 200).encode('cp949'))
+    monkeypatch.setattr(kakao_parser, 'MIN_PARALLEL_CHUNK_SIZE', 1024)
+    parser = KakaoTalkParser(str(path), 'cp949')
+    records = parser.parse_parallel(2)[0]
+    assert records == parser.parse_messages()
+    assert records == KakaoTalkParser(SAMPLE.splitlines() * 200).parse_messages()
+
+
+def test_parallel_parse_falls_back_for_utf16(tmp_path, monkeypatch):
+    path = tmp_path / 'export_utf16.txt'
+    path.write_bytes((SAMPLE * 50).encode('utf-16'))
+    monkeypatch.setattr(kakao_parser, 'MIN_PARALLEL_CHUNK_SIZE', 1024)
+    parser = KakaoTalkParser(str(path), 'utf-16')
+    assert parser.parse_parallel(2)[0] == KakaoTalkParser(SAMPLE.splitlines() * 50).parse_messages()
@@ -0,0 +1,98 @@
+import io
+import json
+
+import pytest
+
+from benchmark import generate_export
+from kakao_parser import KakaoTalkParser
+from snapshot import ZSTD_AVAILABLE, SnapshotError, SnapshotReader, SnapshotWriter, load_backup, open_backup
+
+
+@pytest.fixture(scope='module')
+def parsed(tmp_path_factory):
+    export = tmp_path_factory.mktemp('snapshot') / 'export.txt'
+    # 날짜 구분선이 여러 번 나오도록 5000줄(하루)보다 길게
+    generate_export(str(export), 12000, room='스냅샷방')
+    parser = KakaoTalkParser(str(export))
+    records = parser.parse_messages()
+    return [record.to_dict() for record in records], parser.get_statistics(records)
+
+
+@pytest.mark.parametrize('codec', [
+    'gzip',
+    pytest.param('zstd', marks=pytest.mark.skipif(not ZSTD_AVAILABLE, reason='zstandard 미설치')),
+])
+def test_snapshot_round_trip(parsed, codec):
+    records, statistics = parsed
+    metadata = {'room_info': {'name': '스냅샷방', 'total_messages': len(records)}, 'statistics': statistics}
+
+    stream = io.BytesIO()
+    writer = SnapshotWriter(stream, codec, block_size=1000, header={'room_key': '스냅샷방'})
+    writer.write(records)
+    writer.close(metadata)
+    assert writer.record_count == len(records)
+
+    stream.seek(0)
+    reader = open_backup(stream)
+    assert isinstance(reader, SnapshotReader) and reader.codec == codec
+    assert reader.room_key == '스냅샷방'
+    batches = list(reader.iter_batches())
+    assert len(batches) == (len(records) + 999) // 1000
+    assert [record.to_dict() for batch in batches for record in batch] == records
+    # 통계는 JSON으로 저장되므로 JSON 왕복한 값과 비교
+    assert reader.metadata['statistics'] == json.loads(json.dumps(statistics))
+    assert reader.metadata['room_info'] == metadata['room_info']
+    assert reader.metadata['record_count'] == len(records)
+
+    stream.seek(0)
+    loaded = load_backup(stream)
+    assert loaded['messages'] == records
+    assert loaded['statistics'] == json.loads(json.dumps(statistics))
+
+
+def test_legacy_json_backup_loads(parsed):
+    records, statistics = parsed
+    legacy = {
+        'messages': [{**record, 'raw_line': ''} for record in records[:3000]],
+        'room_info': {'name': '카카오톡 대화내용', 'total_messages': 3000},
+        'statistics': statistics,
+    }
+    stream = io.BytesIO(json.dumps(legacy, ensure_ascii=False).encode('utf-8'))
+
+    reader = open_backup(stream)
+    assert reader.room_key is None
+    assert [record.to_dict() for record in reader] == records[:3000]
+
+    stream.seek(0)
+    loaded = load_backup(stream)
+    assert loaded['messages'] == records[:3000]
+    assert loaded['room_info'] == legacy['room_info']
+    assert loaded['statistics'] == json.loads(json.dumps(statistics))
+
+
+def test_truncated_snapshot_is_rejected(parsed):
+    records, _ = parsed
+    stream = io.BytesIO()
+    writer = SnapshotWriter(stream, 'gzip')
+    writer.write(records[:2000])
+    writer.close({})
+
+    truncated = io.BytesIO(stream.getvalue()[:len(stream.getvalue()) // 2])
+    with pytest.raises((SnapshotError, EOFError)):
+        list(open_backup(truncated))
+
+
+def test_snapshot_keeps_content_hashes(parsed):
+    records, _ = parsed
+    hashes = [f'{index:032x}' for index in range(len(records))]
+    stream = io.BytesIO()
+    writer = SnapshotWriter(stream, 'gzip', block_size=1000)
+    writer.write(records[:1500], hashes[:1500])
+    # 해시 없이 추가한 레코드가 섞인 블록은 해시를 기록하지 않음
+    writer.write(records[1500:2500])
+    writer.write(records[2500:4000], hashes[2500:4000])
+    writer.close({})
+
+    stream.seek(0)
+    blocks = [stored for _, stored in open_backup(stream).iter_hashed_batches()]
+    assert blocks == [hashes[:1000], None, None, hashes[3000:4000]]
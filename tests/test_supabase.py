@@ -0,0 +1,242 @@
+import random
+import re
+
+import pytest
+
+from benchmark import _start_rest_stub
+from rollups import RollupAccumulator
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """PostgREST 조회 빌더를 흉내 내는 메모리 테이블 조회 (저장소가 쓰는 연산자만)"""
+
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.orders = []
+        self.row_limit = None
+        self.upserted = None
+
+    def _where(self, predicate):
+        self.filters.append(predicate)
+        return self
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self._where(lambda row: row.get(column) == value)
+
+    def gt(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def lt(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._where(lambda row: row.get(column) in values)
+
+    def ilike(self, column, pattern):
+        needle = pattern.strip('%').lower()
+        return self._where(lambda row: needle in (row.get(column) or '').lower())
+
+    def or_(self, expression):
+        return self._where(parse_condition(f'or({expression})'))
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.upserted = (rows if isinstance(rows, list) else [rows], on_conflict.split(','), ignore_duplicates)
+        return self
+
+    def execute(self):
+        self.client.calls.append(self)
+        table = self.client.tables.setdefault(self.table, [])
+        if self.upserted is not None:
+            rows, keys, ignore_duplicates = self.upserted
+            for row in rows:
+                existing = [r for r in table if all(r.get(k) == row.get(k) for k in keys)]
+                if existing and not ignore_duplicates:
+                    existing[0].update(row)
+                elif not existing:
+                    table.append(dict(row))
+            return FakeResult([])
+
+        rows = [row for row in table if all(predicate(row) for predicate in self.filters)]
+        for column, desc in reversed(self.orders):
+            # PostgreSQL 기본값처럼 NULL은 오름차순에서 마지막, 내림차순에서 처음
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column) or 0), reverse=desc)
+        return FakeResult([dict(row) for row in rows[:self.row_limit]])
+
+
+def parse_condition(expression: str):
+    """or(...)/and(...)/열.연산자.값 형식의 PostgREST 조건을 행 판별 함수로 변환"""
+    match = re.fullmatch(r'(or|and)\((.*)\)', expression)
+    if match:
+        parts, depth, current = [], 0, ''
+        for char in match.group(2):
+            if char == ',' and depth == 0:
+                parts.append(current)
+                current = ''
+                continue
+            depth += char == '('
+            depth -= char == ')'
+            current += char
+        parts.append(current)
+        predicates = [parse_condition(part) for part in parts]
+        combine = any if match.group(1) == 'or' else all
+        return lambda row: combine(predicate(row) for predicate in predicates)
+
+    column, rest = expression.split('.', 1)
+    if rest == 'is.null':
+        return lambda row: row.get(column) is None
+    if rest == 'not.is.null':
+        return lambda row: row.get(column) is not None
+    operator, value = rest.split('.', 1)
+    value = int(value)
+    compare = {'lt': lambda a: a < value, 'eq': lambda a: a == value, 'gt': lambda a: a > value}[operator]
+    return lambda row: row.get(column) is not None and compare(row[column])
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.client.rpcs.append((self.name, self.params))
+        return FakeResult(None)
+
+
+class FakeSupabase:
+    """supabase-py 클라이언트 대역 (table() 조회/저장과 rpc() 호출 기록)"""
+
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self.calls = []
+        self.rpcs = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_ANON_KEY', raising=False)
+    from hybrid_storage import SupabaseStorage
+
+    storage = SupabaseStorage()
+    storage._client = FakeSupabase()
+    return storage
+
+
+def message_rows(count: int):
+    rows = []
+    for index in range(1, count + 1):
+        # 앞의 몇 행은 시각이 없고, 나머지는 같은 시각이 여러 행씩 겹침
+        rows.append({
+            'id': index, 'room_key': '방A' if index % 3 else '방B', 'idempotency_key': f'k{index}',
+            'nickname': f'사용자{index % 4}', 'message': f'메시지 {index}', 'timestamp': '',
+            'ts': None if index <= 5 else 1_700_000_000 + (index // 4) * 60
+        })
+    return rows
+
+
+def test_iter_messages_after_pages_in_id_order(supabase):
+    supabase.supabase.tables['messages'] = message_rows(23)
+
+    pages = list(supabase.iter_messages_after(7, page_size=5))
+    assert [len(page) for page in pages] == [5, 5, 5, 1]
+    assert [row['id'] for page in pages for row in page] == list(range(8, 24))
+    assert list(supabase.iter_messages_after(23, page_size=5)) == []
+
+
+def test_apply_rollup_deltas_sends_one_rpc(supabase):
+    rollups = RollupAccumulator()
+    for msg in [
+        {'type': 'message', 'nickname': '철수', 'message': '안녕', 'date': '2024-01-01', 'time': '오후 3:05'},
+        {'type': 'message', 'nickname': '철수', 'message': '반가워', 'date': '2024-01-01', 'time': '오후 3:10'},
+        {'type': 'join', 'nickname': '영희', 'date': '2024-01-02'},
+    ]:
+        rollups.add(msg)
+    rollups.add_keywords(['안녕', '안녕'])
+
+    assert supabase.apply_rollups(rollups)
+    assert supabase.supabase.rpcs == [('apply_rollup_deltas', {'deltas': rollups.to_payload()})]
+    payload = supabase.supabase.rpcs[0][1]['deltas']
+    assert {'nickname': '철수', 'messages': 2, 'joins': 0, 'leaves': 0} in payload['users']
+    assert payload['keywords'] == [{'keyword': '안녕', 'frequency': 2}]
+    assert payload['hourly'] == [{'hour': 15, 'messages': 2}]
+
+
+def test_keyset_search_pages_match_a_single_query(supabase):
+    supabase.supabase.tables['messages'] = message_rows(40)
+
+    for filters in ({}, {'nickname': '사용자1'}, {'room_key': '방A'}, {'start': 1_700_000_000}):
+        expected = supabase.search_messages(limit=1000, **filters)
+        pages, after = [], None
+        while True:
+            page = supabase.search_messages(limit=6, after=after, **filters)
+            pages.extend(page)
+            if len(page) < 6:
+                break
+            after = supabase.next_page_key(page)
+        assert [row['id'] for row in pages] == [row['id'] for row in expected]
+        assert len({row['id'] for row in pages}) == len(pages)
+
+
+def test_keyset_search_uses_id_cursor_without_offset(supabase):
+    supabase.supabase.tables['messages'] = message_rows(20)
+
+    first = supabase.search_messages(limit=8)
+    assert [row['id'] for row in first] == list(range(20, 12, -1))
+    second = supabase.search_messages(limit=8, after=supabase.next_page_key(first))
+    assert [row['id'] for row in second] == list(range(12, 4, -1))
+    # 전체 검색의 커서는 id만 (next_page_key가 (ts, id)를 줘도 마지막 id로 lt 조건)
+    assert supabase.next_page_key(first) == (first[-1]['ts'], 13)
+
+
+def test_bulk_writer_stores_every_row_despite_failures():
+    from bulk_writer import SupabaseBulkWriter
+
+    random.seed(7)
+    server, stored = _start_rest_stub(latency=0.001, row_cost=0, failure_rate=0.3)
+    try:
+        writer = SupabaseBulkWriter(f'http://127.0.0.1:{server.server_address[1]}', 'test-key',
+                                    batch_size=25, max_in_flight=4, backoff=0.001, max_retries=10)
+        rows = [{'nickname': '철수', 'message': f'메시지 {i}', 'idempotency_key': f'row-{i}'} for i in range(500)]
+        stats = writer.write(rows, 'upload-1')
+        # 같은 행을 다시 보내도 고유 행은 늘지 않음
+        again = writer.write(rows[:100], 'upload-2')
+        writer.close()
+    finally:
+        server.shutdown()
+
+    assert stats['failed_batches'] == 0 and again['failed_batches'] == 0
+    assert stats['batches'] == 20 and stats['rows'] == 500
+    assert stats['retries'] > 0
+    assert stored == {row['idempotency_key'] for row in rows}
@@ -0,0 +1,34 @@
+import pytest
+
+from korean_tokenizer import BaseTokenizer, HangulTokenizer, get_tokenizer
+
+
+def keywords(text):
+    return [word for _, word in HangulTokenizer().tokenize(text)]
+
+
+def test_strips_particles_and_endings():
+    assert keywords('회의 장소는 강남역입니다') == ['회의', '장소', '강남역']
+    assert keywords('감사합니다 확인했습니다') == ['감사', '확인']
+    assert keywords('가을 하늘') == ['가을', '하늘']
+
+
+def test_copulas_endings_and_stopwords_are_not_keywords():
+    assert keywords('입니다') == []
+    assert keywords('좋습니다 봤어요 있습니다') == []
+    assert keywords('그런데 저는 정말 그냥') == []
+
+
+def test_cached_tokenizer_matches_plain_tokenizer():
+    texts = ['감사합니다', '회의 장소는 강남역입니다', '감사합니다']
+    cached = get_tokenizer('hangul')
+    assert cached.tokenize_many(texts) == [HangulTokenizer().tokenize(text) for text in texts]
+    assert cached.cache_info()['hits'] == 1
+
+
+def test_tokenizer_without_tokenize_cannot_be_constructed():
+    class Incomplete(BaseTokenizer):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,81 @@
+from typing import Dict, Optional, Set
+
+# 닉네임 색인 n-gram 길이 (한 글자 검색어는 글자 단위로 찾음)
+NICKNAME_GRAM_SIZE = 2
+
+
+def normalize_nickname(nickname: str) -> str:
+    """비교용 닉네임 (앞뒤 공백, 대소문자 무시)"""
+    return nickname.strip().casefold()
+
+
+def nickname_grams(nickname: str) -> Set[str]:
+    """닉네임 색인에 넣는 n-gram (글자 하나 + 연속한 NICKNAME_GRAM_SIZE 글자)"""
+    text = normalize_nickname(nickname)
+    grams = set(text)
+    grams.update(text[i:i + NICKNAME_GRAM_SIZE] for i in range(len(text) - NICKNAME_GRAM_SIZE + 1))
+    return grams
+
+
+def query_grams(query: str) -> Set[str]:
+    """검색어를 포함하는 닉네임이 모두 가진 n-gram (검색어가 한 글자면 그 글자)"""
+    text = normalize_nickname(query)
+    if len(text) < NICKNAME_GRAM_SIZE:
+        return set(text)
+    return {text[i:i + NICKNAME_GRAM_SIZE] for i in range(len(text) - NICKNAME_GRAM_SIZE + 1)}
+
+
+def score_nickname(query: str, nickname: str) -> float:
+    """검색어와 닉네임의 유사도 (같음 3, 접두어 2, 포함 1점 + n-gram 자카드 유사도)"""
+    needle, text = normalize_nickname(query), normalize_nickname(nickname)
+    if text == needle:
+        score = 3.0
+    elif text.startswith(needle):
+        score = 2.0
+    elif needle in text:
+        score = 1.0
+    else:
+        score = 0.0
+    query_set, nickname_set = nickname_grams(needle), nickname_grams(text)
+    if query_set or nickname_set:
+        score += len(query_set & nickname_set) / len(query_set | nickname_set)
+    return score
+
+
+class NicknameInterner:
+    """닉네임 문자열 -> 사용자 사전 id (user_dictionary)
+
+    적재 트랜잭션의 커서로 조회하며, 처음 보는 닉네임은 사전과 n-gram 색인(nickname_grams)에 추가한다.
+    한 번 찾은 id는 메모리에 두므로 같은 닉네임은 적재 중 한 번만 조회한다.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.ids: Dict[str, int] = {}
+        self._next_id: Optional[int] = None
+
+    def intern(self, nickname: str) -> int:
+        user_id = self.ids.get(nickname)
+        if user_id is None:
+            user_id = self.ids[nickname] = self._lookup(nickname)
+        return user_id
+
+    def _lookup(self, nickname: str) -> int:
+        row = self.cursor.execute('SELECT id FROM user_dictionary WHERE nickname = ?', (nickname,)).fetchone()
+        if row is not None:
+            return row[0]
+        # 쓰기 잠금을 잡은 상태이므로 id를 직접 할당해도 충돌하지 않음
+        if self._next_id is None:
+            self._next_id = self.cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM user_dictionary').fetchone()[0]
+        user_id = self._next_id
+        self._next_id += 1
+        # 새 닉네임은 자기 자신이 대표 (별칭 병합 전)
+        self.cursor.execute(
+            'INSERT INTO user_dictionary (id, nickname, canonical_id) VALUES (?, ?, ?)',
+            (user_id, nickname, user_id)
+        )
+        self.cursor.executemany(
+            'INSERT OR IGNORE INTO nickname_grams (gram, user_id) VALUES (?, ?)',
+            [(gram, user_id) for gram in nickname_grams(nickname)]
+        )
+        return user_id